@@ -1,55 +1,311 @@
-import sqlite3
+import bisect
+import json
+import os
+import re
+import zlib
 from datetime import datetime , timedelta
 import threading
-import time
+
+from backends import SQLiteBackend
+from events import EventBus
+from ngram import highlight, required_matches, text_grams
+
+
+# 公告表的列顺序（与 SELECT * 返回的元组一致）
+ANNOUNCEMENT_COLUMNS = ('id', 'title', 'content', 'created_at', 'updated_at', 'deleted_at', 'expires_at',
+                        'publish_at')
+
+# 全员可见的保留频道名
+GLOBAL_CHANNEL = '*'
+
+# 每隔多少个历史版本保存一次全文，限制还原旧版本时需要应用的差量数
+_REVISION_SNAPSHOT_INTERVAL = 32
+
+# 标记已读时因公告数据变化而重新读取可见ID的最多次数
+_RECEIPT_ATTEMPTS = 3
+
+# 历史版本差量比对的切分点：换行和中英文的句末、分句标点（切分点留在句尾）
+_SENTENCE = re.compile(r'[^\n。！？；，、!?;,.]*[\n。！？；，、!?;,.]+|[^\n。！？；，、!?;,.]+')
+
+# 改写的句子新旧合计不超过该字符数时再按字符比对（按字符比对的耗时与长度的平方成正比）
+_CHAR_DIFF_LIMIT = 1000
+
+# 过期检查出错（如写锁等待超时）后，最多等待多少秒再次检查
+_CHECKER_RETRY_SECONDS = 5
+
+_NOT_LOADED = object()
+
+
+def _normalize_channels(channels):
+    """去除空白和重复的频道名，保持原有顺序"""
+    if isinstance(channels, str):
+        channels = [channels]
+    result = []
+    for channel in channels or ():
+        channel = str(channel).strip()
+        if channel and channel not in result:
+            result.append(channel)
+    return result
+
+
+def _local_naive(value):
+    """带时区的时间转换为本地时间并去掉时区，与库中保存的无时区本地时间可比较"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def _diff_ops(newer, older, start, split):
+    """
+    比较 newer 与 older（newer 在全文中的起始偏移为 start），返回把 newer 还原为
+    older 的操作列表：复制区间 [起点, 终点] 或字面文本。
+
+    split 为 None 时按字符比对；否则按 split 切分的片段比对，被改写的片段较短时
+    再按字符比对，只保存真正修改的字符。
+    """
+    # difflib 只在改写正文时需要，按需导入以减少启动耗时
+    import difflib
+
+    new_parts = split(newer) if split else newer
+    old_parts = split(older) if split else older
+    offsets = [start]
+    for part in new_parts:
+        offsets.append(offsets[-1] + len(part))
+
+    ops = []
+    matcher = difflib.SequenceMatcher(None, new_parts, old_parts, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([offsets[i1], offsets[i2]])
+        elif j2 > j1:
+            old_text = ''.join(old_parts[j1:j2])
+            if tag == 'replace' and split and offsets[i2] - offsets[i1] + len(old_text) <= _CHAR_DIFF_LIMIT:
+                ops.extend(_diff_ops(newer[offsets[i1] - start:offsets[i2] - start], old_text, offsets[i1], None))
+            else:
+                ops.append(old_text)
+    return ops
+
+
+def _encode_delta(newer, older):
+    """
+    计算把 newer 还原为 older 的压缩差量。
+
+    差量由"从 newer 复制的区间 [start, end]"和"字面文本"交替组成；先去掉公共
+    前后缀，中间部分按句子（换行和中英文标点处切分）比对，被改写的短句再按
+    字符比对。不换行的单行正文也按句比对，差量大小与修改量成正比，与正文长度无关。
+    """
+    prefix = len(os.path.commonprefix([newer, older]))
+    suffix = min(len(os.path.commonprefix([newer[::-1], older[::-1]])),
+                 len(newer) - prefix, len(older) - prefix)
+    newer_end = len(newer) - suffix
+
+    ops = [[0, prefix]]
+    ops += _diff_ops(newer[prefix:newer_end], older[prefix:len(older) - suffix], prefix, _SENTENCE.findall)
+    ops.append([newer_end, len(newer)])
+
+    # 合并相邻的复制区间和字面文本，去掉空操作
+    merged = []
+    for op in ops:
+        if isinstance(op, list):
+            if op[0] == op[1]:
+                continue
+            if merged and isinstance(merged[-1], list) and merged[-1][1] == op[0]:
+                merged[-1][1] = op[1]
+                continue
+        elif merged and isinstance(merged[-1], str):
+            merged[-1] += op
+            continue
+        merged.append(op)
+    return zlib.compress(json.dumps(merged, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def _apply_delta(newer, delta):
+    """把 _encode_delta 生成的差量应用到 newer 上，得到旧版本文本"""
+    ops = json.loads(zlib.decompress(delta).decode('utf-8'))
+    return ''.join(newer[op[0]:op[1]] if isinstance(op, list) else op for op in ops)
+
+
+def _encode_revision(old_content, new_content, revision):
+    """
+    历史版本的存储形式：每隔 _REVISION_SNAPSHOT_INTERVAL 个版本保存压缩后的全文，
+    其余保存相对于新内容的压缩差量。
+
+    Returns:
+        tuple: (是否全文, 正文或差量)
+    """
+    if revision % _REVISION_SNAPSHOT_INTERVAL == 0:
+        return True, zlib.compress(old_content.encode('utf-8'))
+    return False, _encode_delta(new_content, old_content)
+
+
+def _unpack_receipt(row):
+    """把已读回执行转换为 (高水位, 位图整数)"""
+    if row is None:
+        return 0, 0
+    watermark, exceptions = row
+    return watermark, int.from_bytes(exceptions or b'', 'little')
+
+
+def _pack_bitmap(bits):
+    """位图整数转换为存储用的字节串，空位图存为 NULL"""
+    if not bits:
+        return None
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+class LazyAnnouncement:
+    """
+    延迟加载正文的公告记录。
+
+    除 content 外的列在查询时即已取回；首次访问 content 时，由所属的
+    _ContentLoader 用一条 IN (...) 查询取回同一页所有记录的正文。
+    支持按下标访问和解包，与普通查询返回的元组兼容。
+    """
+
+    __slots__ = ('id', 'title', 'created_at', 'updated_at', 'deleted_at', 'expires_at', 'publish_at',
+                 'preview', '_content', '_loader', '_position')
+
+    def __init__(self, row, loader, position, preview=None):
+        (self.id, self.title, self.created_at, self.updated_at,
+         self.deleted_at, self.expires_at, self.publish_at) = row
+        self.preview = preview
+        self._content = _NOT_LOADED
+        self._loader = loader
+        self._position = position
+
+    @property
+    def content(self):
+        """公告内容，首次访问时按页批量加载"""
+        if self._content is _NOT_LOADED:
+            self._loader.load(self._position)
+        return self._content
+
+    @property
+    def content_loaded(self):
+        """正文是否已加载"""
+        return self._content is not _NOT_LOADED
+
+    def __getitem__(self, index):
+        names = ANNOUNCEMENT_COLUMNS[index]
+        if isinstance(index, slice):
+            return tuple(getattr(self, name) for name in names)
+        return getattr(self, names)
+
+    def __iter__(self):
+        for name in ANNOUNCEMENT_COLUMNS:
+            yield getattr(self, name)
+
+    def __len__(self):
+        return len(ANNOUNCEMENT_COLUMNS)
+
+    def __repr__(self):
+        return f"LazyAnnouncement(id={self.id!r}, title={self.title!r}, content_loaded={self.content_loaded})"
+
+
+class _ContentLoader:
+    """为一次查询返回的延迟记录按页批量加载正文"""
+
+    def __init__(self, manager, page_size):
+        self._manager = manager
+        self._page_size = page_size
+        self._records = []
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        self._records.append(record)
+
+    def load(self, position):
+        """加载 position 所在页的全部正文（一条查询）"""
+        with self._lock:
+            if self._records[position].content_loaded:
+                return
+            start = position - position % self._page_size
+            page = self._records[start:start + self._page_size]
+            contents = self._manager.backend.fetch_contents([record.id for record in page])
+            for record in page:
+                # 查询期间已被硬删除的公告正文为 None
+                record._content = contents.get(record.id)
+
+
+class SearchHit(tuple):
+    """
+    模糊搜索的结果：与普通查询返回的公告元组相同，另附相似度和高亮摘要。
+
+    Attributes:
+        score (float): 公告包含的查询 n-gram 比例（0~1）
+        title_snippet (str): 标记了命中部分的标题
+        snippet (str): 正文中命中最多的一段，命中部分加了标记
+    """
+
+    def __new__(cls, row, score, title_snippet, snippet):
+        hit = super().__new__(cls, row)
+        hit.score = score
+        hit.title_snippet = title_snippet
+        hit.snippet = snippet
+        return hit
+
+    def __getnewargs__(self):
+        # 使结果可以被 pickle（如 st.cache_data 缓存）
+        return tuple(self), self.score, self.title_snippet, self.snippet
+
+    def __repr__(self):
+        return f"SearchHit(id={self[0]!r}, title={self[1]!r}, score={self.score:.2f})"
 
 
 class AnnouncementManager:
-    def __init__(self, db_path='announcements.db'):
+    def __init__(self, db_path='announcements.db', backend=None):
         """
         初始化公告管理器，连接到数据库[3,7](@ref)。
 
         Args:
             db_path (str): 数据库文件路径。默认为 'announcements.db'.
+            backend (StorageBackend): 存储后端，None 表示使用 db_path 对应的 SQLiteBackend
         """
-        self.db_path = db_path
+        self.backend = backend if backend is not None else SQLiteBackend(db_path)
+        # 内存后端没有数据库文件，为 None
+        self.db_path = getattr(self.backend, 'db_path', None)
         self._expiry_checker_running = False
         self._expiry_checker_thread = None
-
-    def _get_connection(self):
-        """获取数据库连接[3,7](@ref)"""
-        return sqlite3.connect(self.db_path)
-
-    def create_announcement(self, title, content, expires_after_hours=None):
+        # 唤醒过期检查器重新计算下一次到期时间
+        self._expiry_wakeup = threading.Event()
+        # 上一次发布检查的时间，(上次检查, 本次检查] 内到达发布时间的公告视为新发布
+        self._last_publish_check = datetime.now()
+        # 可见/待发布公告ID缓存：(数据版本, 有效期截止时间, 可见ID, 待发布ID)
+        self._id_cache = None
+        # 公告变更事件：created / updated / deleted / restored / expired / published / channels_changed
+        self.events = EventBus()
+
+    def create_announcement(self, title, content, expires_after_hours=None, publish_at=None, channels=None):
         """
         创建新公告[2,3](@ref)。
 
         Args:
             title (str): 公告标题
             content (str): 公告内容
-            expires_after_hours (int): 多少小时后自动删除公告，None表示永不过期
+            expires_after_hours (int): 发布后多少小时自动删除公告，None表示永不过期
+            publish_at (datetime): 定时发布时间，None表示立即发布；带时区的时间转换为本地时间
+            channels (list): 投放的频道/部门/标签，None或空表示全员可见
 
         Returns:
             int: 新公告的ID
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        try:
-            if expires_after_hours is not None:
-                expires_at = datetime.now() + timedelta(hours=expires_after_hours)
-                cursor.execute(
-                    "INSERT INTO announcements (title, content, expires_at) VALUES (?, ?, ?)",
-                    (title, content, expires_at)
-                )
-            else:
-                cursor.execute(
-                    "INSERT INTO announcements (title, content) VALUES (?, ?)",
-                    (title, content)
-                )
-            conn.commit()
-            return cursor.lastrowid
-        finally:
-            conn.close()
+        now = datetime.now()
+        publish_at = _local_naive(publish_at) or now
+        scheduled = publish_at > now
+        expires_at = None
+        if expires_after_hours is not None:
+            expires_at = publish_at + timedelta(hours=expires_after_hours)
+
+        announcement_id = self.backend.insert_announcement(
+            title, content, expires_at, publish_at, _normalize_channels(channels) or [GLOBAL_CHANNEL]
+        )
+
+        if scheduled:
+            # 定时公告可能早于检查器的下一次检查，唤醒检查器重新计算
+            self._expiry_wakeup.set()
+        self.events.publish('created', id=announcement_id, title=title, publish_at=publish_at,
+                            scheduled=scheduled)
+        return announcement_id
 
     def check_and_delete_expired(self):
         """
@@ -58,31 +314,37 @@ class AnnouncementManager:
         Returns:
             int: 删除的公告数量
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        try:
-            # 查找所有过期的公告
-            cursor.execute(
-                "SELECT id FROM announcements WHERE deleted_at IS NULL AND expires_at IS NOT NULL AND expires_at <= datetime('now')"
-            )
-            expired_ids = [row[0] for row in cursor.fetchall()]
-
-            # 软删除过期公告
-            if expired_ids:
-                placeholders = ','.join('?' * len(expired_ids))
-                cursor.execute(
-                    f"UPDATE announcements SET deleted_at = datetime('now') WHERE id IN ({placeholders})",
-                    expired_ids
-                )
-                conn.commit()
-
-            return len(expired_ids)
-        finally:
-            conn.close()
+        expired_ids = self.backend.expire_announcements(datetime.now())
+        if expired_ids:
+            self.events.publish('expired', ids=expired_ids)
+        return len(expired_ids)
+
+    def check_and_publish_due(self):
+        """
+        检查自上次检查以来到达发布时间的公告。
+
+        定时公告无需改写数据即可在 publish_at 之后出现在可见列表中，
+        此方法用于记录发布事件，使依赖列表的缓存与页面及时刷新。
+
+        Returns:
+            int: 到达发布时间的公告数量
+        """
+        now = datetime.now()
+        published_ids = self.backend.published_between(self._last_publish_check, now)
+        self._last_publish_check = now
+        if published_ids:
+            self.events.publish('published', ids=published_ids)
+        return len(published_ids)
+
+    def _next_due_time(self):
+        """返回下一条公告发布或过期的时间，没有则返回 None"""
+        return self.backend.next_due_time(datetime.now())
 
     def start_expiry_checker(self, interval_seconds=300):
         """
-        启动后台线程定期检查并删除过期公告[5,6](@ref)。
+        启动后台线程定期检查并删除过期公告、发布到期的定时公告[5,6](@ref)。
+
+        检查器在下一条公告发布或过期时提前醒来，最长间隔为 interval_seconds。
 
         Args:
             interval_seconds (int): 检查间隔时间（秒），默认为300秒（5分钟）
@@ -94,14 +356,26 @@ class AnnouncementManager:
 
         def checker_loop():
             while self._expiry_checker_running:
+                # 在检查前清除唤醒标记，检查期间新建的定时公告不会丢失唤醒
+                self._expiry_wakeup.clear()
+                timeout = interval_seconds
                 try:
                     deleted_count = self.check_and_delete_expired()
                     if deleted_count > 0:
                         print(f"自动删除了 {deleted_count} 个过期公告")
+                    published_count = self.check_and_publish_due()
+                    if published_count > 0:
+                        print(f"{published_count} 个公告已到达发布时间")
+
+                    next_due = self._next_due_time()
+                    if next_due is not None:
+                        timeout = min(timeout, max((next_due - datetime.now()).total_seconds(), 0) + 0.01)
                 except Exception as e:
                     print(f"检查过期公告时出错: {e}")
+                    # 不等满整个间隔，尽快重试，避免过期公告长时间保持可见
+                    timeout = min(timeout, _CHECKER_RETRY_SECONDS)
 
-                time.sleep(interval_seconds)
+                self._expiry_wakeup.wait(timeout)
 
         self._expiry_checker_thread = threading.Thread(target=checker_loop)
         self._expiry_checker_thread.daemon = True
@@ -111,36 +385,65 @@ class AnnouncementManager:
     def stop_expiry_checker(self):
         """停止后台过期检查器"""
         self._expiry_checker_running = False
+        self._expiry_wakeup.set()
         if self._expiry_checker_thread:
             self._expiry_checker_thread.join(timeout=5)
         print("公告过期检查器已停止")
 
-    def get_all_announcements(self, include_deleted=False):
+    def _build_lazy_records(self, rows, page_size, preview_chars):
+        """把不含正文的查询结果包装为 LazyAnnouncement 列表"""
+        loader = _ContentLoader(self, page_size)
+        records = []
+        for position, row in enumerate(rows):
+            preview = None
+            if preview_chars:
+                row, preview = row[:-1], row[-1]
+                if len(preview) > preview_chars:
+                    preview = preview[:preview_chars] + "..."
+            record = LazyAnnouncement(row, loader, position, preview)
+            loader.add(record)
+            records.append(record)
+        return records
+
+    def _records(self, rows, lazy, page_size, preview_chars):
+        """按 lazy 参数返回普通元组或 LazyAnnouncement 列表"""
+        if lazy:
+            return self._build_lazy_records(rows, page_size, preview_chars)
+        return rows
+
+    def get_all_announcements(self, include_deleted=False, lazy=False, page_size=50, preview_chars=0,
+                              visible_only=False, unread_by=None):
         """
         获取所有公告[2,3](@ref)。
 
         Args:
             include_deleted (bool): 是否包含已软删除的公告
+            visible_only (bool): 只返回当前可见的公告（publish_at <= 当前时间 < expires_at 且未删除），
+                为 True 时忽略 include_deleted
+            unread_by (str): 只返回该用户未读的可见公告，见 list_unread
+            lazy (bool): 是否返回延迟加载正文的 LazyAnnouncement 记录
+            page_size (int): 延迟加载时每次批量取回正文的记录数
+            preview_chars (int): 延迟加载时随列表一起取回的正文预览字符数，0 表示不取
 
         Returns:
             list: 公告列表
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        if unread_by is not None:
+            return self.list_unread(unread_by, lazy=lazy, page_size=page_size, preview_chars=preview_chars)
 
-        try:
-            if include_deleted:
-                # 包含所有公告，包括已软删除的
-                cursor.execute("SELECT * FROM announcements ORDER BY created_at DESC")
-            else:
-                # 只包含未删除的公告 (deleted_at IS NULL)
-                cursor.execute(
-                    "SELECT * FROM announcements WHERE deleted_at IS NULL ORDER BY created_at DESC"
-                )
+        rows = self.backend.list_announcements(
+            include_deleted, visible_only, datetime.now(), content=not lazy, preview_chars=preview_chars if lazy else 0
+        )
+        return self._records(rows, lazy, page_size, preview_chars)
 
-            return cursor.fetchall()
-        finally:
-            conn.close()
+    def get_statistics(self):
+        """
+        获取公告统计信息（一次聚合查询）。
+
+        Returns:
+            dict: total 总数、active 当前可见、scheduled 待发布、expired 已过期未清理、deleted 已删除
+        """
+        return self.backend.statistics(datetime.now())
 
     def get_announcement_by_id(self, announcement_id):
         """
@@ -152,22 +455,15 @@ class AnnouncementManager:
         Returns:
             dict: 公告信息
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute(
-                "SELECT * FROM announcements WHERE id = ?",
-                (announcement_id,)
-            )
-            return cursor.fetchone()
-        finally:
-            conn.close()
+        return self.backend.get_announcement(announcement_id)
 
     def update_announcement(self, announcement_id, title, content):
         """
         更新公告[2,3](@ref)。
 
+        更新前的版本保存为历史版本：相对于新内容的压缩差量，每隔
+        _REVISION_SNAPSHOT_INTERVAL 个版本保存一次全文。
+
         Args:
             announcement_id (int): 公告ID
             title (str): 新标题
@@ -176,22 +472,73 @@ class AnnouncementManager:
         Returns:
             bool: 更新是否成功
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute(
-                """UPDATE announcements
-                   SET title      = ?,
-                       content    = ?,
-                       updated_at = CURRENT_TIMESTAMP
-                   WHERE id = ?""",
-                (title, content, announcement_id)
-            )
-            conn.commit()
-            return cursor.rowcount > 0
-        finally:
-            conn.close()
+        updated, revision = self.backend.update_announcement(announcement_id, title, content, _encode_revision)
+        if not updated:
+            return False
+
+        self.events.publish('updated', id=announcement_id, title=title,
+                            revision=revision + 1 if revision is not None else None)
+        return True
+
+    def list_revisions(self, announcement_id):
+        """
+        获取公告的版本列表（最新版本在前）。
+
+        Args:
+            announcement_id (int): 公告ID
+
+        Returns:
+            list: [(版本号, 标题, 保存时间), ...]，第一项为当前版本；公告不存在时为空列表
+        """
+        return self.backend.revision_history(announcement_id)
+
+    def get_revision(self, announcement_id, revision):
+        """
+        获取公告的指定版本。
+
+        从当前版本（或不早于目标版本的最近一个全文版本）开始，依次应用差量还原。
+
+        Args:
+            announcement_id (int): 公告ID
+            revision (int): 版本号
+
+        Returns:
+            tuple: (版本号, 标题, 内容, 保存时间)，版本不存在时返回 None
+        """
+        chain = self.backend.revision_chain(announcement_id, revision)
+        if chain is None:
+            return None
+        current, current_revision, rows = chain
+        if revision == current_revision:
+            return (revision,) + current
+        if not rows:
+            return None
+
+        content = current[1]
+        for _, _, snapshot, body, _ in rows:
+            if snapshot:
+                content = zlib.decompress(body).decode('utf-8')
+            else:
+                content = _apply_delta(content, body)
+        _, title, _, _, created_at = rows[-1]
+        return revision, title, content, created_at
+
+    def revert_announcement(self, announcement_id, revision):
+        """
+        把公告恢复到指定版本。恢复本身也会生成一个新版本，历史不会丢失。
+
+        Args:
+            announcement_id (int): 公告ID
+            revision (int): 要恢复到的版本号
+
+        Returns:
+            bool: 恢复是否成功
+        """
+        target = self.get_revision(announcement_id, revision)
+        if target is None:
+            return False
+        _, title, content, _ = target
+        return self.update_announcement(announcement_id, title, content)
 
     def soft_delete_announcement(self, announcement_id):
         """
@@ -203,18 +550,10 @@ class AnnouncementManager:
         Returns:
             bool: 删除是否成功
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute(
-                "UPDATE announcements SET deleted_at = CURRENT_TIMESTAMP WHERE id = ?",
-                (announcement_id,)
-            )
-            conn.commit()
-            return cursor.rowcount > 0
-        finally:
-            conn.close()
+        deleted = self.backend.set_deleted(announcement_id, True)
+        if deleted:
+            self.events.publish('deleted', id=announcement_id, hard=False)
+        return deleted
 
     def hard_delete_announcement(self, announcement_id):
         """
@@ -226,18 +565,10 @@ class AnnouncementManager:
         Returns:
             bool: 删除是否成功
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute(
-                "DELETE FROM announcements WHERE id = ?",
-                (announcement_id,)
-            )
-            conn.commit()
-            return cursor.rowcount > 0
-        finally:
-            conn.close()
+        deleted = self.backend.delete_announcement(announcement_id)
+        if deleted:
+            self.events.publish('deleted', id=announcement_id, hard=True)
+        return deleted
 
     def restore_announcement(self, announcement_id):
         """
@@ -249,20 +580,14 @@ class AnnouncementManager:
         Returns:
             bool: 恢复是否成功
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute(
-                "UPDATE announcements SET deleted_at = NULL WHERE id = ?",
-                (announcement_id,)
-            )
-            conn.commit()
-            return cursor.rowcount > 0
-        finally:
-            conn.close()
-
-    def search_announcements(self, keyword, search_title=True, search_content=True):
+        restored = self.backend.set_deleted(announcement_id, False)
+        if restored:
+            self.events.publish('restored', id=announcement_id)
+        return restored
+
+    def search_announcements(self, keyword, search_title=True, search_content=True,
+                             lazy=False, page_size=50, preview_chars=0, visible_only=False,
+                             mode='exact', threshold=0.5, limit=None, snippet_chars=80, marks=("**", "**")):
         """
         根据关键词搜索公告。
 
@@ -270,43 +595,357 @@ class AnnouncementManager:
             keyword (str): 搜索关键词
             search_title (bool): 是否搜索标题
             search_content (bool): 是否搜索内容
+            visible_only (bool): 只返回当前可见（已发布且未过期）的公告
+            lazy (bool): 是否返回延迟加载正文的 LazyAnnouncement 记录
+            page_size (int): 延迟加载时每次批量取回正文的记录数
+            preview_chars (int): 延迟加载时随结果一起取回的正文预览字符数，0 表示不取
+            mode (str): 'exact' 按子串精确匹配，结果按创建时间倒序；'fuzzy' 按 n-gram
+                相似度模糊匹配（容忍错别字和部分输入），结果为按相似度降序的 SearchHit，
+                此时忽略 lazy、page_size 和 preview_chars
+            threshold (float): 模糊匹配的最低相似度（查询 n-gram 被公告包含的比例）
+            limit (int): 模糊匹配最多返回的条数，None 表示不限
+            snippet_chars (int): 模糊匹配结果中正文摘要的字符数
+            marks (tuple): 摘要中命中部分前后插入的标记
 
         Returns:
             list: 匹配的公告列表
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        try:
-            conditions = []
-            params = []
-
-            if search_title and search_content:
-                conditions.append("(title LIKE ? OR content LIKE ?)")
-                params.extend([f'%{keyword}%', f'%{keyword}%'])
-            elif search_title:
-                conditions.append("title LIKE ?")
-                params.append(f'%{keyword}%')
-            elif search_content:
-                conditions.append("content LIKE ?")
-                params.append(f'%{keyword}%')
-
-            if conditions:
-                where_clause = " AND ".join(conditions)
-                sql = f"SELECT * FROM announcements WHERE {where_clause} AND deleted_at IS NULL ORDER BY created_at DESC"
-                cursor.execute(sql, params)
-            else:
-                cursor.execute("SELECT * FROM announcements WHERE deleted_at IS NULL ORDER BY created_at DESC")
+        if mode == 'fuzzy':
+            return self._fuzzy_search(keyword, search_title, search_content, visible_only, threshold, limit,
+                                      snippet_chars, marks)
+        if mode != 'exact':
+            raise ValueError(f"不支持的搜索模式: {mode!r}（仅支持 exact / fuzzy）")
+
+        rows = self.backend.search_announcements(
+            keyword, search_title, search_content, visible_only, datetime.now(),
+            content=not lazy, preview_chars=preview_chars if lazy else 0
+        )
+        return self._records(rows, lazy, page_size, preview_chars)
+
+    def _fuzzy_search(self, keyword, search_title, search_content, visible_only, threshold, limit,
+                      snippet_chars, marks):
+        """按 n-gram 索引模糊搜索，返回按相似度降序的 SearchHit 列表"""
+        grams = text_grams(keyword)
+        if not grams:
+            return []
+        counts = self.backend.fuzzy_match_counts(
+            grams, required_matches(grams, threshold), search_title, search_content, visible_only, datetime.now()
+        )
+        # 相似度相同时新公告在前（ID 按创建顺序分配）
+        ranked = sorted(counts, key=lambda announcement_id: (counts[announcement_id], announcement_id),
+                        reverse=True)[:limit]
+        rows = {row[0]: row for row in self.backend.get_announcements(ranked, order_by='id')}
+        return [
+            SearchHit(rows[announcement_id], counts[announcement_id] / len(grams),
+                      highlight(rows[announcement_id][1], grams, len(rows[announcement_id][1]), marks),
+                      highlight(rows[announcement_id][2], grams, snippet_chars, marks))
+            # 查询期间被硬删除的公告不再返回
+            for announcement_id in ranked if announcement_id in rows
+        ]
+
+    def set_announcement_channels(self, announcement_id, channels):
+        """
+        设置公告投放的频道（替换原有频道）。
+
+        Args:
+            announcement_id (int): 公告ID
+            channels (list): 频道/部门/标签列表，空列表表示全员可见
+
+        Returns:
+            bool: 设置是否成功
+        """
+        channels = _normalize_channels(channels) or [GLOBAL_CHANNEL]
+        if not self.backend.set_channels(announcement_id, channels):
+            return False
+
+        self.events.publish('channels_changed', id=announcement_id, channels=channels)
+        return True
+
+    def add_announcement_channels(self, announcement_id, channels):
+        """
+        为公告追加投放频道。全员可见的公告追加频道后只对这些频道可见。
+
+        Args:
+            announcement_id (int): 公告ID
+            channels (list): 要追加的频道列表
+
+        Returns:
+            bool: 追加是否成功
+        """
+        current = self.get_announcement_channels(announcement_id)
+        if not current:
+            return False
+        current = [channel for channel in current if channel != GLOBAL_CHANNEL]
+        return self.set_announcement_channels(announcement_id, current + _normalize_channels(channels))
+
+    def remove_announcement_channels(self, announcement_id, channels):
+        """
+        从公告移除投放频道。移除全部频道后公告恢复为全员可见。
+
+        Args:
+            announcement_id (int): 公告ID
+            channels (list): 要移除的频道列表
+
+        Returns:
+            bool: 移除是否成功
+        """
+        current = self.get_announcement_channels(announcement_id)
+        if not current:
+            return False
+        removed = set(_normalize_channels(channels))
+        return self.set_announcement_channels(
+            announcement_id, [channel for channel in current if channel not in removed]
+        )
+
+    def get_announcement_channels(self, announcement_id):
+        """
+        获取公告投放的频道。
+
+        Args:
+            announcement_id (int): 公告ID
+
+        Returns:
+            list: 频道列表，全员可见的公告返回 ['*']，公告不存在时返回空列表
+        """
+        return self.backend.get_channels(announcement_id)
+
+    def get_announcements_for_channels(self, channels, include_global=True, limit=50, before_id=None,
+                                       lazy=False, page_size=50, preview_chars=0):
+        """
+        获取投放到任一指定频道、当前可见的公告，按ID倒序（即发布先后）排列。
+
+        Args:
+            channels (list): 用户所属的频道/部门/标签
+            include_global (bool): 是否包含全员可见的公告
+            limit (int): 最多返回的公告数
+            before_id (int): 翻页游标，只返回ID小于该值的公告
+            lazy (bool): 是否返回延迟加载正文的 LazyAnnouncement 记录
+            page_size (int): 延迟加载时每次批量取回正文的记录数
+            preview_chars (int): 延迟加载时随结果一起取回的正文预览字符数
+
+        Returns:
+            list: 公告列表
+        """
+        channels = _normalize_channels(channels)
+        if include_global and GLOBAL_CHANNEL not in channels:
+            channels.append(GLOBAL_CHANNEL)
+        if not channels or limit <= 0:
+            return []
+
+        top_ids = self.backend.channel_announcement_ids(channels, limit, before_id, datetime.now())
+        rows = self.backend.get_announcements(
+            top_ids, order_by='id', content=not lazy, preview_chars=preview_chars if lazy else 0
+        )
+        return self._records(rows, lazy, page_size, preview_chars)
+
+    def get_write_statistics(self):
+        """
+        获取写入的锁争用统计。
+
+        SQLite 后端的写入在写锁被占用时按指数退避重试，超过截止时间后抛出
+        backends.WriteTimeoutError（sqlite3.OperationalError 的子类）。
+
+        Returns:
+            dict: writes 成功的写事务数、retries 重试次数、timeouts 超时失败的写入数
+        """
+        return self.backend.write_statistics()
+
+    def data_version(self):
+        """
+        获取公告数据的版本号。公告或频道的任何写入（SQLite 后端包括其他进程的写入）
+        提交后版本号都会变化；标记已读不改变版本号。
+
+        Returns:
+            int: 数据版本号
+        """
+        return self.backend.data_version()
+
+    def cache_token(self):
+        """
+        获取查询结果的缓存标记：公告被改写（包括其他进程）或定时公告发布、
+        公告过期导致可见列表变化时，标记都会改变。已读状态不在标记中，
+        依赖已读状态的结果另见 receipt_token。
+
+        Returns:
+            tuple: (数据版本号, 当前可见列表的有效期截止时间)
+        """
+        version, valid_until, _, _ = self._active_state()
+        return version, valid_until
+
+    def receipt_token(self, user_id):
+        """
+        获取用户已读状态的标记，已读状态变化时标记改变。
+
+        Args:
+            user_id (str): 用户标识
+
+        Returns:
+            str: 标记
+        """
+        watermark, bits = _unpack_receipt(self.backend.get_receipt(user_id))
+        return f"{watermark}.{zlib.crc32(_pack_bitmap(bits) or b''):08x}"
+
+    def _active_state(self):
+        """
+        获取可见ID缓存，必要时重新查询。
+
+        结果按数据版本缓存，并在下一条公告发布或过期时失效。
+
+        Returns:
+            tuple: (数据版本号, 有效期截止时间, 可见ID升序列表, 待发布ID升序列表)。
+                ID列表反映的状态不早于该版本号
+        """
+        version = self.data_version()
+        now = datetime.now()
+        cache = self._id_cache
+        if cache is not None and cache[0] == version and (cache[1] is None or now < cache[1]):
+            return cache
+
+        # 不持有管理器的锁调用后端，避免与持有后端锁的调用方形成锁顺序死锁；并发刷新时
+        # 各线程得到的结果都不早于各自读取的版本号，较旧的结果会在下次读取时因版本不符而刷新
+        visible_ids, pending_ids, valid_until = self.backend.active_ids(now)
+        cache = (version, valid_until, visible_ids, pending_ids)
+        self._id_cache = cache
+        return cache
+
+    def _active_ids(self):
+        """
+        获取当前可见与待发布公告的ID（均为升序列表）。
 
-            return cursor.fetchall()
-        finally:
-            conn.close()
+        Returns:
+            tuple: (可见ID列表, 待发布ID列表)
+        """
+        _, _, visible_ids, pending_ids = self._active_state()
+        return visible_ids, pending_ids
+
+    def _unread_ids(self, user_id):
+        """返回用户未读的可见公告ID（升序）"""
+        watermark, bits = _unpack_receipt(self.backend.get_receipt(user_id))
+
+        visible_ids, _ = self._active_ids()
+        start = bisect.bisect_right(visible_ids, watermark)
+        if not bits:
+            return visible_ids[start:]
+        return [announcement_id for announcement_id in visible_ids[start:]
+                if not bits >> (announcement_id - watermark - 1) & 1]
+
+    @staticmethod
+    def _compact_receipt(watermark, bits, visible_ids, pending_ids):
+        """
+        推进高水位：跳过已读、已删除或不存在的公告，直到第一条未读的可见或待发布公告。
+
+        Args:
+            visible_ids (list): 可见公告ID（升序）
+            pending_ids (list): 待发布公告ID（升序）
+
+        Returns:
+            tuple: (新高水位, 新位图)
+        """
+        # 第一条未读且仍可能被看到的公告挡住高水位
+        blocker = None
+        for ids in (visible_ids, pending_ids):
+            for announcement_id in ids[bisect.bisect_right(ids, watermark):]:
+                if not bits >> (announcement_id - watermark - 1) & 1:
+                    if blocker is None or announcement_id < blocker:
+                        blocker = announcement_id
+                    break
+
+        if blocker is None:
+            # 没有未读公告：高水位推进到已知最大ID，超出部分的位保留
+            candidates = [ids[-1] for ids in (visible_ids, pending_ids) if ids]
+            new_watermark = max([watermark] + candidates)
+        else:
+            new_watermark = blocker - 1
+        if new_watermark <= watermark:
+            return watermark, bits
+        return new_watermark, bits >> (new_watermark - watermark)
+
+    def mark_read(self, user_id, announcement_ids):
+        """
+        将公告标记为用户已读。
+
+        Args:
+            user_id (str): 用户标识
+            announcement_ids (int | list): 公告ID或ID列表
+
+        Returns:
+            int: 用户当前的未读公告数
+        """
+        if isinstance(announcement_ids, int):
+            announcement_ids = [announcement_ids]
+
+        # 可见ID在写事务之外读取（通常命中缓存），写入时若公告数据版本已变化则重新读取；
+        # 公告持续被改写时，最后一次只记录已读、不推进高水位
+        for attempt in range(_RECEIPT_ATTEMPTS):
+            version, _, visible_ids, pending_ids = self._active_state()
+            compact = attempt < _RECEIPT_ATTEMPTS - 1
+            # 大于已知最大ID的公告不存在，不写入位图
+            highest = max(visible_ids[-1:] + pending_ids[-1:], default=0)
+
+            def update(row):
+                watermark, bits = _unpack_receipt(row)
+                for announcement_id in announcement_ids:
+                    if watermark < announcement_id <= highest:
+                        bits |= 1 << (announcement_id - watermark - 1)
+                if compact:
+                    watermark, bits = self._compact_receipt(watermark, bits, visible_ids, pending_ids)
+                return watermark, _pack_bitmap(bits)
+
+            if self.backend.update_receipt(user_id, update, version if compact else None):
+                break
+        return self.unread_count(user_id)
+
+    def mark_all_read(self, user_id):
+        """
+        将当前所有可见公告标记为用户已读，之后发布的公告仍为未读。
+
+        Args:
+            user_id (str): 用户标识
+        """
+        visible_ids, _ = self._active_ids()
+        self.mark_read(user_id, visible_ids)
+
+    def unread_count(self, user_id):
+        """
+        获取用户未读的可见公告数量。
+
+        Args:
+            user_id (str): 用户标识
+
+        Returns:
+            int: 未读公告数
+        """
+        return len(self._unread_ids(user_id))
+
+    def list_unread(self, user_id, limit=None, lazy=False, page_size=50, preview_chars=0):
+        """
+        获取用户未读的可见公告，与 get_all_announcements 一样按创建时间倒序排列。
+
+        Args:
+            user_id (str): 用户标识
+            limit (int): 最多返回的公告数（取ID最新的若干条），None 表示全部
+            lazy (bool): 是否返回延迟加载正文的 LazyAnnouncement 记录
+            page_size (int): 延迟加载时每次批量取回正文的记录数
+            preview_chars (int): 延迟加载时随结果一起取回的正文预览字符数
+
+        Returns:
+            list: 未读公告列表
+        """
+        unread_ids = self._unread_ids(user_id)
+        if limit is not None:
+            unread_ids = unread_ids[-limit:] if limit > 0 else []
+        if not unread_ids:
+            return []
 
+        rows = self.backend.get_announcements(
+            unread_ids, content=not lazy, preview_chars=preview_chars if lazy else 0
+        )
+        return self._records(rows, lazy, page_size, preview_chars)
 
 # 使用示例
 if __name__ == "__main__":
     # 初始化数据库（如果尚未初始化）
-    from data.datainit import *
+    from data.datainit import init_database
 
     init_database()
 
@@ -335,4 +974,4 @@ if __name__ == "__main__":
 
     # 硬删除公告
     if manager.hard_delete_announcement(new_id):
-        print("公告已永久删除")
\ No newline at end of file
+        print("公告已永久删除")
@@ -1,6 +1,5 @@
 import streamlit as st
 from datetime import datetime
-import pandas as pd
 
 
 # 导入你的AnnouncementManager类
@@ -49,8 +48,8 @@ if menu_option == "公告列表":
     # 显示已删除公告的选项
     show_deleted = st.checkbox("显示已删除的公告")
 
-    # 获取公告数据
-    announcements = manager.get_all_announcements(include_deleted=show_deleted)
+    # 获取公告数据（列表只展示预览，正文按需延迟加载）
+    announcements = manager.get_all_announcements(include_deleted=show_deleted, lazy=True, preview_chars=50)
 
     if not announcements:
         st.info("暂无公告")
@@ -61,12 +60,15 @@ if menu_option == "公告列表":
             announcement_data.append({
                 "ID": ann[0],
                 "标题": ann[1],
-                "内容": ann[2][:50] + "..." if len(ann[2]) > 50 else ann[2],  # 内容预览
+                "内容": ann.preview,  # 内容预览
                 "创建时间": ann[3],
                 "更新时间": ann[4],
                 "状态": "已删除" if ann[5] else "正常"
             })
 
+        # pandas 只在展示表格时需要，按需导入以加快页面启动
+        import pandas as pd
+
         df = pd.DataFrame(announcement_data)
 
         # 显示表格
@@ -150,7 +152,8 @@ elif menu_option == "搜索公告":
             search_title = search_option in ["标题和内容", "仅标题"]
             search_content = search_option in ["标题和内容", "仅内容"]
 
-            results = manager.search_announcements(keyword, search_title, search_content)
+            results = manager.search_announcements(keyword, search_title, search_content,
+                                                   lazy=True, preview_chars=200)
 
             if results:
                 st.success(f"找到 {len(results)} 条相关公告")
@@ -161,7 +164,7 @@ elif menu_option == "搜索公告":
                         st.write(f"**ID:** {ann[0]}")
                         st.write(f"**创建时间:** {ann[3]}")
                         st.write("**内容预览:**")
-                        st.write(ann[2][:200] + "..." if len(ann[2]) > 200 else ann[2])
+                        st.write(ann.preview)
             else:
                 st.info("未找到相关公告")
 
@@ -169,8 +172,8 @@ elif menu_option == "搜索公告":
 elif menu_option == "管理公告":
     st.title("⚙️ 管理公告")
 
-    # 获取所有公告（包括已删除的）
-    announcements = manager.get_all_announcements(include_deleted=True)
+    # 获取所有公告（包括已删除的），正文仅在编辑时按需加载
+    announcements = manager.get_all_announcements(include_deleted=True, lazy=True)
 
     if not announcements:
         st.info("暂无公告")
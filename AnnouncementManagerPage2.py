@@ -1,13 +1,224 @@
+from datetime import datetime, timedelta
+
 import streamlit as st
 
 # 导入你的AnnouncementManager类
-from AnnouncementManager import *
+from AnnouncementManager import AnnouncementManager
+
+# 每页公告卡片数的可选值
+PAGE_SIZES = [10, 20, 50]
+
+# 自定义CSS样式
+CARD_CSS = """
+<style>
+.announcement-card {
+    background-color: #f8f9fa;
+    border-radius: 0.5rem;
+    padding: 1rem;
+    margin-bottom: 1rem;
+    border-left: 4px solid #007bff;
+}
+.expired {
+    border-left-color: #dc3545;
+    opacity: 0.7;
+}
+.deleted {
+    border-left-color: #6c757d;
+    opacity: 0.6;
+}
+</style>
+"""
 
 
 # 初始化数据库连接和公告管理器
 @st.cache_resource
 def init_manager():
-    return AnnouncementManager()
+    manager = AnnouncementManager()
+    # 启动过期检查器（每个进程只启动一次）
+    manager.start_expiry_checker(interval_seconds=300)
+    return manager
+
+
+def data_key(manager):
+    """
+    查询结果的缓存键：数据库路径 + manager.cache_token()。数据改写或定时公告
+    发布、公告过期后标记变化，下一次读取时重新查询。
+    """
+    return manager.db_path, manager.cache_token()
+
+
+# 参数名以下划线开头的不参与缓存键计算
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_statistics(_manager, key):
+    return _manager.get_statistics()
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_announcements(_manager, key, include_deleted):
+    return _manager.get_all_announcements(include_deleted=include_deleted)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_search_results(_manager, key, keyword, search_title, search_content, mode):
+    return _manager.search_announcements(keyword, search_title, search_content, mode=mode)
+
+
+def announcement_status(ann, now_text):
+    """返回公告状态：deleted / expired / scheduled / active（时间列与本地时间字符串比较）"""
+    deleted_at, expires_at, publish_at = ann[5], ann[6], ann[7]
+    if deleted_at:
+        return "deleted"
+    if expires_at and expires_at <= now_text:
+        return "expired"
+    if publish_at and publish_at > now_text:
+        return "scheduled"
+    return "active"
+
+
+def paginate(items, key):
+    """
+    只渲染当前页：返回 items 中当前页的切片。
+
+    Args:
+        items (list): 全部条目
+        key (str): 分页控件的 session_state 键前缀
+    """
+    page_size = st.session_state.get(f"{key}_page_size", PAGE_SIZES[1])
+    page_count = max(1, (len(items) + page_size - 1) // page_size)
+    # 条目变少或每页条数变大后，把页码限制在有效范围内
+    if st.session_state.get(f"{key}_page", 1) > page_count:
+        st.session_state[f"{key}_page"] = page_count
+
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        page = st.number_input("页码", min_value=1, max_value=page_count, step=1, key=f"{key}_page")
+    with col2:
+        st.selectbox("每页条数", PAGE_SIZES, index=1, key=f"{key}_page_size")
+    with col3:
+        st.caption(f"共 {len(items)} 条，{page_count} 页")
+
+    start = (page - 1) * page_size
+    return items[start:start + page_size]
+
+
+def render_card(ann, now_text):
+    """渲染一张公告卡片"""
+    id, title, content, created_at, updated_at, deleted_at, expires_at, publish_at = ann
+    status = announcement_status(ann, now_text)
+
+    # 创建公告卡片
+    card_class = "announcement-card"
+    if status == "expired":
+        card_class += " expired"
+    elif status == "deleted":
+        card_class += " deleted"
+
+    st.markdown(f'<div class="{card_class}">', unsafe_allow_html=True)
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.subheader(title)
+        st.write(content)
+    with col2:
+        st.caption(f"创建时间: {created_at}")
+        if publish_at:
+            st.caption(f"发布时间: {publish_at[:19]}")
+        if expires_at:
+            st.caption(f"过期时间: {expires_at}")
+        if deleted_at:
+            st.caption(f"删除时间: {deleted_at}")
+
+        # 状态标签
+        if status == "expired":
+            st.error("已过期")
+        elif status == "deleted":
+            st.warning("已删除")
+        elif status == "scheduled":
+            st.info("待发布")
+        else:
+            st.success("活跃中")
+
+    st.markdown('</div>', unsafe_allow_html=True)
+
+
+# 统计信息每30秒自行刷新，不触发整页重跑
+@st.fragment(run_every=30)
+def render_statistics(manager):
+    stats = load_statistics(manager, data_key(manager))
+    st.metric("总公告数", stats['total'])
+    st.metric("活跃公告", stats['active'])
+    st.metric("待发布", stats['scheduled'])
+    st.metric("已过期", stats['expired'])
+    st.metric("已删除", stats['deleted'])
+
+
+# 显示选项和翻页只重跑本片段，不影响侧边栏和其他页面
+@st.fragment
+def render_announcement_list(manager):
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        show_deleted = st.checkbox("显示已删除的公告")
+    with col2:
+        sort_order = st.selectbox("排序方式", ["最新优先", "最旧优先"])
+
+    # 获取公告列表
+    announcements = load_announcements(manager, data_key(manager), show_deleted)
+
+    if sort_order == "最旧优先":
+        announcements = announcements[::-1]
+
+    if not announcements:
+        st.info("暂无公告")
+        return
+
+    now_text = str(datetime.now())
+    for ann in paginate(announcements, "list"):
+        render_card(ann, now_text)
+
+
+@st.fragment
+def render_search(manager):
+    search_col1, search_col2 = st.columns([2, 1])
+    with search_col1:
+        keyword = st.text_input("搜索关键词",
+                                help="输入标题或内容中的关键词进行搜索")
+    with search_col2:
+        search_type = st.radio("搜索范围", ["标题和内容", "仅标题", "仅内容"],
+                               horizontal=True)
+        fuzzy = st.toggle("模糊搜索", help="容忍错别字和不完整的关键词，结果按相似度排序")
+
+    if not keyword:
+        st.info("请输入关键词开始搜索")
+        return
+
+    search_title = search_type in ["标题和内容", "仅标题"]
+    search_content = search_type in ["标题和内容", "仅内容"]
+
+    results = load_search_results(manager, data_key(manager), keyword, search_title, search_content,
+                                  'fuzzy' if fuzzy else 'exact')
+
+    if not results:
+        st.warning("未找到匹配的公告")
+        return
+
+    st.success(f"找到 {len(results)} 条匹配的公告")
+
+    for ann in paginate(results, "search"):
+        id, title, content, created_at, updated_at, deleted_at, expires_at, publish_at = ann
+
+        st.markdown('<div class="announcement-card">', unsafe_allow_html=True)
+        if fuzzy:
+            # 模糊搜索结果显示高亮的标题和命中最多的一段正文
+            st.subheader(ann.title_snippet)
+            st.markdown(ann.snippet)
+            st.caption(f"相似度: {ann.score:.0%}")
+        else:
+            st.subheader(title)
+            st.write(content)
+        st.caption(f"创建时间: {created_at}")
+        if expires_at:
+            st.caption(f"过期时间: {expires_at}")
+        st.markdown('</div>', unsafe_allow_html=True)
 
 
 def main():
@@ -26,32 +237,11 @@ def main():
     )
 
     # 自定义CSS样式
-    st.markdown("""
-    <style>
-    .announcement-card {
-        background-color: #f8f9fa;
-        border-radius: 0.5rem;
-        padding: 1rem;
-        margin-bottom: 1rem;
-        border-left: 4px solid #007bff;
-    }
-    .expired {
-        border-left-color: #dc3545;
-        opacity: 0.7;
-    }
-    .deleted {
-        border-left-color: #6c757d;
-        opacity: 0.6;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    st.markdown(CARD_CSS, unsafe_allow_html=True)
 
     # 初始化公告管理器
     manager = init_manager()
 
-    # 启动过期检查器
-    manager.start_expiry_checker(interval_seconds=300)
-
     # 标题
     st.title("📢 公告管理系统")
     st.markdown("---")
@@ -68,15 +258,8 @@ def main():
         st.markdown("---")
         st.header("统计信息")
 
-        # 获取公告统计
-        all_announcements = manager.get_all_announcements(include_deleted=True)
-        active_announcements = manager.get_all_announcements(include_deleted=False)
-        expired_count = sum(1 for ann in all_announcements
-                            if ann[6] and datetime.strptime(ann[6][:19], '%Y-%m-%d %H:%M:%S') <= datetime.now())
-
-        st.metric("总公告数", len(all_announcements))
-        st.metric("活跃公告", len(active_announcements))
-        st.metric("已过期", expired_count)
+        # 获取公告统计（一次聚合查询，结果按数据版本缓存）
+        render_statistics(manager)
 
         st.markdown("---")
         if st.button("🔄 刷新数据"):
@@ -86,62 +269,7 @@ def main():
     if menu_option == "公告列表":
         st.header("所有公告")
 
-        # 显示选项
-        col1, col2 = st.columns([2, 1])
-        with col1:
-            show_deleted = st.checkbox("显示已删除的公告")
-        with col2:
-            sort_order = st.selectbox("排序方式", ["最新优先", "最旧优先"])
-
-        # 获取公告列表
-        announcements = manager.get_all_announcements(include_deleted=show_deleted)
-
-        if sort_order == "最旧优先":
-            announcements = announcements[::-1]
-
-        if not announcements:
-            st.info("暂无公告")
-        else:
-            for ann in announcements:
-                print(ann)
-                id, title, content, created_at, updated_at, deleted_at, expires_at = ann
-
-                # 确定公告状态
-                status = "active"
-                if deleted_at:
-                    status = "deleted"
-                elif expires_at and datetime.strptime(expires_at[:19], '%Y-%m-%d %H:%M:%S') <= datetime.now():
-                    status = "expired"
-
-                # 创建公告卡片
-                card_class = "announcement-card"
-                if status == "expired":
-                    card_class += " expired"
-                elif status == "deleted":
-                    card_class += " deleted"
-
-                st.markdown(f'<div class="{card_class}">', unsafe_allow_html=True)
-
-                col1, col2 = st.columns([3, 1])
-                with col1:
-                    st.subheader(title)
-                    st.write(content)
-                with col2:
-                    st.caption(f"创建时间: {created_at}")
-                    if expires_at:
-                        st.caption(f"过期时间: {expires_at}")
-                    if deleted_at:
-                        st.caption(f"删除时间: {deleted_at}")
-
-                    # 状态标签
-                    if status == "expired":
-                        st.error("已过期")
-                    elif status == "deleted":
-                        st.warning("已删除")
-                    else:
-                        st.success("活跃中")
-
-                st.markdown('</div>', unsafe_allow_html=True)
+        render_announcement_list(manager)
 
     # 创建公告页面
     elif menu_option == "创建公告":
@@ -165,6 +293,19 @@ def main():
             # 转换为小时（保持与原有接口兼容）
             expires_hours = expires_days * 24
 
+            # 定时发布（可选）
+            schedule = st.checkbox("定时发布", help="勾选后公告将在指定时间自动发布，有效期从发布时间起算")
+            schedule_col1, schedule_col2 = st.columns(2)
+            with schedule_col1:
+                publish_date = st.date_input("发布日期", value=datetime.now().date())
+            with schedule_col2:
+                publish_time = st.time_input("发布时间", value=datetime.now().time().replace(second=0, microsecond=0))
+            publish_at = datetime.combine(publish_date, publish_time) if schedule else None
+
+            # 投放频道（可选）
+            channels_text = st.text_input("投放频道", help="频道/部门/标签，多个用逗号分隔，留空表示全员可见")
+            channels = [channel for channel in channels_text.replace('，', ',').split(',') if channel.strip()]
+
             submitted = st.form_submit_button("发布公告", type="primary")
 
             if submitted:
@@ -173,16 +314,18 @@ def main():
                 else:
                     try:
                         new_id = manager.create_announcement(
-                            title, content, expires_hours
+                            title, content, expires_hours, publish_at=publish_at, channels=channels
                         )
                         st.success(f"公告发布成功！ID: {new_id}")
-                        st.info(f"此公告将在 {expires_days} 天后自动删除")
+                        if publish_at:
+                            st.info(f"此公告将于 {publish_at.strftime('%Y-%m-%d %H:%M')} 发布")
+                        st.info(f"此公告将在发布 {expires_days} 天后自动删除")
 
                         # 显示预览
                         with st.expander("查看公告预览", expanded=True):
                             st.subheader(title)
                             st.write(content)
-                            expiry_time = datetime.now() + timedelta(days=expires_days)
+                            expiry_time = (publish_at or datetime.now()) + timedelta(days=expires_days)
                             st.caption(f"⏰ 自动删除时间: {expiry_time.strftime('%Y-%m-%d %H:%M:%S')}")
                     except Exception as e:
                         st.error(f"创建公告时出错: {str(e)}")
@@ -191,39 +334,7 @@ def main():
     elif menu_option == "搜索公告":
         st.header("搜索公告")
 
-        search_col1, search_col2 = st.columns([2, 1])
-        with search_col1:
-            keyword = st.text_input("搜索关键词",
-                                    help="输入标题或内容中的关键词进行搜索")
-        with search_col2:
-            search_type = st.radio("搜索范围", ["标题和内容", "仅标题", "仅内容"],
-                                   horizontal=True)
-
-        if keyword:
-            search_title = search_type in ["标题和内容", "仅标题"]
-            search_content = search_type in ["标题和内容", "仅内容"]
-
-            results = manager.search_announcements(
-                keyword, search_title, search_content
-            )
-
-            if not results:
-                st.warning("未找到匹配的公告")
-            else:
-                st.success(f"找到 {len(results)} 条匹配的公告")
-
-                for ann in results:
-                    id, title, content, created_at, expires_at, updated_at, deleted_at = ann
-
-                    st.markdown('<div class="announcement-card">', unsafe_allow_html=True)
-                    st.subheader(title)
-                    st.write(content)
-                    st.caption(f"创建时间: {created_at}")
-                    if expires_at:
-                        st.caption(f"过期时间: {expires_at}")
-                    st.markdown('</div>', unsafe_allow_html=True)
-        else:
-            st.info("请输入关键词开始搜索")
+        render_search(manager)
 
     # 管理公告页面
     elif menu_option == "管理公告":
@@ -233,7 +344,7 @@ def main():
 
         with tab1:
             st.subheader("编辑公告")
-            announcements = manager.get_all_announcements(include_deleted=False)
+            announcements = load_announcements(manager, data_key(manager), False)
 
             if not announcements:
                 st.info("暂无可以编辑的公告")
@@ -246,7 +357,7 @@ def main():
 
                 # 获取选定公告的详细信息
                 selected_ann = next(ann for ann in announcements if ann[0] == selected_id)
-                id, old_title, old_content, created_at, expires_at, updated_at, _ = selected_ann
+                id, old_title, old_content, created_at, updated_at, deleted_at, expires_at, publish_at = selected_ann
 
                 with st.form("edit_announcement_form"):
                     new_title = st.text_input("标题", value=old_title, max_chars=100)
@@ -267,9 +378,27 @@ def main():
                             else:
                                 st.error("更新公告失败")
 
+                # 历史版本
+                revisions = manager.list_revisions(selected_id)
+                if len(revisions) > 1:
+                    with st.expander(f"历史版本（共 {len(revisions)} 个）"):
+                        revision_options = {f"v{rev} - {rev_title} ({saved_at})": rev
+                                            for rev, rev_title, saved_at in revisions[1:]}
+                        selected_revision_label = st.selectbox("选择版本", list(revision_options.keys()))
+                        selected_revision = revision_options[selected_revision_label]
+                        _, rev_title, rev_content, _ = manager.get_revision(selected_id, selected_revision)
+                        st.subheader(rev_title)
+                        st.write(rev_content)
+                        if st.button("↩️ 恢复到此版本"):
+                            if manager.revert_announcement(selected_id, selected_revision):
+                                st.success(f"已恢复到版本 v{selected_revision}")
+                                st.rerun()
+                            else:
+                                st.error("恢复版本失败")
+
         with tab2:
             st.subheader("删除/恢复公告")
-            all_announcements = manager.get_all_announcements(include_deleted=True)
+            all_announcements = load_announcements(manager, data_key(manager), True)
 
             if not all_announcements:
                 st.info("暂无公告")
@@ -277,7 +406,7 @@ def main():
                 # 选择要操作的公告
                 ann_options = {}
                 for ann in all_announcements:
-                    status = "已删除" if ann[6] else "活跃中"
+                    status = "已删除" if ann[5] else "活跃中"
                     ann_options[f"{ann[1]} (ID: {ann[0]}, 状态: {status})"] = ann[0]
 
                 selected_label = st.selectbox("选择公告", list(ann_options.keys()))
@@ -285,7 +414,7 @@ def main():
 
                 # 获取选定公告的状态
                 selected_ann = next(ann for ann in all_announcements if ann[0] == selected_id)
-                is_deleted = selected_ann[6] is not None
+                is_deleted = selected_ann[5] is not None
 
                 col1, col2, col3 = st.columns(3)
 
@@ -340,7 +469,7 @@ def main():
             if st.button("清空所有已删除公告", help="永久删除所有标记为已删除的公告"):
                 if st.checkbox("确认清空所有已删除公告（此操作不可逆）"):
                     all_announcements = manager.get_all_announcements(include_deleted=True)
-                    deleted_announcements = [ann for ann in all_announcements if ann[6]]
+                    deleted_announcements = [ann for ann in all_announcements if ann[5]]
 
                     success_count = 0
                     for ann in deleted_announcements:
@@ -0,0 +1,21 @@
+from backends.base import StorageBackend
+
+__all__ = ['StorageBackend', 'SQLiteBackend', 'MemoryBackend', 'WriteTimeoutError']
+
+# 具体后端在首次访问时才导入，只用其中一个后端时不必加载另一个
+_LAZY_BACKENDS = {
+    'SQLiteBackend': 'backends.sqlite',
+    'WriteTimeoutError': 'backends.sqlite',
+    'MemoryBackend': 'backends.memory',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_BACKENDS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,204 @@
+class StorageBackend:
+    """
+    公告存储后端接口。
+
+    AnnouncementManager 只通过这些方法读写数据；事件、过期检查器、历史版本的
+    差量编码、已读位图的计算和延迟加载都在管理器中完成，与后端无关。
+
+    约定：
+    - 公告行为按 ANNOUNCEMENT_COLUMNS 顺序排列的元组；content=False 时省略
+      content 列（7列），preview_chars > 0 时在末尾附加正文的前 preview_chars + 1
+      个字符，用于判断预览是否被截断。
+    - expires_at / publish_at 为本地时间，以 str(datetime) 的格式保存和比较；
+      created_at / updated_at / deleted_at 为 UTC 时间 'YYYY-MM-DD HH:MM:SS'。
+    - 参数中的 now 为本地时间 datetime。
+    - 列表按创建时间倒序排列。
+    """
+
+    # ---- 公告 ----
+
+    def insert_announcement(self, title, content, expires_at, publish_at, channels):
+        """
+        插入公告及其频道。
+
+        Args:
+            channels (list): 已规范化的非空频道列表
+
+        Returns:
+            int: 新公告的ID
+        """
+        raise NotImplementedError
+
+    def get_announcement(self, announcement_id):
+        """返回公告行，不存在时返回 None"""
+        raise NotImplementedError
+
+    def list_announcements(self, include_deleted, visible_only, now, content=True, preview_chars=0):
+        """
+        列出公告。
+
+        Args:
+            include_deleted (bool): 是否包含已软删除的公告
+            visible_only (bool): 只返回当前可见的公告，为 True 时忽略 include_deleted
+        """
+        raise NotImplementedError
+
+    def search_announcements(self, keyword, search_title, search_content, visible_only, now,
+                             content=True, preview_chars=0):
+        """按 LIKE '%keyword%' 的语义（ASCII 字母不区分大小写）搜索未删除的公告"""
+        raise NotImplementedError
+
+    def get_announcements(self, announcement_ids, order_by='created_at', content=True, preview_chars=0):
+        """
+        按ID批量获取公告，不存在的ID被忽略。
+
+        Args:
+            order_by (str): 'created_at' 按创建时间倒序，'id' 按ID倒序
+        """
+        raise NotImplementedError
+
+    def fetch_contents(self, announcement_ids):
+        """
+        批量获取公告正文。
+
+        Returns:
+            dict: {公告ID: 正文}
+        """
+        raise NotImplementedError
+
+    def update_announcement(self, announcement_id, title, content, encode_revision):
+        """
+        原子地更新公告标题和正文，内容有变化时保存旧版本。
+
+        Args:
+            encode_revision (callable): encode_revision(旧正文, 新正文, 版本号) -> (是否全文, 压缩后的正文或差量)
+
+        Returns:
+            tuple: (是否更新, 保存的旧版本号；内容无变化或公告不存在时为 None)
+        """
+        raise NotImplementedError
+
+    def set_deleted(self, announcement_id, deleted):
+        """软删除（deleted=True）或恢复公告，返回公告是否存在"""
+        raise NotImplementedError
+
+    def delete_announcement(self, announcement_id):
+        """永久删除公告及其频道和历史版本，返回公告是否存在"""
+        raise NotImplementedError
+
+    def expire_announcements(self, now):
+        """软删除所有 expires_at <= now 的未删除公告，返回其ID列表"""
+        raise NotImplementedError
+
+    def published_between(self, after, until):
+        """返回 after < publish_at <= until 的未删除公告ID"""
+        raise NotImplementedError
+
+    def next_due_time(self, now):
+        """返回 now 之后最早的发布或过期时间（datetime），没有则返回 None"""
+        raise NotImplementedError
+
+    def statistics(self, now):
+        """
+        Returns:
+            dict: total、active、scheduled、expired、deleted
+        """
+        raise NotImplementedError
+
+    def active_ids(self, now):
+        """
+        Returns:
+            tuple: (可见ID升序列表, 待发布ID升序列表, 这两个列表的有效期截止时间或 None)
+        """
+        raise NotImplementedError
+
+    def data_version(self):
+        """公告数据版本号：公告或频道的写入提交后变化，已读回执的写入不改变它"""
+        raise NotImplementedError
+
+    # ---- 频道 ----
+
+    def set_channels(self, announcement_id, channels):
+        """替换公告的频道（已规范化的非空列表），公告不存在时返回 False"""
+        raise NotImplementedError
+
+    def get_channels(self, announcement_id):
+        """返回公告的频道（按名称排序），公告不存在时返回空列表"""
+        raise NotImplementedError
+
+    def channel_announcement_ids(self, channels, limit, before_id, now):
+        """返回投放到任一频道的可见公告ID（倒序，最多 limit 个，只含小于 before_id 的ID）"""
+        raise NotImplementedError
+
+    # ---- 历史版本 ----
+
+    def revision_history(self, announcement_id):
+        """
+        Returns:
+            list: [(版本号, 标题, 保存时间), ...]，当前版本在前；公告不存在时为空列表
+        """
+        raise NotImplementedError
+
+    def revision_chain(self, announcement_id, revision):
+        """
+        读取还原指定版本所需的数据。
+
+        Returns:
+            tuple: (当前 (标题, 正文, 更新时间), 当前版本号, 历史行列表)。历史行为
+                (版本号, 标题, 是否全文, 正文或差量, 保存时间)，覆盖目标版本到不早于它的
+                最近一个全文版本（没有全文版本时到最新的历史版本），按版本号倒序。
+                公告不存在时返回 None，目标版本为当前版本或越界时历史行列表为空
+        """
+        raise NotImplementedError
+
+    # ---- 已读回执 ----
+
+    def get_receipt(self, user_id):
+        """返回 (高水位, 位图字节串) 或 None"""
+        raise NotImplementedError
+
+    def update_receipt(self, user_id, update, version=None):
+        """
+        原子地读改写用户的已读回执。
+
+        Args:
+            update (callable): update(当前回执或 None) -> (高水位, 位图字节串)，只做计算，不访问后端
+            version (int): 公告数据版本号；不为 None 且当前版本已不同时不写入
+
+        Returns:
+            bool: 是否已写入
+        """
+        raise NotImplementedError
+
+    # ---- 模糊搜索 ----
+
+    def fuzzy_match_counts(self, grams, min_matches, search_title, search_content, visible_only, now):
+        """
+        通过 n-gram 索引查找模糊匹配的公告。
+
+        Args:
+            grams (set): 查询的 n-gram 集合（见 ngram.text_grams）
+            min_matches (int): 公告至少需要包含的查询 n-gram 数
+
+        Returns:
+            dict: {公告ID: 包含的查询 n-gram 数}，只含未删除（visible_only 时为当前可见）的公告；
+                同时搜索标题和正文时，两者包含的 n-gram 合并计数
+        """
+        raise NotImplementedError
+
+    def sync_search_index(self):
+        """为尚未建立 n-gram 索引的公告补建索引，返回补建的公告数"""
+        return 0
+
+    # ---- 运行状态 ----
+
+    def write_statistics(self):
+        """
+        Returns:
+            dict: writes 成功的写事务数、retries 因写锁被占用的重试次数、timeouts 超时失败的写入数；
+                不存在锁争用的后端返回全 0
+        """
+        return {'writes': 0, 'retries': 0, 'timeouts': 0}
+
+    def close(self):
+        """释放后端持有的资源"""
@@ -0,0 +1,410 @@
+import bisect
+import heapq
+import re
+import threading
+from datetime import datetime, timezone
+
+from backends.base import StorageBackend
+from ngram import text_grams
+
+# 公告记录中各列的位置（与 ANNOUNCEMENT_COLUMNS 一致）
+_ID, _TITLE, _CONTENT, _CREATED_AT, _UPDATED_AT, _DELETED_AT, _EXPIRES_AT, _PUBLISH_AT = range(8)
+
+# 大于任何公告ID，用于在 (时间, ID) 有序索引中定位某一时间之后的位置
+_MAX_ID = float('inf')
+
+
+def _utc_now():
+    """与 SQLite CURRENT_TIMESTAMP 相同格式的 UTC 时间"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _time_text(value):
+    """本地时间按 sqlite3 默认适配器的格式转换为字符串"""
+    return None if value is None else str(value)
+
+
+def _like_pattern(keyword):
+    """把 LIKE '%keyword%' 转换为等价的正则表达式（% 与 _ 为通配符，ASCII 字母不区分大小写）"""
+    parts = []
+    for char in keyword:
+        if char == '%':
+            parts.append('.*')
+        elif char == '_':
+            parts.append('.')
+        else:
+            parts.append(re.escape(char))
+    return re.compile(''.join(parts), re.IGNORECASE | re.ASCII | re.DOTALL)
+
+
+class MemoryBackend(StorageBackend):
+    """
+    纯内存存储后端，用于测试、缓存和无需持久化的部署。
+
+    公告保存在按ID插入顺序排列的字典中（即创建时间顺序）；未删除公告的发布
+    时间和过期时间各维护一个按 (时间, ID) 排序的列表，定时发布、下一次到期
+    时间都通过二分查找定位。过期索引同时充当过期队列：已到期的公告总是它的
+    一段前缀，清理时一次切下，不必扫描全部公告。频道为每个频道维护一个有序
+    ID列表，按频道查询时各列表倒序归并。模糊搜索的 n-gram 倒排索引按字段
+    （标题/正文）分别维护。所有操作在同一把锁内完成。
+    """
+
+    def __init__(self):
+        self.db_path = None
+        self._lock = threading.RLock()
+        self._version = 0
+        self._next_id = 1
+        self._rows = {}
+        self._publish_index = []
+        self._expiry_index = []
+        self._channels = {}
+        self._channel_index = {}
+        self._revisions = {}
+        self._receipts = {}
+        # 标题、正文各一个 {n-gram: 公告ID集合}，以及每条公告的 (标题 n-gram, 正文 n-gram)
+        self._gram_postings = ({}, {})
+        self._record_grams = {}
+
+    def _changed(self):
+        self._version += 1
+
+    def _output(self, record, content, preview_chars):
+        """按约定的列格式输出公告行"""
+        if content:
+            return tuple(record)
+        row = tuple(record[:_CONTENT]) + tuple(record[_CONTENT + 1:])
+        if preview_chars:
+            row += (record[_CONTENT][:preview_chars + 1],)
+        return row
+
+    @staticmethod
+    def _visible(record, now_text):
+        return (record[_DELETED_AT] is None and record[_PUBLISH_AT] is not None
+                and record[_PUBLISH_AT] <= now_text
+                and (record[_EXPIRES_AT] is None or record[_EXPIRES_AT] > now_text))
+
+    def _index(self, record):
+        """未删除公告加入发布/过期索引"""
+        if record[_PUBLISH_AT] is not None:
+            bisect.insort(self._publish_index, (record[_PUBLISH_AT], record[_ID]))
+        if record[_EXPIRES_AT] is not None:
+            bisect.insort(self._expiry_index, (record[_EXPIRES_AT], record[_ID]))
+
+    def _unindex(self, record):
+        for index, column in ((self._publish_index, _PUBLISH_AT), (self._expiry_index, _EXPIRES_AT)):
+            if record[column] is None:
+                continue
+            position = bisect.bisect_left(index, (record[column], record[_ID]))
+            if position < len(index) and index[position] == (record[column], record[_ID]):
+                del index[position]
+
+    # ---- 公告 ----
+
+    def insert_announcement(self, title, content, expires_at, publish_at, channels):
+        with self._lock:
+            announcement_id = self._next_id
+            self._next_id += 1
+            now = _utc_now()
+            record = [announcement_id, title, content, now, now, None,
+                      _time_text(expires_at), _time_text(publish_at)]
+            self._rows[announcement_id] = record
+            self._index(record)
+            self._write_channels(announcement_id, channels)
+            self._write_grams(announcement_id, title, content)
+            self._changed()
+            return announcement_id
+
+    def get_announcement(self, announcement_id):
+        with self._lock:
+            record = self._rows.get(announcement_id)
+            return tuple(record) if record is not None else None
+
+    def list_announcements(self, include_deleted, visible_only, now, content=True, preview_chars=0):
+        now_text = str(now)
+        with self._lock:
+            if visible_only:
+                records = [record for record in reversed(self._rows.values()) if self._visible(record, now_text)]
+            elif include_deleted:
+                records = list(reversed(self._rows.values()))
+            else:
+                records = [record for record in reversed(self._rows.values()) if record[_DELETED_AT] is None]
+            return [self._output(record, content, preview_chars) for record in records]
+
+    def search_announcements(self, keyword, search_title, search_content, visible_only, now,
+                             content=True, preview_chars=0):
+        pattern = _like_pattern(keyword)
+        now_text = str(now)
+        columns = [column for column, enabled in ((_TITLE, search_title), (_CONTENT, search_content)) if enabled]
+        with self._lock:
+            results = []
+            for record in reversed(self._rows.values()):
+                if visible_only:
+                    if not self._visible(record, now_text):
+                        continue
+                elif record[_DELETED_AT] is not None:
+                    continue
+                if all(pattern.search(record[column]) is None for column in columns):
+                    continue
+                results.append(self._output(record, content, preview_chars))
+            return results
+
+    def get_announcements(self, announcement_ids, order_by='created_at', content=True, preview_chars=0):
+        # ID 按创建顺序分配，两种排序结果相同
+        with self._lock:
+            ids = sorted({announcement_id for announcement_id in announcement_ids
+                          if announcement_id in self._rows}, reverse=True)
+            return [self._output(self._rows[announcement_id], content, preview_chars) for announcement_id in ids]
+
+    def fetch_contents(self, announcement_ids):
+        with self._lock:
+            return {announcement_id: self._rows[announcement_id][_CONTENT]
+                    for announcement_id in announcement_ids if announcement_id in self._rows}
+
+    def update_announcement(self, announcement_id, title, content, encode_revision):
+        with self._lock:
+            record = self._rows.get(announcement_id)
+            if record is None:
+                return False, None
+
+            revision = None
+            if (record[_TITLE], record[_CONTENT]) != (title, content):
+                history = self._revisions.setdefault(announcement_id, [])
+                revision = len(history) + 1
+                snapshot, body = encode_revision(record[_CONTENT], content, revision)
+                history.append((revision, record[_TITLE], int(snapshot), body, record[_UPDATED_AT]))
+                self._write_grams(announcement_id, title, content)
+
+            record[_TITLE] = title
+            record[_CONTENT] = content
+            record[_UPDATED_AT] = _utc_now()
+            self._changed()
+            return True, revision
+
+    def set_deleted(self, announcement_id, deleted):
+        with self._lock:
+            record = self._rows.get(announcement_id)
+            if record is None:
+                return False
+            if deleted and record[_DELETED_AT] is None:
+                self._unindex(record)
+            elif not deleted and record[_DELETED_AT] is not None:
+                self._index(record)
+            record[_DELETED_AT] = _utc_now() if deleted else None
+            self._changed()
+            return True
+
+    def delete_announcement(self, announcement_id):
+        with self._lock:
+            record = self._rows.pop(announcement_id, None)
+            if record is None:
+                return False
+            if record[_DELETED_AT] is None:
+                self._unindex(record)
+            self._write_channels(announcement_id, [])
+            self._revisions.pop(announcement_id, None)
+            self._write_grams(announcement_id, None, None)
+            self._changed()
+            return True
+
+    def expire_announcements(self, now):
+        now_text = str(now)
+        with self._lock:
+            # 已到期的公告正好是过期索引的一段前缀
+            end = bisect.bisect_right(self._expiry_index, (now_text, _MAX_ID))
+            expired_ids = [announcement_id for _, announcement_id in self._expiry_index[:end]]
+            del self._expiry_index[:end]
+            deleted_at = _utc_now()
+            for announcement_id in expired_ids:
+                record = self._rows[announcement_id]
+                # 过期索引项已经移除，_unindex 只会移除发布索引项
+                self._unindex(record)
+                record[_DELETED_AT] = deleted_at
+            if expired_ids:
+                self._changed()
+            return expired_ids
+
+    def published_between(self, after, until):
+        with self._lock:
+            start = bisect.bisect_right(self._publish_index, (str(after), _MAX_ID))
+            end = bisect.bisect_right(self._publish_index, (str(until), _MAX_ID))
+            return [announcement_id for _, announcement_id in self._publish_index[start:end]]
+
+    def next_due_time(self, now):
+        now_text = str(now)
+        with self._lock:
+            due_times = []
+            for index in (self._publish_index, self._expiry_index):
+                position = bisect.bisect_right(index, (now_text, _MAX_ID))
+                if position < len(index):
+                    due_times.append(datetime.fromisoformat(index[position][0]))
+        return min(due_times) if due_times else None
+
+    def statistics(self, now):
+        now_text = str(now)
+        stats = dict.fromkeys(('total', 'active', 'scheduled', 'expired', 'deleted'), 0)
+        with self._lock:
+            stats['total'] = len(self._rows)
+            for record in self._rows.values():
+                if record[_DELETED_AT] is not None:
+                    stats['deleted'] += 1
+                    continue
+                if self._visible(record, now_text):
+                    stats['active'] += 1
+                if record[_PUBLISH_AT] is not None and record[_PUBLISH_AT] > now_text:
+                    stats['scheduled'] += 1
+                if record[_EXPIRES_AT] is not None and record[_EXPIRES_AT] <= now_text:
+                    stats['expired'] += 1
+        return stats
+
+    def active_ids(self, now):
+        now_text = str(now)
+        visible_ids = []
+        pending_ids = []
+        with self._lock:
+            for announcement_id, record in self._rows.items():
+                if record[_DELETED_AT] is not None or record[_PUBLISH_AT] is None:
+                    continue
+                if record[_EXPIRES_AT] is not None and record[_EXPIRES_AT] <= now_text:
+                    continue
+                if record[_PUBLISH_AT] <= now_text:
+                    visible_ids.append(announcement_id)
+                else:
+                    pending_ids.append(announcement_id)
+        return visible_ids, pending_ids, self.next_due_time(now)
+
+    def data_version(self):
+        return self._version
+
+    # ---- 频道 ----
+
+    def _write_channels(self, announcement_id, channels):
+        for channel in self._channels.pop(announcement_id, ()):
+            ids = self._channel_index[channel]
+            del ids[bisect.bisect_left(ids, announcement_id)]
+            if not ids:
+                del self._channel_index[channel]
+        if channels:
+            self._channels[announcement_id] = tuple(sorted(channels))
+            for channel in channels:
+                bisect.insort(self._channel_index.setdefault(channel, []), announcement_id)
+
+    def set_channels(self, announcement_id, channels):
+        with self._lock:
+            if announcement_id not in self._rows:
+                return False
+            self._write_channels(announcement_id, channels)
+            self._changed()
+            return True
+
+    def get_channels(self, announcement_id):
+        with self._lock:
+            return list(self._channels.get(announcement_id, ()))
+
+    def _iter_channel_ids(self, ids, before_id, now_text):
+        """按ID倒序遍历一个频道中的可见公告"""
+        end = bisect.bisect_left(ids, before_id) if before_id is not None else len(ids)
+        for position in range(end - 1, -1, -1):
+            if self._visible(self._rows[ids[position]], now_text):
+                yield ids[position]
+
+    def channel_announcement_ids(self, channels, limit, before_id, now):
+        now_text = str(now)
+        with self._lock:
+            iterators = [self._iter_channel_ids(self._channel_index[channel], before_id, now_text)
+                         for channel in channels if channel in self._channel_index]
+            result = []
+            for announcement_id in heapq.merge(*iterators, reverse=True):
+                if result and result[-1] == announcement_id:
+                    continue
+                result.append(announcement_id)
+                if len(result) >= limit:
+                    break
+            return result
+
+    # ---- 历史版本 ----
+
+    def revision_history(self, announcement_id):
+        with self._lock:
+            record = self._rows.get(announcement_id)
+            if record is None:
+                return []
+            history = self._revisions.get(announcement_id, [])
+            return [(len(history) + 1, record[_TITLE], record[_UPDATED_AT])] + [
+                (revision, title, created_at) for revision, title, _, _, created_at in reversed(history)
+            ]
+
+    def revision_chain(self, announcement_id, revision):
+        with self._lock:
+            record = self._rows.get(announcement_id)
+            if record is None:
+                return None
+            current = (record[_TITLE], record[_CONTENT], record[_UPDATED_AT])
+            history = self._revisions.get(announcement_id, [])
+            current_revision = len(history) + 1
+            if not 1 <= revision < current_revision:
+                return current, current_revision, []
+
+            # 版本号从1连续编号，第 n 个版本位于 history[n - 1]
+            upper = next((row[0] for row in history[revision - 1:] if row[2]), current_revision - 1)
+            return current, current_revision, history[revision - 1:upper][::-1]
+
+    # ---- 模糊搜索 ----
+
+    def _write_grams(self, announcement_id, title, content):
+        """重建公告的 n-gram 索引，title 和 content 为 None 时只移除"""
+        for postings, grams in zip(self._gram_postings, self._record_grams.pop(announcement_id, ((), ()))):
+            for gram in grams:
+                ids = postings[gram]
+                ids.discard(announcement_id)
+                if not ids:
+                    del postings[gram]
+        if title is None:
+            return
+        record_grams = (text_grams(title), text_grams(content))
+        self._record_grams[announcement_id] = record_grams
+        for postings, grams in zip(self._gram_postings, record_grams):
+            for gram in grams:
+                postings.setdefault(gram, set()).add(announcement_id)
+
+    def fuzzy_match_counts(self, grams, min_matches, search_title, search_content, visible_only, now):
+        fields = [field for field, enabled in enumerate((search_title, search_content)) if enabled]
+        if not fields or len(grams) < min_matches:
+            return {}
+        now_text = str(now)
+        with self._lock:
+            def postings(gram):
+                return [self._gram_postings[field].get(gram, ()) for field in fields]
+
+            # 与 SQLite 后端相同：候选只取自最稀有的 len(grams) - min_matches + 1 个 n-gram
+            rare = sorted(grams, key=lambda gram: sum(len(ids) for ids in postings(gram)))
+            candidates = set()
+            for gram in rare[:len(grams) - min_matches + 1]:
+                for ids in postings(gram):
+                    candidates.update(ids)
+
+            counts = {}
+            for announcement_id in candidates:
+                record = self._rows[announcement_id]
+                if visible_only:
+                    if not self._visible(record, now_text):
+                        continue
+                elif record[_DELETED_AT] is not None:
+                    continue
+                record_grams = self._record_grams[announcement_id]
+                matched = len(grams & set().union(*(record_grams[field] for field in fields)))
+                if matched >= min_matches:
+                    counts[announcement_id] = matched
+            return counts
+
+    # ---- 已读回执 ----
+
+    def get_receipt(self, user_id):
+        with self._lock:
+            return self._receipts.get(user_id)
+
+    def update_receipt(self, user_id, update, version=None):
+        with self._lock:
+            if version is not None and version != self._version:
+                return False
+            self._receipts[user_id] = update(self._receipts.get(user_id))
+            return True
@@ -0,0 +1,792 @@
+import json
+import queue
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from backends.base import StorageBackend
+from data.datainit import bump_announcement_version, ensure_schema
+from ngram import text_grams
+
+# 不含 content 的列（延迟加载时查询）
+_LAZY_COLUMNS = "id, title, created_at, updated_at, deleted_at, expires_at, publish_at"
+
+# 单条 UNION 语句包含的频道数（SQLite 复合查询默认最多 500 项）
+_CHANNELS_PER_QUERY = 400
+
+# 频道查询先在最新的 limit × 该倍数条公告中筛选
+_PROBE_ROWS_PER_RESULT = 20
+
+# 补建 n-gram 索引时每个写事务处理的公告数
+_INDEX_BATCH_SIZE = 500
+
+# 模糊搜索时按索引查找一个 (公告, 字段, n-gram) 的开销约为顺序读取一条倒排记录的倍数
+_PROBE_COST = 6
+
+# sqlite3.connect 默认的锁等待时间（毫秒），写事务结束后恢复为该值
+_DEFAULT_BUSY_TIMEOUT_MS = 5000
+
+
+class WriteTimeoutError(sqlite3.OperationalError):
+    """写事务在截止时间内未能获得数据库写锁"""
+
+
+def _is_lock_error(error):
+    """判断是否为写锁被占用导致的错误（database is locked / busy）"""
+    message = str(error)
+    return 'locked' in message or 'busy' in message
+
+
+def _visible_clause(alias=''):
+    """可见性窗口：已发布、未过期且未删除（参数依次为两个当前时间）"""
+    p = f"{alias}." if alias else ""
+    return f"{p}deleted_at IS NULL AND {p}publish_at <= ? AND ({p}expires_at IS NULL OR {p}expires_at > ?)"
+
+
+def _field_grams(title, content):
+    """公告标题（field 0）和正文（field 1）的 n-gram，返回 [(gram, field), ...]"""
+    return [(gram, field) for field, text in enumerate((title, content)) for gram in text_grams(text)]
+
+
+def _select_columns(content, preview_chars):
+    """返回查询使用的列清单及附加参数"""
+    if content:
+        return "*", []
+    if preview_chars:
+        # 多取一个字符用于判断预览是否被截断
+        return f"{_LAZY_COLUMNS}, substr(content, 1, ?)", [preview_chars + 1]
+    return _LAZY_COLUMNS, []
+
+
+class _PooledConnection:
+    """连接池借出的连接：close() 回滚未提交的事务并归还连接，而不是关闭它"""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn)
+
+
+class _ConnectionPool:
+    """
+    固定容量的 SQLite 连接池。
+
+    空闲连接后进先出，最近用过的连接页缓存更热；池空时新建连接，归还时
+    超出容量的连接直接关闭，因此借出不会阻塞。
+    """
+
+    def __init__(self, db_path, size):
+        self._db_path = db_path
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = sqlite3.connect(self._db_path, check_same_thread=False)
+        return _PooledConnection(self, conn)
+
+    def release(self, conn):
+        try:
+            conn.rollback()
+            self._idle.put_nowait(conn)
+        except (sqlite3.Error, queue.Full):
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class SQLiteBackend(StorageBackend):
+    """基于 SQLite 数据库文件的存储后端，默认每次操作使用一个新连接"""
+
+    def __init__(self, db_path='announcements.db', pool_size=0, write_deadline=10.0, busy_timeout=0.1,
+                 retry_base_delay=0.005, retry_max_delay=0.5):
+        """
+        Args:
+            db_path (str): 数据库文件路径。默认为 'announcements.db'.
+            pool_size (int): 保留的空闲连接数，0 表示不复用连接
+            write_deadline (float): 一次写入等待写锁的总时长（秒），超时抛出 WriteTimeoutError
+            busy_timeout (float): 每次尝试获取写锁时 SQLite 内部的等待时间（秒）
+            retry_base_delay (float): 第一次重试前的最长退避时间（秒），之后每次翻倍
+            retry_max_delay (float): 单次退避时间的上限（秒）
+        """
+        self.db_path = db_path
+        self._pool = _ConnectionPool(db_path, pool_size) if pool_size > 0 else None
+        self.write_deadline = write_deadline
+        self.busy_timeout = busy_timeout
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self._write_stats = {'writes': 0, 'retries': 0, 'timeouts': 0}
+        self._write_stats_lock = threading.Lock()
+        # 用于读取公告数据版本号的长连接
+        self._version_conn = None
+        self._version_lock = threading.Lock()
+        # 模糊搜索前已补建过索引的最大公告ID
+        self._synced_through = None
+
+        conn = self._get_connection()
+        try:
+            ensure_schema(conn)
+        finally:
+            conn.close()
+
+    def _get_connection(self):
+        """获取数据库连接[3,7](@ref)"""
+        if self._pool is not None:
+            return self._pool.acquire()
+        return sqlite3.connect(self.db_path)
+
+    def _count(self, name):
+        with self._write_stats_lock:
+            self._write_stats[name] += 1
+
+    def _write(self, func):
+        """
+        在写事务中执行 func(cursor) 并提交，返回 func 的结果。
+
+        事务以 BEGIN IMMEDIATE 开始，在读取前就获取写锁，避免事务中途升级
+        为写锁时失败。写锁被占用时回滚并按带抖动的指数退避重试（每次在
+        [0, min(retry_max_delay, retry_base_delay × 2^n)] 中随机等待），直到
+        write_deadline 用完后抛出 WriteTimeoutError。重试会重新执行 func，
+        func 只能在事务内读写数据。
+        """
+        deadline = time.monotonic() + self.write_deadline
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            conn = self._get_connection()
+            try:
+                conn.execute(f"PRAGMA busy_timeout = {int(max(min(self.busy_timeout, remaining), 0) * 1000)}")
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                result = func(cursor)
+                conn.commit()
+                self._count('writes')
+                return result
+            except sqlite3.OperationalError as e:
+                if not _is_lock_error(e):
+                    raise
+                if time.monotonic() >= deadline:
+                    self._count('timeouts')
+                    raise WriteTimeoutError(
+                        f"{self.write_deadline} 秒内未能获得数据库写锁（已重试 {attempt} 次）: {e}"
+                    ) from e
+            finally:
+                if self._pool is not None:
+                    # 归还连接前恢复默认等待时间，供后续读取使用
+                    conn.execute(f"PRAGMA busy_timeout = {_DEFAULT_BUSY_TIMEOUT_MS}")
+                conn.close()
+
+            attempt += 1
+            self._count('retries')
+            delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+            time.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+
+    def write_statistics(self):
+        with self._write_stats_lock:
+            return dict(self._write_stats)
+
+    # ---- 公告 ----
+
+    def insert_announcement(self, title, content, expires_at, publish_at, channels):
+        # n-gram 在事务外切分，缩短写锁的持有时间
+        grams = _field_grams(title, content)
+
+        def insert(cursor):
+            cursor.execute(
+                "INSERT INTO announcements (title, content, expires_at, publish_at) VALUES (?, ?, ?, ?)",
+                (title, content, expires_at, publish_at)
+            )
+            announcement_id = cursor.lastrowid
+            self._write_channels(cursor, announcement_id, channels)
+            self._write_grams(cursor, announcement_id, grams)
+            bump_announcement_version(cursor)
+            return announcement_id
+
+        return self._write(insert)
+
+    def get_announcement(self, announcement_id):
+        conn = self._get_connection()
+        try:
+            return conn.execute("SELECT * FROM announcements WHERE id = ?", (announcement_id,)).fetchone()
+        finally:
+            conn.close()
+
+    def list_announcements(self, include_deleted, visible_only, now, content=True, preview_chars=0):
+        columns, params = _select_columns(content, preview_chars)
+        if visible_only:
+            # 可见性窗口通过 idx_announcements_visibility 索引求值
+            sql = f"SELECT {columns} FROM announcements WHERE {_visible_clause()} ORDER BY created_at DESC, id DESC"
+            params += [now, now]
+        elif include_deleted:
+            # 包含所有公告，包括已软删除的
+            sql = f"SELECT {columns} FROM announcements ORDER BY created_at DESC, id DESC"
+        else:
+            # 只包含未删除的公告 (deleted_at IS NULL)
+            sql = f"SELECT {columns} FROM announcements WHERE deleted_at IS NULL ORDER BY created_at DESC, id DESC"
+
+        conn = self._get_connection()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def search_announcements(self, keyword, search_title, search_content, visible_only, now,
+                             content=True, preview_chars=0):
+        columns, params = _select_columns(content, preview_chars)
+        conditions = []
+
+        if search_title and search_content:
+            conditions.append("(title LIKE ? OR content LIKE ?)")
+            params.extend([f'%{keyword}%', f'%{keyword}%'])
+        elif search_title:
+            conditions.append("title LIKE ?")
+            params.append(f'%{keyword}%')
+        elif search_content:
+            conditions.append("content LIKE ?")
+            params.append(f'%{keyword}%')
+
+        if visible_only:
+            conditions.append(_visible_clause())
+            params.extend([now, now])
+        else:
+            conditions.append("deleted_at IS NULL")
+
+        where_clause = " AND ".join(conditions)
+        conn = self._get_connection()
+        try:
+            return conn.execute(
+                f"SELECT {columns} FROM announcements WHERE {where_clause} ORDER BY created_at DESC, id DESC", params
+            ).fetchall()
+        finally:
+            conn.close()
+
+    def get_announcements(self, announcement_ids, order_by='created_at', content=True, preview_chars=0):
+        if not announcement_ids:
+            return []
+        columns, params = _select_columns(content, preview_chars)
+        order = "id DESC" if order_by == 'id' else "created_at DESC, id DESC"
+        conn = self._get_connection()
+        try:
+            return conn.execute(
+                f"SELECT {columns} FROM announcements WHERE id IN (SELECT value FROM json_each(?)) ORDER BY {order}",
+                params + [json.dumps(list(announcement_ids))]
+            ).fetchall()
+        finally:
+            conn.close()
+
+    def fetch_contents(self, announcement_ids):
+        if not announcement_ids:
+            return {}
+        conn = self._get_connection()
+        try:
+            placeholders = ','.join('?' * len(announcement_ids))
+            cursor = conn.execute(
+                f"SELECT id, content FROM announcements WHERE id IN ({placeholders})",
+                announcement_ids
+            )
+            return dict(cursor.fetchall())
+        finally:
+            conn.close()
+
+    def _current_revision(self, cursor, announcement_id):
+        """当前版本号 = 已保存的历史版本数 + 1"""
+        return cursor.execute(
+            "SELECT COALESCE(MAX(revision), 0) + 1 FROM announcement_revisions WHERE announcement_id = ?",
+            (announcement_id,)
+        ).fetchone()[0]
+
+    def update_announcement(self, announcement_id, title, content, encode_revision):
+        grams = _field_grams(title, content)
+
+        # 读取旧版本与写入在同一个写事务中，避免并发更新丢失历史版本
+        def update(cursor):
+            row = cursor.execute(
+                "SELECT title, content, updated_at FROM announcements WHERE id = ?",
+                (announcement_id,)
+            ).fetchone()
+            if row is None:
+                return False, None
+
+            old_title, old_content, old_updated_at = row
+            revision = None
+            if (old_title, old_content) != (title, content):
+                revision = self._current_revision(cursor, announcement_id)
+                snapshot, body = encode_revision(old_content, content, revision)
+                cursor.execute(
+                    "INSERT INTO announcement_revisions "
+                    "(announcement_id, revision, title, snapshot, body, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (announcement_id, revision, old_title, int(snapshot), body, old_updated_at)
+                )
+                self._write_grams(cursor, announcement_id, grams)
+
+            cursor.execute(
+                """UPDATE announcements
+                   SET title      = ?,
+                       content    = ?,
+                       updated_at = CURRENT_TIMESTAMP
+                   WHERE id = ?""",
+                (title, content, announcement_id)
+            )
+            bump_announcement_version(cursor)
+            return True, revision
+
+        return self._write(update)
+
+    def set_deleted(self, announcement_id, deleted):
+        def mark(cursor):
+            if deleted:
+                cursor.execute(
+                    "UPDATE announcements SET deleted_at = CURRENT_TIMESTAMP WHERE id = ?", (announcement_id,)
+                )
+            else:
+                cursor.execute("UPDATE announcements SET deleted_at = NULL WHERE id = ?", (announcement_id,))
+            if cursor.rowcount == 0:
+                return False
+            bump_announcement_version(cursor)
+            return True
+
+        return self._write(mark)
+
+    def delete_announcement(self, announcement_id):
+        def delete(cursor):
+            cursor.execute("DELETE FROM announcements WHERE id = ?", (announcement_id,))
+            deleted = cursor.rowcount > 0
+            cursor.execute("DELETE FROM announcement_channels WHERE announcement_id = ?", (announcement_id,))
+            cursor.execute("DELETE FROM announcement_revisions WHERE announcement_id = ?", (announcement_id,))
+            cursor.execute("DELETE FROM announcement_grams WHERE announcement_id = ?", (announcement_id,))
+            if deleted:
+                bump_announcement_version(cursor)
+            return deleted
+
+        return self._write(delete)
+
+    def expire_announcements(self, now):
+        expired_sql = "FROM announcements WHERE deleted_at IS NULL AND expires_at IS NOT NULL AND expires_at <= ?"
+        # 先不加锁地检查，没有过期公告时清理不占用写锁
+        conn = self._get_connection()
+        try:
+            if conn.execute(f"SELECT 1 {expired_sql} LIMIT 1", (now,)).fetchone() is None:
+                return []
+        finally:
+            conn.close()
+
+        def expire(cursor):
+            # 查找所有过期的公告（expires_at 为本地时间）
+            cursor.execute(f"SELECT id {expired_sql}", (now,))
+            expired_ids = [row[0] for row in cursor.fetchall()]
+
+            # 软删除过期公告
+            if expired_ids:
+                placeholders = ','.join('?' * len(expired_ids))
+                cursor.execute(
+                    f"UPDATE announcements SET deleted_at = datetime('now') WHERE id IN ({placeholders})",
+                    expired_ids
+                )
+                bump_announcement_version(cursor)
+            return expired_ids
+
+        return self._write(expire)
+
+    def published_between(self, after, until):
+        conn = self._get_connection()
+        try:
+            cursor = conn.execute(
+                "SELECT id FROM announcements WHERE deleted_at IS NULL AND publish_at > ? AND publish_at <= ?",
+                (after, until)
+            )
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    def next_due_time(self, now):
+        conn = self._get_connection()
+        try:
+            next_publish, = conn.execute(
+                "SELECT MIN(publish_at) FROM announcements WHERE deleted_at IS NULL AND publish_at > ?",
+                (now,)
+            ).fetchone()
+            next_expiry, = conn.execute(
+                "SELECT MIN(expires_at) FROM announcements "
+                "WHERE deleted_at IS NULL AND expires_at IS NOT NULL AND expires_at > ?",
+                (now,)
+            ).fetchone()
+        finally:
+            conn.close()
+
+        due_times = [datetime.fromisoformat(value) for value in (next_publish, next_expiry) if value]
+        return min(due_times) if due_times else None
+
+    def statistics(self, now):
+        conn = self._get_connection()
+        try:
+            row = conn.execute(
+                f"""SELECT COUNT(*),
+                          COALESCE(SUM({_visible_clause()}), 0),
+                          COALESCE(SUM(deleted_at IS NULL AND publish_at > ?), 0),
+                          COALESCE(SUM(deleted_at IS NULL AND expires_at IS NOT NULL AND expires_at <= ?), 0),
+                          COALESCE(SUM(deleted_at IS NOT NULL), 0)
+                   FROM announcements""",
+                (now, now, now, now)
+            ).fetchone()
+        finally:
+            conn.close()
+        return dict(zip(('total', 'active', 'scheduled', 'expired', 'deleted'), row))
+
+    def active_ids(self, now):
+        conn = self._get_connection()
+        try:
+            rows = conn.execute(
+                "SELECT id, publish_at, expires_at FROM announcements "
+                "WHERE deleted_at IS NULL AND (expires_at IS NULL OR expires_at > ?) ORDER BY id",
+                (now,)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        now_text = str(now)
+        visible_ids = []
+        pending_ids = []
+        due_times = []
+        for announcement_id, publish_at, expires_at in rows:
+            if publish_at is None:
+                # 与 SQL 可见性条件一致：没有发布时间的公告不可见
+                continue
+            if publish_at <= now_text:
+                visible_ids.append(announcement_id)
+            else:
+                pending_ids.append(announcement_id)
+                due_times.append(publish_at)
+            if expires_at:
+                due_times.append(expires_at)
+        valid_until = datetime.fromisoformat(min(due_times)) if due_times else None
+        return visible_ids, pending_ids, valid_until
+
+    def data_version(self):
+        """读取 announcement_version 表：任何连接（包括其他进程）改写公告并提交后都会变化"""
+        with self._version_lock:
+            if self._version_conn is None:
+                self._version_conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            return self._version_conn.execute("SELECT version FROM announcement_version").fetchone()[0]
+
+    # ---- 频道 ----
+
+    def _write_channels(self, cursor, announcement_id, channels):
+        cursor.execute("DELETE FROM announcement_channels WHERE announcement_id = ?", (announcement_id,))
+        cursor.executemany(
+            "INSERT INTO announcement_channels (channel, announcement_id) VALUES (?, ?)",
+            [(channel, announcement_id) for channel in channels]
+        )
+
+    def set_channels(self, announcement_id, channels):
+        def replace(cursor):
+            if cursor.execute("SELECT 1 FROM announcements WHERE id = ?", (announcement_id,)).fetchone() is None:
+                return False
+            self._write_channels(cursor, announcement_id, channels)
+            bump_announcement_version(cursor)
+            return True
+
+        return self._write(replace)
+
+    def get_channels(self, announcement_id):
+        conn = self._get_connection()
+        try:
+            cursor = conn.execute(
+                "SELECT channel FROM announcement_channels WHERE announcement_id = ? ORDER BY channel",
+                (announcement_id,)
+            )
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    def _probe_channel_ids(self, conn, channels, limit, before_id, now):
+        """
+        在最新的一段公告（窗口）内按ID倒序筛选属于指定频道的可见公告。
+
+        Returns:
+            tuple: (窗口内命中的ID列表, 窗口内最小ID；窗口已覆盖全部公告时为 None)
+        """
+        window = limit * _PROBE_ROWS_PER_RESULT
+        cursor_clause = "WHERE id < ? " if before_id is not None else ""
+        cursor_params = [before_id] if before_id is not None else []
+        # +c.channel 禁止按频道逐个探测索引：每条公告只有少数频道，逐行比对频道集合更快
+        ids = [row[0] for row in conn.execute(
+            "SELECT a.id FROM (SELECT id, deleted_at, publish_at, expires_at FROM announcements "
+            f"{cursor_clause}ORDER BY id DESC LIMIT ?) a "
+            f"WHERE {_visible_clause('a')} AND EXISTS (SELECT 1 FROM announcement_channels c "
+            "WHERE c.announcement_id = a.id AND +c.channel IN (SELECT value FROM json_each(?))) "
+            "ORDER BY a.id DESC LIMIT ?",
+            cursor_params + [window, now, now, json.dumps(channels), limit]
+        ).fetchall()]
+        if len(ids) >= limit:
+            return ids, None
+
+        window_ids = conn.execute(
+            f"SELECT MIN(id), COUNT(*) FROM (SELECT id FROM announcements {cursor_clause}ORDER BY id DESC LIMIT ?)",
+            cursor_params + [window]
+        ).fetchone()
+        return ids, (window_ids[0] if window_ids[1] >= window else None)
+
+    def _merge_channel_ids(self, conn, channels, limit, before_id, now):
+        """每个频道沿主键倒序取前 limit 条可见公告，合并去重后返回前 limit 个ID"""
+        cursor_clause = " AND c.announcement_id < ?" if before_id is not None else ""
+        subquery = (
+            "SELECT * FROM (SELECT c.announcement_id FROM announcement_channels c "
+            "JOIN announcements a ON a.id = c.announcement_id "
+            f"WHERE c.channel = ?{cursor_clause} AND {_visible_clause('a')} "
+            "ORDER BY c.announcement_id DESC LIMIT ?)"
+        )
+
+        ids = set()
+        for start in range(0, len(channels), _CHANNELS_PER_QUERY):
+            batch = channels[start:start + _CHANNELS_PER_QUERY]
+            params = []
+            for channel in batch:
+                params.append(channel)
+                if before_id is not None:
+                    params.append(before_id)
+                params.extend([now, now, limit])
+            params.append(limit)
+            cursor = conn.execute(" UNION ".join([subquery] * len(batch)) + " ORDER BY 1 DESC LIMIT ?", params)
+            ids.update(row[0] for row in cursor.fetchall())
+        return sorted(ids, reverse=True)[:limit]
+
+    def channel_announcement_ids(self, channels, limit, before_id, now):
+        """
+        先在最新的 limit × 20 条公告中筛选，频道覆盖面较广时一次即可取满；
+        否则对窗口以下的部分按频道合并：每个频道沿主键 (channel, announcement_id)
+        倒序只取前 limit 条可见公告，在一条 UNION 语句中合并去重。两步的代价
+        均与公告总数无关。
+        """
+        conn = self._get_connection()
+        try:
+            top_ids, window_low = self._probe_channel_ids(conn, channels, limit, before_id, now)
+            if len(top_ids) < limit and window_low is not None:
+                top_ids += self._merge_channel_ids(conn, channels, limit - len(top_ids), window_low, now)
+            return top_ids
+        finally:
+            conn.close()
+
+    # ---- 历史版本 ----
+
+    def revision_history(self, announcement_id):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            current = cursor.execute(
+                "SELECT title, updated_at FROM announcements WHERE id = ?", (announcement_id,)
+            ).fetchone()
+            if current is None:
+                return []
+            history = cursor.execute(
+                "SELECT revision, title, created_at FROM announcement_revisions "
+                "WHERE announcement_id = ? ORDER BY revision DESC",
+                (announcement_id,)
+            ).fetchall()
+            current_revision = history[0][0] + 1 if history else 1
+            return [(current_revision,) + current] + history
+        finally:
+            conn.close()
+
+    def revision_chain(self, announcement_id, revision):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            current = cursor.execute(
+                "SELECT title, content, updated_at FROM announcements WHERE id = ?", (announcement_id,)
+            ).fetchone()
+            if current is None:
+                return None
+            current_revision = self._current_revision(cursor, announcement_id)
+            if not 1 <= revision < current_revision:
+                return current, current_revision, []
+
+            snapshot_revision = cursor.execute(
+                "SELECT MIN(revision) FROM announcement_revisions "
+                "WHERE announcement_id = ? AND revision >= ? AND snapshot = 1",
+                (announcement_id, revision)
+            ).fetchone()[0]
+            upper = snapshot_revision if snapshot_revision is not None else current_revision - 1
+            rows = cursor.execute(
+                "SELECT revision, title, snapshot, body, created_at FROM announcement_revisions "
+                "WHERE announcement_id = ? AND revision BETWEEN ? AND ? ORDER BY revision DESC",
+                (announcement_id, revision, upper)
+            ).fetchall()
+            return current, current_revision, rows
+        finally:
+            conn.close()
+
+    # ---- 模糊搜索 ----
+
+    def _write_grams(self, cursor, announcement_id, grams):
+        """用 _field_grams 的结果重建公告的 n-gram 索引"""
+        cursor.execute("DELETE FROM announcement_grams WHERE announcement_id = ?", (announcement_id,))
+        cursor.executemany(
+            "INSERT INTO announcement_grams (gram, field, announcement_id) VALUES (?, ?, ?)",
+            [(gram, field, announcement_id) for gram, field in grams]
+        )
+
+    def fuzzy_match_counts(self, grams, min_matches, search_title, search_content, visible_only, now):
+        fields = [field for field, enabled in enumerate((search_title, search_content)) if enabled]
+        if not fields or len(grams) < min_matches:
+            return {}
+        self._sync_if_behind()
+
+        grams_json = json.dumps(sorted(grams), ensure_ascii=False)
+        fields_json = json.dumps(fields)
+        conn = self._get_connection()
+        try:
+            frequencies = dict(conn.execute(
+                "SELECT gram, COUNT(*) FROM announcement_grams "
+                "WHERE gram IN (SELECT value FROM json_each(?)) AND field IN (SELECT value FROM json_each(?)) "
+                "GROUP BY gram",
+                (grams_json, fields_json)
+            ).fetchall())
+            # 公告最多缺少 len(grams) - min_matches 个查询 n-gram，因此必然包含最稀有的
+            # len(grams) - min_matches + 1 个之一：只从这些 n-gram 的倒排列表中取候选
+            rare = sorted(grams, key=lambda gram: frequencies.get(gram, 0))[:len(grams) - min_matches + 1]
+            rare = [gram for gram in rare if gram in frequencies]
+            if not rare:
+                return {}
+
+            if visible_only:
+                visibility, visibility_params = _visible_clause('a'), [now, now]
+            else:
+                visibility, visibility_params = "a.deleted_at IS NULL", []
+            candidates = sum(frequencies[gram] for gram in rare)
+            if candidates * len(fields) * len(grams) * _PROBE_COST > sum(frequencies.values()):
+                # 候选很多（查询 n-gram 都很常见）时顺序扫描全部查询 n-gram 的倒排列表直接计数，
+                # 比逐个候选查索引快
+                rows = conn.execute(
+                    "SELECT m.announcement_id, m.matched FROM ("
+                    "  SELECT announcement_id, COUNT(DISTINCT gram) AS matched FROM announcement_grams "
+                    "  WHERE gram IN (SELECT value FROM json_each(?)) AND field IN (SELECT value FROM json_each(?)) "
+                    "  GROUP BY announcement_id HAVING matched >= ?) m "
+                    f"JOIN announcements a ON a.id = m.announcement_id WHERE {visibility}",
+                    [grams_json, fields_json, min_matches] + visibility_params
+                ).fetchall()
+                return dict(rows)
+            # 候选公告按 (announcement_id, field, gram) 索引逐个计数，不扫描常见 n-gram 的整个倒排列表
+            rows = conn.execute(
+                "WITH candidates AS MATERIALIZED ("
+                "  SELECT DISTINCT announcement_id FROM announcement_grams "
+                "  WHERE gram IN (SELECT value FROM json_each(?)) AND field IN (SELECT value FROM json_each(?))) "
+                "SELECT c.announcement_id, "
+                "  (SELECT COUNT(DISTINCT g.gram) FROM announcement_grams g INDEXED BY idx_announcement_grams_announcement "
+                "   WHERE g.announcement_id = c.announcement_id AND g.field IN (SELECT value FROM json_each(?)) "
+                "   AND g.gram IN (SELECT value FROM json_each(?))) AS matched "
+                f"FROM candidates c JOIN announcements a ON a.id = c.announcement_id WHERE {visibility} "
+                "AND matched >= ?",
+                [json.dumps(rare, ensure_ascii=False), fields_json] + [fields_json, grams_json]
+                + visibility_params + [min_matches]
+            ).fetchall()
+            return dict(rows)
+        finally:
+            conn.close()
+
+    def _sync_if_behind(self):
+        """刚升级的旧数据库或最新的公告尚无索引时（如直接用 SQL 追加公告之后）补建索引"""
+        conn = self._get_connection()
+        try:
+            latest, indexed, pending = conn.execute(
+                "SELECT (SELECT MAX(id) FROM announcements), (SELECT MAX(announcement_id) FROM announcement_grams), "
+                "(SELECT through_id FROM search_index_pending)"
+            ).fetchone()
+        finally:
+            conn.close()
+        if pending is not None:
+            self.sync_search_index()
+            self._synced_through = latest
+        # 没有任何 n-gram 的公告（如只含标点）永远补建不出索引，记下已检查过的ID避免每次全表扫描
+        elif latest is not None and latest != indexed and latest != self._synced_through:
+            self.sync_search_index()
+            self._synced_through = latest
+
+    def sync_search_index(self):
+        """
+        为没有 n-gram 索引的公告补建索引（每批一个写事务），返回补建的公告数。
+
+        通过 SQL 直接插入的公告和升级前的旧公告由此补建，全部补建后删除升级时的
+        待补建标记；直接改写或删除的公告不会被检测到，其中已删除公告的索引在查询时
+        因关联不到公告而被忽略。
+        """
+        indexed = 0
+        last_id = 0
+        while True:
+            conn = self._get_connection()
+            try:
+                rows = conn.execute(
+                    "SELECT id, title, content FROM announcements a WHERE id > ? AND NOT EXISTS "
+                    "(SELECT 1 FROM announcement_grams g WHERE g.announcement_id = a.id) ORDER BY id LIMIT ?",
+                    (last_id, _INDEX_BATCH_SIZE)
+                ).fetchall()
+                pending = not rows and conn.execute("SELECT 1 FROM search_index_pending").fetchone()
+            finally:
+                conn.close()
+            if not rows:
+                if pending:
+                    self._write(lambda cursor: cursor.execute("DELETE FROM search_index_pending"))
+                return indexed
+            grams = [(gram, field, announcement_id) for announcement_id, title, content in rows
+                     for gram, field in _field_grams(title, content)]
+
+            def index(cursor):
+                # 可能与其他连接同时补建，忽略已存在的索引项
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO announcement_grams (gram, field, announcement_id) VALUES (?, ?, ?)", grams
+                )
+
+            self._write(index)
+            indexed += len(rows)
+            last_id = rows[-1][0]
+
+    # ---- 已读回执 ----
+
+    def get_receipt(self, user_id):
+        conn = self._get_connection()
+        try:
+            return conn.execute(
+                "SELECT watermark, exceptions FROM read_receipts WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+
+    def update_receipt(self, user_id, update, version=None):
+        # 在写事务中读改写，避免同一用户的并发标记互相覆盖
+        def write(cursor):
+            if version is not None and cursor.execute(
+                    "SELECT version FROM announcement_version").fetchone()[0] != version:
+                return False
+            row = cursor.execute(
+                "SELECT watermark, exceptions FROM read_receipts WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            watermark, exceptions = update(row)
+            cursor.execute(
+                "INSERT OR REPLACE INTO read_receipts (user_id, watermark, exceptions) VALUES (?, ?, ?)",
+                (user_id, watermark, exceptions)
+            )
+            return True
+
+        return self._write(write)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+        with self._version_lock:
+            if self._version_conn is not None:
+                self._version_conn.close()
+                self._version_conn = None
@@ -0,0 +1,119 @@
+"""
+存储后端对比基准测试。
+
+对 SQLiteBackend（临时数据库文件）和 MemoryBackend 执行同一组操作，测量
+各操作的耗时，并逐项比较两个后端的查询结果（忽略 created_at 等写入时间）。
+
+用法:
+    python benchmarks/bench_backends.py [--rows 20000] [--repeat 50]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AnnouncementManager import AnnouncementManager  # noqa: E402
+from backends import MemoryBackend, SQLiteBackend  # noqa: E402
+
+CHANNELS = [f"ch{index:02d}" for index in range(40)]
+
+
+def populate(manager, rows, seed=7):
+    """写入 rows 条公告：约10%定时发布、10%已过期，其余随机设置有效期和频道"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    started = time.perf_counter()
+    for index in range(rows):
+        roll = rng.random()
+        publish_at = now + timedelta(hours=rng.randint(1, 48)) if roll < 0.1 else None
+        expires_after_hours = -1 if roll > 0.9 else rng.choice([None, 24, 72])
+        manager.create_announcement(
+            f"公告 {index}", f"第 {index} 条公告的内容，关键词 kw{index % 97}。" * rng.randint(1, 5),
+            expires_after_hours=expires_after_hours, publish_at=publish_at,
+            channels=rng.sample(CHANNELS, rng.randint(0, 2))
+        )
+    return time.perf_counter() - started
+
+
+def measure(func, repeat):
+    """返回 (中位数毫秒, 最后一次的结果)"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def normalize(value):
+    """去掉公告行中由写入时间决定的列，便于比较两个后端的结果"""
+    if isinstance(value, list):
+        return [normalize(item) for item in value]
+    if isinstance(value, tuple) and len(value) == 8:
+        return value[:3] + (value[5] is not None,)
+    return value
+
+
+def workload(manager, rows, repeat):
+    """返回 [(操作名, 中位数毫秒, 结果)]"""
+    rng = random.Random(11)
+    ids = [row[0] for row in manager.get_all_announcements(include_deleted=True)]
+    results = []
+
+    def run(name, func, times=repeat):
+        elapsed, result = measure(func, times)
+        results.append((name, elapsed, normalize(result)))
+
+    run("get_all_announcements(visible_only)", lambda: manager.get_all_announcements(visible_only=True))
+    run("get_all_announcements(lazy, preview)",
+        lambda: [record.preview for record in manager.get_all_announcements(lazy=True, preview_chars=40)])
+    run("search_announcements('kw13')", lambda: manager.search_announcements("kw13"))
+    run("get_announcements_for_channels(3)",
+        lambda: manager.get_announcements_for_channels(CHANNELS[:3], limit=20))
+    run("get_statistics", manager.get_statistics)
+    run("get_announcement_by_id", lambda: manager.get_announcement_by_id(ids[len(ids) // 2]))
+    run("update_announcement",
+        lambda: manager.update_announcement(ids[0], "更新", f"修改后的内容 {rng.random()}"))
+    run("get_revision(1)", lambda: manager.get_revision(ids[0], 1)[1:3])
+    run("mark_read", lambda: manager.mark_read("u1", rng.sample(ids, 5)))
+    run("unread_count", lambda: manager.unread_count("u1"))
+    run("check_and_delete_expired", manager.check_and_delete_expired, 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="存储后端对比基准测试")
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    backends = [
+        ("sqlite", SQLiteBackend(os.path.join(tempfile.mkdtemp(), 'bench_backends.db'))),
+        ("memory", MemoryBackend()),
+    ]
+    reports = []
+    for name, backend in backends:
+        manager = AnnouncementManager(backend=backend)
+        elapsed = populate(manager, args.rows)
+        print(f"{name}: 写入 {args.rows} 条公告用时 {elapsed:.2f} 秒")
+        reports.append(workload(manager, args.rows, args.repeat))
+
+    print(f"\n{'操作':<40}{'sqlite (ms)':>12}{'memory (ms)':>12}  结果一致")
+    mismatches = 0
+    for (name, sqlite_ms, sqlite_result), (_, memory_ms, memory_result) in zip(*reports):
+        same = sqlite_result == memory_result
+        mismatches += not same
+        print(f"{name:<40}{sqlite_ms:>12.3f}{memory_ms:>12.3f}  {'是' if same else '否'}")
+    if mismatches:
+        sys.exit(f"{mismatches} 项操作的结果不一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+频道定向查询基准测试。
+
+生成 N 条公告（默认100万条）并随机投放到若干频道，对比按频道合并查询
+get_announcements_for_channels 与朴素的 IN 子查询在不同频道数下的延迟。
+
+用法:
+    python benchmarks/bench_channels.py [--rows 1000000] [--channels 1000] [--db 路径]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AnnouncementManager import AnnouncementManager, GLOBAL_CHANNEL  # noqa: E402
+from data.datainit import ensure_schema  # noqa: E402
+
+
+def build_database(db_path, rows, channel_count, seed=42):
+    """生成测试数据：约5%全员可见，其余投放到1-3个频道，约10%已过期或待发布"""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    ensure_schema(conn)
+    now = datetime.now()
+    past = str(now - timedelta(days=1))
+    future = str(now + timedelta(days=1))
+
+    batch = 50000
+    next_id = 1
+    while next_id <= rows:
+        upper = min(next_id + batch, rows + 1)
+        announcements = []
+        channels = []
+        for announcement_id in range(next_id, upper):
+            roll = rng.random()
+            expires_at = past if roll < 0.05 else None
+            publish_at = future if 0.05 <= roll < 0.1 else past
+            announcements.append((announcement_id, f"公告 {announcement_id}", "内容", expires_at, publish_at))
+            if rng.random() < 0.05:
+                channels.append((GLOBAL_CHANNEL, announcement_id))
+            else:
+                for channel in rng.sample(range(channel_count), rng.randint(1, 3)):
+                    channels.append((f"ch{channel:04d}", announcement_id))
+        conn.executemany(
+            "INSERT INTO announcements (id, title, content, expires_at, publish_at) VALUES (?, ?, ?, ?, ?)",
+            announcements
+        )
+        conn.executemany("INSERT INTO announcement_channels (channel, announcement_id) VALUES (?, ?)", channels)
+        conn.commit()
+        next_id = upper
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+
+
+def naive_query(db_path, channels, limit):
+    """对照组：IN 子查询取出全部匹配公告后排序"""
+    now = datetime.now()
+    placeholders = ','.join('?' * len(channels))
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            f"SELECT * FROM announcements WHERE id IN "
+            f"(SELECT announcement_id FROM announcement_channels WHERE channel IN ({placeholders})) "
+            f"AND deleted_at IS NULL AND publish_at <= ? AND (expires_at IS NULL OR expires_at > ?) "
+            f"ORDER BY id DESC LIMIT ?",
+            list(channels) + [now, now, limit]
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def measure(func, repeat):
+    """返回 (中位数毫秒, p95毫秒)"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="频道定向查询基准测试")
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--channels', type=int, default=1000)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--db', help="复用已生成的数据库文件")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), 'bench_channels.db')
+    if not os.path.exists(db_path):
+        started = time.perf_counter()
+        build_database(db_path, args.rows, args.channels)
+        print(f"生成 {args.rows} 条公告用时 {time.perf_counter() - started:.1f} 秒: {db_path}")
+
+    manager = AnnouncementManager(db_path)
+    rng = random.Random(7)
+    print(f"{'频道数':>6} {'合并查询 p50/p95 (ms)':>24} {'IN 子查询 p50/p95 (ms)':>24}")
+    # 频道数不超过生成的频道总数，重复的级别只测一次
+    for count in sorted({min(count, args.channels) for count in (1, 10, 100, 300, 800)}):
+        channels = [f"ch{channel:04d}" for channel in rng.sample(range(args.channels), count)]
+        fast = manager.get_announcements_for_channels(channels, limit=args.limit)
+        slow = naive_query(db_path, channels + [GLOBAL_CHANNEL], args.limit)
+        assert [row[0] for row in fast] == [row[0] for row in slow], "两种查询结果不一致"
+
+        fast_p50, fast_p95 = measure(
+            lambda: manager.get_announcements_for_channels(channels, limit=args.limit), args.repeat)
+        slow_p50, slow_p95 = measure(
+            lambda: naive_query(db_path, channels + [GLOBAL_CHANNEL], args.limit), args.repeat)
+        print(f"{count:>6} {fast_p50:>15.2f} / {fast_p95:<7.2f} {slow_p50:>15.2f} / {slow_p95:<7.2f}")
+
+
+if __name__ == "__main__":
+    main()
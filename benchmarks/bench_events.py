@@ -0,0 +1,141 @@
+"""
+公告事件推送基准测试。
+
+启动本地 HTTP 服务，建立若干 /events 事件流连接（其中一部分故意不读取），
+以固定速率发布事件，测量 publish() 的耗时、事件从发布到客户端收到的延迟，
+并检查不读取的客户端被断开后没有拖慢发布方和其他客户端。所有客户端连接
+在同一个线程中用 selectors 读取。
+
+用法:
+    python benchmarks/bench_events.py [--clients 2000] [--events 500] [--rate 50] [--stalled 20]
+"""
+import argparse
+import os
+import selectors
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AnnouncementManager import AnnouncementManager  # noqa: E402
+from http_api import EventBroadcaster, create_server  # noqa: E402
+
+
+def open_stream(port, stalled):
+    """建立事件流连接并读掉响应头；stalled 的连接缩小接收缓冲区且之后不再读取"""
+    sock = socket.create_connection(('127.0.0.1', port))
+    if stalled:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.sendall(b"GET /events HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n")
+    data = b""
+    while b"retry: 3000\n\n" not in data:
+        data += sock.recv(4096)
+    sock.setblocking(False)
+    return sock
+
+
+def read_streams(streams, published, expected, latencies, stop):
+    """读取所有正常客户端的事件，按 id 行计算投递延迟"""
+    selector = selectors.DefaultSelector()
+    buffers = {}
+    counts = {}
+    for sock in streams:
+        selector.register(sock, selectors.EVENT_READ)
+        buffers[sock] = b""
+        counts[sock] = 0
+    while not stop.is_set() and selector.get_map():
+        for key, _ in selector.select(0.5):
+            sock = key.fileobj
+            chunk = sock.recv(65536)
+            received = time.perf_counter()
+            if not chunk:
+                selector.unregister(sock)
+                continue
+            *lines, buffers[sock] = (buffers[sock] + chunk).split(b"\n")
+            for line in lines:
+                if line.startswith(b"id: "):
+                    latencies.append((received - published[int(line[4:])]) * 1000)
+                    counts[sock] += 1
+            if counts[sock] >= expected:
+                selector.unregister(sock)
+    return counts
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="公告事件推送基准测试")
+    parser.add_argument('--clients', type=int, default=2000)
+    parser.add_argument('--events', type=int, default=500)
+    parser.add_argument('--rate', type=int, default=50, help="每秒发布的事件数")
+    parser.add_argument('--stalled', type=int, default=20, help="不读取事件的客户端数量")
+    parser.add_argument('--payload', type=int, default=200, help="事件标题长度（字符）")
+    parser.add_argument('--max-pending', type=int, default=64 * 1024, help="每个连接允许积压的字节数")
+    args = parser.parse_args()
+
+    manager = AnnouncementManager(os.path.join(tempfile.mkdtemp(), 'bench_events.db'))
+    threading.stack_size(256 * 1024)
+    server = create_server(manager, port=0)
+    server.broadcaster = EventBroadcaster(manager.events, max_pending=args.max_pending)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    started = time.perf_counter()
+    streams = [open_stream(port, False) for _ in range(args.clients - args.stalled)]
+    stalled = [open_stream(port, True) for _ in range(args.stalled)]
+    while server.broadcaster.stream_count < args.clients:
+        time.sleep(0.05)
+    print(f"{args.clients} 个事件流连接已建立（其中 {args.stalled} 个不读取），"
+          f"用时 {time.perf_counter() - started:.1f} 秒")
+
+    published = {}
+    latencies = []
+    counts = {}
+    stop = threading.Event()
+    reader = threading.Thread(
+        target=lambda: counts.update(read_streams(streams, published, args.events, latencies, stop)),
+        daemon=True
+    )
+    reader.start()
+
+    title = "公" * args.payload
+    publish_times = []
+    interval = 1 / args.rate
+    started = time.perf_counter()
+    for index in range(args.events):
+        delay = started + index * interval - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        begin = time.perf_counter()
+        # 发布前记录时间：序号在发布时才分配，按下一序号登记
+        published[manager.events.latest_seq + 1] = begin
+        manager.events.publish('updated', id=index, title=title)
+        publish_times.append((time.perf_counter() - begin) * 1000)
+    elapsed = time.perf_counter() - started
+    reader.join(timeout=30)
+    stop.set()
+
+    print(f"发布 {args.events} 个事件用时 {elapsed:.2f} 秒（目标 {args.events / args.rate:.2f} 秒）")
+    print(f"publish()     p50 {statistics.median(publish_times):.3f} ms  "
+          f"p99 {percentile(publish_times, 0.99):.3f} ms  max {max(publish_times):.3f} ms")
+    complete = sum(1 for count in counts.values() if count >= args.events)
+    print(f"正常客户端: {complete}/{len(streams)} 收到全部事件")
+    print(f"投递延迟      p50 {percentile(latencies, 0.5):.3f} ms  p99 {percentile(latencies, 0.99):.3f} ms")
+    print(f"不读取的客户端: {args.stalled - (server.broadcaster.stream_count - len(streams))}/{args.stalled} "
+          f"因积压超过 {args.max_pending} 字节被断开")
+
+    for sock in streams + stalled:
+        sock.close()
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+模糊搜索基准测试。
+
+生成 N 条中英文混合的公告（默认10万条，词频服从 Zipf 分布），用 sync_search_index
+补建 n-gram 索引，然后对比精确搜索（LIKE 全表扫描）与模糊搜索的延迟和结果数。
+对含错别字的查询，同时报告模糊搜索对正确拼写的召回率（精确搜索正确拼写的
+结果中被模糊搜索找到的比例）。
+
+用法:
+    python benchmarks/bench_fuzzy_search.py [--rows 100000] [--vocabulary 5000] [--threshold 0.5] [--limit 20] [--db 路径]
+"""
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AnnouncementManager import AnnouncementManager  # noqa: E402
+from backends.sqlite import SQLiteBackend  # noqa: E402
+from data.datainit import ensure_schema  # noqa: E402
+
+LATIN_WORDS = [
+    "maintenance", "schedule", "quarterly", "meeting", "security", "update", "network", "outage",
+    "holiday", "payroll", "training", "deadline", "migration", "database", "server", "policy",
+    "reminder", "office", "parking", "elevator", "firewall", "backup", "release", "budget",
+    "conference", "workshop", "inventory", "compliance", "insurance", "benefits", "quarterly meeting",
+]
+CJK_WORDS = [
+    "系统", "维护", "通知", "会议", "安全", "升级", "网络", "中断", "假期", "工资", "培训", "截止",
+    "迁移", "数据库", "服务器", "制度", "提醒", "办公室", "停车", "电梯", "防火墙", "备份", "发布",
+    "预算", "年会", "盘点", "合规", "保险", "福利", "季度", "系统维护", "服务器迁移", "年终福利发放",
+]
+
+# (说明, 模糊搜索关键词, 精确搜索关键词)
+QUERIES = [
+    ("英文单词", "maintenance", "maintenance"),
+    ("英文错拼", "maintenence", "maintenance"),
+    ("英文双词错拼", "quartely meetng", "quarterly meeting"),
+    ("中文词组", "系统维护", "系统维护"),
+    ("中文错字", "年终福利发方", "年终福利发放"),
+    ("高频短词", "update", "update"),
+]
+
+
+def _vocabulary(rng, keywords, size, make_word):
+    """主题词加上随机生成的词共 size 个，返回 (词表, 累积权重)，第 k 个词的权重为 1/k（Zipf 分布）"""
+    words = dict.fromkeys(keywords)
+    while len(words) < size:
+        words[make_word()] = None
+    words = list(words)
+    rng.shuffle(words)
+    return words, list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+
+
+def build_database(db_path, rows, vocabulary, seed=42):
+    """生成测试数据：一半英文一半中文公告，标题3-6个词，正文20-60个词（主题词中含若干词组）"""
+    rng = random.Random(seed)
+    syllables = ["ka", "to", "ri", "men", "sa", "lo", "ver", "un", "di", "pre", "com", "tion", "al", "est"]
+    latin = _vocabulary(rng, LATIN_WORDS, vocabulary,
+                        lambda: "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    # 随机词只使用常用汉字区段，与主题词共享部分字
+    cjk = _vocabulary(rng, CJK_WORDS, vocabulary,
+                      lambda: "".join(chr(rng.randint(0x4e00, 0x4fff)) for _ in range(rng.randint(2, 3))))
+
+    conn = sqlite3.connect(db_path)
+    ensure_schema(conn)
+    batch = 50000
+    for lower in range(0, rows, batch):
+        announcements = []
+        for index in range(lower, min(lower + batch, rows)):
+            (words, cum_weights), separator = (latin, " ") if index % 2 == 0 else (cjk, "")
+            title = separator.join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(3, 6)))
+            content = separator.join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(20, 60)))
+            announcements.append((title, content))
+        conn.executemany("INSERT INTO announcements (title, content, publish_at) VALUES (?, ?, '2000-01-01')",
+                         announcements)
+        conn.commit()
+    conn.close()
+
+
+def measure(func, repeat):
+    """返回 (中位数毫秒, p95毫秒, 最后一次的结果)"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[max(0, int(len(samples) * 0.95) - 1)], result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模糊搜索基准测试")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--vocabulary', type=int, default=5000, help="每种语言的词汇量")
+    parser.add_argument('--threshold', type=float, default=0.5)
+    parser.add_argument('--limit', type=int, default=20, help="模糊搜索返回的结果数")
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--db', help="复用已生成的数据库文件")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), 'bench_fuzzy.db')
+    if not os.path.exists(db_path):
+        started = time.perf_counter()
+        build_database(db_path, args.rows, args.vocabulary)
+        print(f"生成 {args.rows} 条公告用时 {time.perf_counter() - started:.1f} 秒: {db_path}")
+
+    started = time.perf_counter()
+    indexed = SQLiteBackend(db_path).sync_search_index()
+    print(f"补建 {indexed} 条公告的 n-gram 索引用时 {time.perf_counter() - started:.1f} 秒")
+    conn = sqlite3.connect(db_path)
+    conn.execute("ANALYZE")
+    conn.commit()
+    entries = conn.execute("SELECT COUNT(*) FROM announcement_grams").fetchone()[0]
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    grams_bytes = sum(page_size for _ in conn.execute(
+        "SELECT pageno FROM dbstat WHERE name IN ('announcement_grams', 'idx_announcement_grams_announcement')"
+    )) if _has_dbstat(conn) else None
+    conn.close()
+    size = f"，约 {grams_bytes / 2 ** 20:.1f} MB" if grams_bytes else ""
+    print(f"索引项 {entries} 条{size}，数据库文件 {os.path.getsize(db_path) / 2 ** 20:.1f} MB\n")
+
+    manager = AnnouncementManager(db_path)
+    print(f"{'查询':<12} {'精确 p50/p95 (ms)':>20} {'结果数':>7} {'模糊 p50/p95 (ms)':>20} {'结果数':>7} {'召回率':>7}")
+    for label, fuzzy_keyword, exact_keyword in QUERIES:
+        exact_p50, exact_p95, exact = measure(
+            lambda: manager.search_announcements(exact_keyword), args.repeat)
+        fuzzy_p50, fuzzy_p95, fuzzy = measure(
+            lambda: manager.search_announcements(fuzzy_keyword, mode='fuzzy', threshold=args.threshold,
+                                                 limit=args.limit), args.repeat)
+        if fuzzy_keyword != exact_keyword:
+            # 召回率按不限结果数的模糊搜索计算
+            found = {hit[0] for hit in manager.search_announcements(fuzzy_keyword, mode='fuzzy',
+                                                                    threshold=args.threshold)}
+            expected = {row[0] for row in exact}
+            recall = f"{len(found & expected) / len(expected):.1%}" if expected else "-"
+        else:
+            recall = "-"
+        print(f"{label:<12} {exact_p50:>11.1f} / {exact_p95:<7.1f} {len(exact):>7} "
+              f"{fuzzy_p50:>11.1f} / {fuzzy_p95:<7.1f} {len(fuzzy):>7} {recall:>7}")
+
+
+def _has_dbstat(conn):
+    try:
+        conn.execute("SELECT 1 FROM dbstat LIMIT 1")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+导入耗时基准测试。
+
+1. 对每个模块运行 python -X importtime -c "import 模块"，报告模块的累计导入耗时
+   以及其中自身耗时最多的依赖（不含解释器启动时 site 已导入的模块）。
+2. 测量 cli.py stats 的端到端耗时，并与空解释器 python -c pass 对比。
+
+子进程允许写入字节码缓存，并先预热一次，测得的是部署环境中的正常启动耗时。
+
+用法:
+    python benchmarks/bench_import_time.py [--modules AnnouncementManager cli ...] [--top 8] [--repeat 15]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = ['AnnouncementManager', 'backends', 'cli', 'sharding', 'bulk_io', 'http_api']
+
+
+def _environment():
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    return env
+
+
+def import_profile(module, env):
+    """
+    Returns:
+        tuple: (模块累计耗时毫秒, [(自身耗时毫秒, 累计耗时毫秒, 模块名), ...])
+    """
+    command = [sys.executable, '-X', 'importtime', '-c', f'import {module}']
+    subprocess.run(command, cwd=ROOT, env=env, capture_output=True, check=True)
+    stderr = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, check=True).stderr
+
+    entries = []
+    after_site = False
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if name.strip() == 'site':
+            after_site = True
+            continue
+        if after_site:
+            entries.append((int(self_us) / 1000, int(cumulative_us) / 1000, name.rstrip()))
+    total = next(cumulative for _, cumulative, name in entries if name.strip() == module)
+    return total, entries
+
+
+def wall_time(command, env, repeat):
+    """运行 command repeat 次（另加一次预热），返回中位数毫秒"""
+    subprocess.run(command, cwd=ROOT, env=env, capture_output=True, check=True)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, env=env, capture_output=True, check=True)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入耗时基准测试")
+    parser.add_argument('--modules', nargs='+', default=DEFAULT_MODULES)
+    parser.add_argument('--top', type=int, default=8, help="每个模块显示的自身耗时最多的依赖数")
+    parser.add_argument('--repeat', type=int, default=15)
+    args = parser.parse_args()
+    env = _environment()
+
+    for module in args.modules:
+        total, entries = import_profile(module, env)
+        print(f"{module}: 累计 {total:.1f} ms")
+        for self_ms, cumulative_ms, name in sorted(entries, reverse=True)[:args.top]:
+            print(f"    自身 {self_ms:6.2f} ms  累计 {cumulative_ms:6.2f} ms  {name}")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_cli.db')
+    baseline = wall_time([sys.executable, '-c', 'pass'], env, args.repeat)
+    cli = wall_time([sys.executable, os.path.join(ROOT, 'cli.py'), '--db', db_path, 'stats'], env, args.repeat)
+    print(f"\npython -c pass      {baseline:6.1f} ms")
+    print(f"cli.py stats        {cli:6.1f} ms  （比空解释器多 {cli - baseline:.1f} ms）")
+
+
+if __name__ == "__main__":
+    main()
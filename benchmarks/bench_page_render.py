@@ -0,0 +1,121 @@
+"""
+Streamlit 页面渲染耗时基准测试。
+
+用 streamlit.testing.v1.AppTest 在无浏览器的情况下运行 AnnouncementManagerPage2.py，
+数据库分别预置 1k / 10k 条公告，测量首次运行、无变化重跑、切换排序、翻页
+几种交互的耗时以及页面元素数量。
+
+AppTest 每次交互都完整重跑脚本（不区分片段），因此这里测到的是整页重跑的
+上限；在浏览器中片段内的交互只重跑对应片段。可以用 --page 指定旧版本页面
+作对比，例如:
+    git show <commit>:AnnouncementManagerPage2.py > /tmp/page_old.py
+
+用法:
+    python benchmarks/bench_page_render.py [--rows 1000 10000] [--repeat 5] [--page 路径]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import streamlit as st  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from data.datainit import ensure_schema  # noqa: E402
+
+
+def build_database(db_path, rows, seed=1):
+    """生成 rows 条公告：约10%已删除、5%待发布、10%已过期"""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    ensure_schema(conn)
+    now = datetime.now()
+    records = []
+    for index in range(rows):
+        roll = rng.random()
+        publish_at = now - timedelta(days=1)
+        expires_at = now + timedelta(days=7)
+        deleted_at = None
+        if roll < 0.1:
+            deleted_at = str(now - timedelta(hours=1))
+        elif roll < 0.15:
+            publish_at = now + timedelta(days=1)
+        elif roll < 0.25:
+            expires_at = now - timedelta(hours=1)
+        records.append((f"公告 {index}", "内容" * rng.randint(20, 200), deleted_at,
+                        str(expires_at), str(publish_at)))
+    conn.executemany(
+        "INSERT INTO announcements (title, content, deleted_at, expires_at, publish_at) VALUES (?, ?, ?, ?, ?)",
+        records
+    )
+    conn.commit()
+    conn.close()
+
+
+def timed(action, repeat):
+    """执行 action repeat 次，返回 (中位数毫秒, 最后一次的 AppTest)"""
+    timings = []
+    app = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        app = action()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), app
+
+
+def bench(page_path, rows, repeat, timeout):
+    workdir = tempfile.mkdtemp()
+    # 页面使用默认的 announcements.db，在临时目录中运行
+    os.chdir(workdir)
+    build_database(os.path.join(workdir, 'announcements.db'), rows)
+    # 同一进程中的 AppTest 共享缓存，每个规模从空缓存开始
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+    app = AppTest.from_file(page_path, default_timeout=timeout)
+    started = time.perf_counter()
+    app.run()
+    first_run = (time.perf_counter() - started) * 1000
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    elements = len(app.markdown) + len(app.subheader)
+
+    rerun, _ = timed(lambda: app.run(), repeat)
+    sort_order = app.selectbox[0]
+    toggle, _ = timed(lambda: sort_order.set_value(
+        "最旧优先" if sort_order.value == "最新优先" else "最新优先").run(), repeat)
+
+    page_inputs = [widget for widget in app.number_input if widget.key == "list_page"]
+    if page_inputs:
+        paging, _ = timed(lambda: page_inputs[0].set_value(page_inputs[0].value % 3 + 1).run(), repeat)
+    else:
+        paging = None
+
+    print(f"{rows:>6} 行  首次 {first_run:8.1f} ms  重跑 {rerun:8.1f} ms  切换排序 {toggle:8.1f} ms  "
+          + (f"翻页 {paging:8.1f} ms  " if paging is not None else "翻页      - ms  ")
+          + f"元素数 {elements}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamlit 页面渲染耗时基准测试")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('--page', default=os.path.join(ROOT, 'AnnouncementManagerPage2.py'))
+    args = parser.parse_args()
+
+    page_path = os.path.abspath(args.page)
+    for rows in args.rows:
+        bench(page_path, rows, args.repeat, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+已读回执基准测试。
+
+生成若干公告（部分已删除、部分待发布）和 10 万个用户的已读状态，测量
+unread_count / list_unread / mark_read 的延迟，并与"每个(用户, 公告)一行"
+的朴素方案比较存储大小和未读计数延迟。最后交替执行 mark_read 与其他用户的
+unread_count，确认标记已读不会使可见ID缓存和缓存标记失效。
+
+用法:
+    python benchmarks/bench_read_receipts.py [--users 100000] [--announcements 20000] [--active 2000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AnnouncementManager import AnnouncementManager, _pack_bitmap  # noqa: E402
+from data.datainit import ensure_schema  # noqa: E402
+
+
+def build_announcements(db_path, total, active, seed=1):
+    """生成 total 条公告，其中最新的 active 条可见（约2%待发布），其余已软删除"""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    ensure_schema(conn)
+    now = datetime.now()
+    past = str(now - timedelta(days=1))
+    future = str(now + timedelta(days=1))
+    rows = []
+    for announcement_id in range(1, total + 1):
+        deleted_at = past if announcement_id <= total - active else None
+        publish_at = future if deleted_at is None and rng.random() < 0.02 else past
+        rows.append((announcement_id, f"公告 {announcement_id}", "内容", deleted_at, publish_at))
+    conn.executemany(
+        "INSERT INTO announcements (id, title, content, deleted_at, publish_at) VALUES (?, ?, ?, ?, ?)", rows
+    )
+    conn.commit()
+    conn.close()
+
+
+def build_receipts(manager, users, total, active, seed=2):
+    """
+    为每个用户随机生成已读状态：高水位落在可见区间内，其上随机读过约一半公告。
+    同时写入朴素方案的 (用户, 公告) 行表用于对比。
+    """
+    rng = random.Random(seed)
+    visible_ids, pending_ids = manager._active_ids()
+    first_active = total - active
+    receipts = []
+    naive_rows = []
+    for user in range(users):
+        user_id = f"u{user}"
+        watermark = rng.randint(first_active, total)
+        bits = 0
+        for announcement_id in range(watermark + 1, total + 1):
+            if rng.random() < 0.5:
+                bits |= 1 << (announcement_id - watermark - 1)
+        watermark, bits = manager._compact_receipt(watermark, bits, visible_ids, pending_ids)
+        receipts.append((user_id, watermark, _pack_bitmap(bits)))
+        if user < 2000:
+            # 朴素方案：用户读过的每条可见公告一行（只生成部分用户以控制生成时间）
+            for announcement_id in visible_ids:
+                if announcement_id <= watermark or bits >> (announcement_id - watermark - 1) & 1:
+                    naive_rows.append((user_id, announcement_id))
+
+    conn = sqlite3.connect(manager.db_path)
+    conn.executemany("INSERT INTO read_receipts (user_id, watermark, exceptions) VALUES (?, ?, ?)", receipts)
+    conn.execute("CREATE TABLE naive_reads (user_id TEXT, announcement_id INTEGER, "
+                 "PRIMARY KEY (user_id, announcement_id)) WITHOUT ROWID")
+    conn.executemany("INSERT INTO naive_reads VALUES (?, ?)", naive_rows)
+    conn.commit()
+    conn.close()
+    return len(naive_rows)
+
+
+def table_bytes(db_path, table):
+    """用 dbstat 统计表占用的字节数（不可用时返回 None）"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = ?", (table,)).fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+
+
+def naive_unread_count(db_path, user_id):
+    """朴素方案：可见公告数减去已读行数"""
+    now = datetime.now()
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT COUNT(*) FROM announcements a WHERE a.deleted_at IS NULL AND a.publish_at <= ? "
+            "AND (a.expires_at IS NULL OR a.expires_at > ?) AND NOT EXISTS "
+            "(SELECT 1 FROM naive_reads r WHERE r.user_id = ? AND r.announcement_id = a.id)",
+            (now, now, user_id)
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def measure(func, samples):
+    """返回 (p50毫秒, p99毫秒)"""
+    timings = []
+    for args in samples:
+        started = time.perf_counter()
+        func(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+def interleaved(manager, marks, readers):
+    """交替执行 mark_read 和 unread_count，返回 (mark_read 的 p50/p99, unread_count 的 p50/p99)"""
+    write_timings = []
+    read_timings = []
+    for (user_id, announcement_id), (reader,) in zip(marks, readers):
+        started = time.perf_counter()
+        manager.mark_read(user_id, announcement_id)
+        middle = time.perf_counter()
+        manager.unread_count(reader)
+        write_timings.append((middle - started) * 1000)
+        read_timings.append((time.perf_counter() - middle) * 1000)
+    result = []
+    for timings in (write_timings, read_timings):
+        timings.sort()
+        result.append((statistics.median(timings), timings[int(len(timings) * 0.99) - 1]))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="已读回执基准测试")
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--announcements', type=int, default=20000)
+    parser.add_argument('--active', type=int, default=2000)
+    parser.add_argument('--samples', type=int, default=2000)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_read_receipts.db')
+    started = time.perf_counter()
+    build_announcements(db_path, args.announcements, args.active)
+    manager = AnnouncementManager(db_path)
+    naive_count = build_receipts(manager, args.users, args.announcements, args.active)
+    print(f"生成 {args.users} 个用户的已读状态用时 {time.perf_counter() - started:.1f} 秒")
+
+    receipts_bytes = table_bytes(db_path, 'read_receipts')
+    naive_bytes = table_bytes(db_path, 'naive_reads')
+    if receipts_bytes and naive_bytes:
+        print(f"存储: 高水位+位图 {receipts_bytes / args.users:.1f} 字节/用户，"
+              f"朴素方案 {naive_bytes / 2000:.1f} 字节/用户（{naive_count / 2000:.0f} 行/用户）")
+
+    rng = random.Random(3)
+    users = [(f"u{rng.randrange(args.users)}",) for _ in range(args.samples)]
+    manager.unread_count(users[0][0])  # 预热可见ID缓存
+
+    p50, p99 = measure(manager.unread_count, users)
+    print(f"unread_count          p50 {p50:.3f} ms  p99 {p99:.3f} ms")
+    p50, p99 = measure(lambda user: manager.list_unread(user, limit=20, lazy=True), users)
+    print(f"list_unread(limit=20) p50 {p50:.3f} ms  p99 {p99:.3f} ms")
+    naive_users = [(f"u{rng.randrange(2000)}",) for _ in range(min(args.samples, 200))]
+    for (user_id,) in naive_users[:20]:
+        assert naive_unread_count(db_path, user_id) == manager.unread_count(user_id), "未读数不一致"
+    p50, p99 = measure(lambda user: naive_unread_count(db_path, user), naive_users)
+    print(f"朴素 COUNT            p50 {p50:.3f} ms  p99 {p99:.3f} ms")
+
+    visible_ids, _ = manager._active_ids()
+    marks = [(f"u{rng.randrange(args.users)}", rng.choice(visible_ids)) for _ in range(min(args.samples, 500))]
+    p50, p99 = measure(manager.mark_read, marks)
+    print(f"mark_read             p50 {p50:.3f} ms  p99 {p99:.3f} ms")
+
+    token = manager.cache_token()
+    marks = [(f"u{rng.randrange(args.users)}", rng.choice(visible_ids)) for _ in range(min(args.samples, 500))]
+    readers = [(f"u{rng.randrange(args.users)}",) for _ in marks]
+    (write_p50, write_p99), (read_p50, read_p99) = interleaved(manager, marks, readers)
+    assert manager.cache_token() == token, "标记已读改变了缓存标记"
+    print(f"交替 mark_read        p50 {write_p50:.3f} ms  p99 {write_p99:.3f} ms")
+    print(f"交替 unread_count     p50 {read_p50:.3f} ms  p99 {read_p99:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
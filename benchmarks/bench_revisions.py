@@ -0,0 +1,103 @@
+"""
+历史版本基准测试。
+
+对一条长正文公告做大量小修改，测量 update_announcement 延迟、历史版本的
+存储大小（与保存全文相比），以及读取当前版本和还原旧版本的延迟。正文分为
+每句一行和整个正文只有一行（每次修改相距很远的两句）两种形式。
+
+用法:
+    python benchmarks/bench_revisions.py [--edits 1000] [--body-lines 400] [--layout lines|single-line|both]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AnnouncementManager import AnnouncementManager  # noqa: E402
+
+
+def timed(func, *args):
+    """返回 (结果, 毫秒)"""
+    started = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def run(args, single_line):
+    """按一种正文形式运行基准测试并输出结果"""
+    rng = random.Random(5)
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_revisions.db')
+    manager = AnnouncementManager(db_path)
+
+    # 单行正文（如在文本框中不换行输入的中文）每次修改相距很远的两句
+    end = "" if single_line else "\n"
+    lines = [f"第 {n} 句：系统将于本周六进行维护，请各部门提前做好准备。{end}" for n in range(args.body_lines)]
+    original = ''.join(lines)
+    announcement_id = manager.create_announcement("维护通知", original)
+    # 对照组：不修改的公告，用于比较读取当前版本的延迟
+    baseline_id = manager.create_announcement("维护通知", original)
+
+    update_ms = []
+    full_copy_bytes = 0
+    for edit in range(args.edits):
+        full_copy_bytes += len(''.join(lines).encode('utf-8'))
+        position = rng.randrange(len(lines))
+        positions = [position, (position + len(lines) // 2) % len(lines)] if single_line else [position]
+        for position in positions:
+            if rng.random() < 0.8:
+                lines[position] = f"第 {position} 句：第 {edit} 次修改后的内容。{end}"
+            else:
+                lines.insert(position, f"新增一句（第 {edit} 次修改）。{end}")
+        _, ms = timed(manager.update_announcement, announcement_id, f"维护通知 v{edit + 2}", ''.join(lines))
+        update_ms.append(ms)
+
+    conn = sqlite3.connect(db_path)
+    history_bytes, snapshots = conn.execute(
+        "SELECT SUM(length(body) + length(CAST(title AS BLOB))), SUM(snapshot) "
+        "FROM announcement_revisions WHERE announcement_id = ?",
+        (announcement_id,)
+    ).fetchone()
+    conn.close()
+    assert manager.get_revision(announcement_id, 1)[2] == original, "还原的第一个版本与原文不一致"
+
+    body_bytes = len(''.join(lines).encode('utf-8'))
+    print(f"[{'单行正文' if single_line else '多行正文'}] 正文 {body_bytes} 字节，"
+          f"修改 {args.edits} 次（其中 {snapshots} 个全文版本）")
+    print(f"历史存储 {history_bytes} 字节（{history_bytes / args.edits:.0f} 字节/版本），"
+          f"保存全文需要 {full_copy_bytes} 字节（{full_copy_bytes / history_bytes:.0f} 倍）")
+    update_ms.sort()
+    print(f"update_announcement   p50 {statistics.median(update_ms):.2f} ms  "
+          f"p99 {update_ms[int(len(update_ms) * 0.99) - 1]:.2f} ms")
+
+    for label, target in (("当前版本(有历史)", announcement_id), ("当前版本(无历史)", baseline_id)):
+        samples = sorted(timed(manager.get_announcement_by_id, target)[1] for _ in range(200))
+        print(f"get_announcement_by_id {label} p50 {statistics.median(samples):.3f} ms")
+
+    current_revision = manager.list_revisions(announcement_id)[0][0]
+    for revision in (current_revision - 1, current_revision // 2, 1):
+        samples = sorted(timed(manager.get_revision, announcement_id, revision)[1] for _ in range(20))
+        print(f"get_revision({revision:>4})     p50 {statistics.median(samples):.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="历史版本基准测试")
+    parser.add_argument('--edits', type=int, default=1000)
+    parser.add_argument('--body-lines', type=int, default=400, help="正文的句数")
+    parser.add_argument('--layout', choices=['lines', 'single-line', 'both'], default='both',
+                        help="lines 每句一行；single-line 整个正文只有一行")
+    args = parser.parse_args()
+
+    for single_line in (False, True):
+        if args.layout in ('both', 'single-line' if single_line else 'lines'):
+            run(args, single_line)
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+多租户分片基准测试。
+
+1. 并发写入：T 个租户各一个线程，每个线程创建 N 条公告。分别写入共享的单个
+   数据库和按租户分片的数据库，比较吞吐量和 "database is locked" 错误数。
+2. 跨租户查询：在分片数据上执行全局搜索与统计，比较串行（max_workers=1）与
+   并行 fan-out 的耗时，并检查两者结果一致。
+
+用法:
+    python benchmarks/bench_sharding.py [--tenants 8] [--writes 200] [--rows 5000] [--repeat 10]
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AnnouncementManager import AnnouncementManager  # noqa: E402
+from sharding import ShardedAnnouncementManager  # noqa: E402
+
+
+def concurrent_writes(manager_for, tenants, writes):
+    """每个租户一个线程并发写入，返回 (每秒写入数, 锁错误数)"""
+    errors = []
+    barrier = threading.Barrier(len(tenants))
+
+    def writer(tenant):
+        manager = manager_for(tenant)
+        barrier.wait()
+        for index in range(writes):
+            try:
+                manager.create_announcement(f"{tenant} 公告 {index}", f"{tenant} 的第 {index} 条公告，关键词 kw{index % 50}")
+            except sqlite3.OperationalError as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(tenant,)) for tenant in tenants]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return (len(tenants) * writes - len(errors)) / elapsed, len(errors)
+
+
+def populate(sharded, tenants, rows):
+    """用 executemany 快速为每个租户写入 rows 条公告"""
+    for tenant in tenants:
+        conn = sqlite3.connect(sharded.tenant_path(tenant))
+        conn.executemany(
+            "INSERT INTO announcements (title, content) VALUES (?, ?)",
+            [(f"{tenant} 公告 {index}", f"{tenant} 的第 {index} 条公告，关键词 kw{index % 97}。" * 20)
+             for index in range(rows)]
+        )
+        conn.commit()
+        conn.close()
+
+
+def measure(func, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多租户分片基准测试")
+    parser.add_argument('--tenants', type=int, default=8)
+    parser.add_argument('--writes', type=int, default=200)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    tenants = [f"tenant{index:03d}" for index in range(args.tenants)]
+
+    print(f"并发写入：{args.tenants} 个租户 × {args.writes} 条")
+    shared = AnnouncementManager(os.path.join(tempfile.mkdtemp(), 'shared.db'))
+    rate, errors = concurrent_writes(lambda tenant: shared, tenants, args.writes)
+    print(f"  单个数据库   {rate:8.0f} 条/秒  锁错误 {errors}")
+    sharded = ShardedAnnouncementManager(tempfile.mkdtemp())
+    rate, errors = concurrent_writes(sharded.manager, tenants, args.writes)
+    print(f"  按租户分片   {rate:8.0f} 条/秒  锁错误 {errors}")
+    sharded.close()
+
+    print(f"\n跨租户查询：{args.tenants} 个租户 × {args.rows} 条")
+    directory = tempfile.mkdtemp()
+    serial = ShardedAnnouncementManager(directory, max_workers=1)
+    for tenant in tenants:
+        serial.manager(tenant)
+    populate(serial, tenants, args.rows)
+    parallel = ShardedAnnouncementManager(directory, max_workers=args.tenants)
+
+    queries = [
+        ("search_all('kw13', limit=50)", lambda manager: manager.search_all("kw13", limit=50)),
+        ("search_all('不存在')", lambda manager: manager.search_all("不存在")),
+        ("get_global_statistics", lambda manager: manager.get_global_statistics()),
+    ]
+    print(f"{'操作':<32}{'串行 (ms)':>12}{'并行 (ms)':>12}  结果一致")
+    for name, query in queries:
+        serial_ms, serial_result = measure(lambda: query(serial), args.repeat)
+        parallel_ms, parallel_result = measure(lambda: query(parallel), args.repeat)
+        same = serial_result == parallel_result
+        print(f"{name:<32}{serial_ms:>12.2f}{parallel_ms:>12.2f}  {'是' if same else '否'}")
+    serial.close()
+    parallel.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+HTTP 只读接口压测。
+
+默认在本进程内启动 http_api 服务（数据库中预置若干公告），也可用 --url
+压测已运行的服务。多个线程使用 keep-alive 连接循环请求，分别测量普通
+请求（命中预序列化缓存）与携带 If-None-Match 的条件请求（304）的 RPS
+和延迟分布。
+
+用法:
+    python benchmarks/loadtest_http.py [--url http://127.0.0.1:8080] [--threads 8] [--seconds 5]
+"""
+import argparse
+import http.client
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AnnouncementManager import AnnouncementManager  # noqa: E402
+from http_api import create_server  # noqa: E402
+
+PATHS = ['/announcements?limit=50', '/stats', '/search?q=%E7%BB%B4%E6%8A%A4', '/announcements/1']
+
+
+def start_local_server(rows):
+    """在临时数据库上启动服务，返回 (服务, 基础URL)"""
+    db_path = os.path.join(tempfile.mkdtemp(), 'loadtest_http.db')
+    manager = AnnouncementManager(db_path)
+    for n in range(rows):
+        manager.create_announcement(f"公告 {n}", f"系统将于本周六进行维护（{n}）" * 10)
+    server = create_server(manager, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def worker(base_url, conditional, deadline, latencies, errors):
+    """循环请求直到截止时间，记录每次请求的延迟（毫秒）"""
+    target = urlsplit(base_url)
+    conn = http.client.HTTPConnection(target.hostname, target.port, timeout=10)
+    etags = {}
+    n = 0
+    while time.perf_counter() < deadline:
+        path = PATHS[n % len(PATHS)]
+        n += 1
+        headers = {'If-None-Match': etags[path]} if conditional and path in etags else {}
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status not in (200, 304):
+                errors.append(response.status)
+            etags[path] = response.getheader('ETag')
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(repr(e))
+            conn.close()
+            conn = http.client.HTTPConnection(target.hostname, target.port, timeout=10)
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+    conn.close()
+
+
+def run(base_url, threads, seconds, conditional):
+    """运行一轮压测并输出 RPS 与延迟分位数"""
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + seconds
+    pool = [threading.Thread(target=worker, args=(base_url, conditional, deadline, latencies, errors))
+            for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    latencies.sort()
+    label = "条件请求(304)" if conditional else "普通请求(200)"
+    if not latencies:
+        print(f"{label}: 没有成功的请求，错误 {len(errors)} 个")
+        return
+    print(f"{label}: {len(latencies) / seconds:,.0f} RPS  "
+          f"p50 {statistics.median(latencies):.2f} ms  "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.2f} ms  错误 {len(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP 只读接口压测")
+    parser.add_argument('--url', help="已运行服务的地址，不指定则在本进程内启动")
+    parser.add_argument('--rows', type=int, default=500, help="本地服务预置的公告数")
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server, base_url = start_local_server(args.rows)
+    try:
+        run(base_url, args.threads, args.seconds, conditional=False)
+        run(base_url, args.threads, args.seconds, conditional=True)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
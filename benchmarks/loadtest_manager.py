@@ -0,0 +1,296 @@
+"""
+AnnouncementManager 并发负载测试。
+
+多个线程（或进程）按配置的比例循环执行创建、按ID读取、列表、搜索和软删除，
+同时一个清理线程按固定间隔执行过期检查器的两项检查（清理过期公告、发布
+到期公告）。部分新建公告在几秒内过期，使清理与写入持续竞争写锁。
+
+依次在每个并发级别下运行，输出扩展曲线：总吞吐量、延迟分位数、
+"database is locked" 错误率、其他错误数以及写入重试/超时次数，并可按操作
+类型细分。--write-deadline 0 时写入不重试，可与默认的退避重试对比。
+
+用法:
+    python benchmarks/loadtest_manager.py [--levels 1 2 4 8 16] [--seconds 5] [--mode thread|process]
+        [--mix create=2,read=4,list=2,search=1,delete=1] [--sweep-interval 0.5] [--db 路径]
+        [--write-deadline 10] [--busy-timeout 0.1] [--by-op] [--json 输出文件]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AnnouncementManager import AnnouncementManager  # noqa: E402
+from backends import SQLiteBackend  # noqa: E402
+
+DEFAULT_MIX = "create=2,read=4,list=2,search=1,delete=1"
+
+# 新建公告中在几秒内过期的比例
+_SHORT_LIVED_RATIO = 0.3
+
+# 每种错误最多保留的示例数
+_ERROR_SAMPLES = 3
+
+
+def parse_mix(text):
+    """把 'create=2,read=4' 解析为 [(操作, 权重), ...]"""
+    mix = []
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        if name.strip() not in OPERATIONS:
+            raise ValueError(f"未知的操作: {name.strip()!r}（可选 {', '.join(OPERATIONS)}）")
+        mix.append((name.strip(), float(weight or 1)))
+    return mix
+
+
+def _create(manager, rng, max_id):
+    hours = rng.uniform(1, 10) / 3600 if rng.random() < _SHORT_LIVED_RATIO else None
+    manager.create_announcement(f"负载公告 {rng.randrange(10 ** 6)}", f"负载测试正文 kw{rng.randrange(100)}。" * 20,
+                                expires_after_hours=hours)
+
+
+def _read(manager, rng, max_id):
+    manager.get_announcement_by_id(rng.randint(1, max_id))
+
+
+def _list(manager, rng, max_id):
+    records = manager.get_all_announcements(visible_only=True, lazy=True, preview_chars=40)
+    for record in records[:20]:
+        record.preview
+
+
+def _search(manager, rng, max_id):
+    manager.search_announcements(f"kw{rng.randrange(100)}", visible_only=True, lazy=True)
+
+
+def _delete(manager, rng, max_id):
+    manager.soft_delete_announcement(rng.randint(1, max_id))
+
+
+OPERATIONS = {'create': _create, 'read': _read, 'list': _list, 'search': _search, 'delete': _delete}
+
+
+class Recorder:
+    """按操作类型记录延迟（毫秒）与错误"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.lock_errors = {}
+        self.errors = {}
+        self.samples = []
+        self.write_stats = {}
+
+    def record(self, name, func):
+        started = time.perf_counter()
+        try:
+            func()
+        except sqlite3.OperationalError as e:
+            if 'locked' in str(e) or 'busy' in str(e):
+                self.lock_errors[name] = self.lock_errors.get(name, 0) + 1
+            else:
+                self._error(name, e)
+            return
+        except Exception as e:
+            self._error(name, e)
+            return
+        self.latencies.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+
+    def _error(self, name, error):
+        self.errors[name] = self.errors.get(name, 0) + 1
+        if len(self.samples) < _ERROR_SAMPLES:
+            self.samples.append(f"{name}: {error!r}")
+
+    def merge(self, other):
+        for name, values in other.latencies.items():
+            self.latencies.setdefault(name, []).extend(values)
+        for target, source in ((self.lock_errors, other.lock_errors), (self.errors, other.errors)):
+            for name, count in source.items():
+                target[name] = target.get(name, 0) + count
+        self.samples.extend(other.samples[:_ERROR_SAMPLES - len(self.samples)])
+        self.add_write_stats(other.write_stats)
+
+    def add_write_stats(self, stats):
+        for name, count in stats.items():
+            self.write_stats[name] = self.write_stats.get(name, 0) + count
+
+
+def worker(db_path, backend_options, mix, deadline, seed, max_id):
+    """循环执行随机操作直到 deadline（time.time() 时间），返回 Recorder"""
+    manager = AnnouncementManager(backend=SQLiteBackend(db_path, **backend_options))
+    rng = random.Random(seed)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    recorder = Recorder()
+    while time.time() < deadline:
+        name = rng.choices(names, weights)[0]
+        recorder.record(name, lambda: OPERATIONS[name](manager, rng, max_id))
+    recorder.add_write_stats(manager.get_write_statistics())
+    return recorder
+
+
+def sweeper(db_path, backend_options, interval, stop, recorder):
+    """按过期检查器的方式定期清理过期公告、发布到期公告"""
+    manager = AnnouncementManager(backend=SQLiteBackend(db_path, **backend_options))
+    while not stop.wait(interval):
+        recorder.record('sweep', manager.check_and_delete_expired)
+        recorder.record('sweep', manager.check_and_publish_due)
+    recorder.add_write_stats(manager.get_write_statistics())
+
+
+def seed_database(db_path, rows):
+    """预置 rows 条公告，返回最大ID"""
+    manager = AnnouncementManager(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO announcements (title, content, publish_at) VALUES (?, ?, datetime('now', 'localtime'))",
+        [(f"预置公告 {n}", f"预置正文 kw{n % 100}。" * 20) for n in range(rows)]
+    )
+    conn.commit()
+    max_id = conn.execute("SELECT MAX(id) FROM announcements").fetchone()[0] or 1
+    conn.close()
+    manager.backend.close()
+    return max_id
+
+
+def _percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(recorder, seconds, names=None):
+    """返回吞吐量、延迟分位数和错误统计"""
+    names = names or sorted(set(recorder.latencies) | set(recorder.lock_errors) | set(recorder.errors))
+    latencies = sorted(value for name in names for value in recorder.latencies.get(name, ()))
+    lock_errors = sum(recorder.lock_errors.get(name, 0) for name in names)
+    errors = sum(recorder.errors.get(name, 0) for name in names)
+    attempts = len(latencies) + lock_errors + errors
+    summary = {
+        'ops': len(latencies),
+        'ops_per_second': round(len(latencies) / seconds, 1),
+        'lock_errors': lock_errors,
+        'lock_error_rate': round(lock_errors / attempts, 4) if attempts else 0.0,
+        'errors': errors,
+    }
+    if latencies:
+        summary.update(p50_ms=round(statistics.median(latencies), 2),
+                       p95_ms=round(_percentile(latencies, 0.95), 2),
+                       p99_ms=round(_percentile(latencies, 0.99), 2),
+                       max_ms=round(latencies[-1], 2))
+    return summary
+
+
+def run_level(db_path, backend_options, concurrency, seconds, mix, mode, sweep_interval, max_id):
+    """在一个并发级别下运行负载，返回 (工作线程的 Recorder, 清理线程的 Recorder)"""
+    deadline = time.time() + seconds
+    stop = threading.Event()
+    sweep_recorder = Recorder()
+    sweep_thread = threading.Thread(target=sweeper,
+                                    args=(db_path, backend_options, sweep_interval, stop, sweep_recorder))
+    sweep_thread.start()
+
+    recorder = Recorder()
+    try:
+        if mode == 'process':
+            # 清理线程已在运行，fork 可能复制其持有的锁导致子进程死锁，使用 spawn
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=concurrency, mp_context=context) as executor:
+                futures = [executor.submit(worker, db_path, backend_options, mix, deadline, seed, max_id)
+                           for seed in range(concurrency)]
+                for future in futures:
+                    recorder.merge(future.result())
+        else:
+            results = [None] * concurrency
+
+            def run(index):
+                results[index] = worker(db_path, backend_options, mix, deadline, index, max_id)
+
+            threads = [threading.Thread(target=run, args=(index,)) for index in range(concurrency)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            for result in results:
+                recorder.merge(result)
+    finally:
+        stop.set()
+        sweep_thread.join()
+    return recorder, sweep_recorder
+
+
+def _format(label, summary, write_stats=None):
+    latency = (f"p50 {summary['p50_ms']:8.2f}  p95 {summary['p95_ms']:8.2f}  p99 {summary['p99_ms']:8.2f}"
+               if 'p50_ms' in summary else f"{'-':>12}{'-':>14}{'-':>14}")
+    line = (f"{label:>10}  {summary['ops_per_second']:>10.1f}  {latency}  "
+            f"锁错误 {summary['lock_errors']:>5} ({summary['lock_error_rate']:.2%})  其他错误 {summary['errors']}")
+    if write_stats:
+        line += f"  写入重试 {write_stats.get('retries', 0)}  超时 {write_stats.get('timeouts', 0)}"
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AnnouncementManager 并发负载测试")
+    parser.add_argument('--db', help="数据库文件，不指定则使用临时数据库")
+    parser.add_argument('--rows', type=int, default=2000, help="预置的公告数")
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 2, 4, 8, 16], help="依次测试的并发数")
+    parser.add_argument('--seconds', type=float, default=5, help="每个并发级别的运行时长")
+    parser.add_argument('--mode', choices=['thread', 'process'], default='thread')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="操作权重，如 " + DEFAULT_MIX)
+    parser.add_argument('--sweep-interval', type=float, default=0.5, help="清理线程的检查间隔（秒）")
+    parser.add_argument('--write-deadline', type=float, default=10.0,
+                        help="写入等待写锁的总时长（秒），0 表示不重试")
+    parser.add_argument('--busy-timeout', type=float, default=0.1, help="每次尝试获取写锁的等待时间（秒）")
+    parser.add_argument('--by-op', action='store_true', help="同时输出各操作类型的统计")
+    parser.add_argument('--json', help="把扩展曲线写入该 JSON 文件")
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), 'loadtest_manager.db')
+    backend_options = {'write_deadline': args.write_deadline, 'busy_timeout': args.busy_timeout}
+    max_id = seed_database(db_path, args.rows)
+    print(f"数据库 {db_path}，预置 {args.rows} 条公告；{args.mode} 模式，操作比例 {args.mix}")
+    print(f"{'并发':>10}  {'ops/s':>10}  {'延迟 (ms)':<42}  错误")
+
+    curve = []
+    for concurrency in args.levels:
+        recorder, sweep_recorder = run_level(db_path, backend_options, concurrency, args.seconds, mix, args.mode,
+                                             args.sweep_interval, max_id)
+        write_stats = dict(recorder.write_stats)
+        for name, count in sweep_recorder.write_stats.items():
+            write_stats[name] = write_stats.get(name, 0) + count
+        summary = summarize(recorder, args.seconds)
+        sweep = summarize(sweep_recorder, args.seconds)
+        print(_format(str(concurrency), summary, write_stats))
+        if args.by_op:
+            for name, _ in mix:
+                print(_format(name, summarize(recorder, args.seconds, [name])))
+            print(_format('sweep', sweep))
+        for sample in recorder.samples + sweep_recorder.samples:
+            print(f"{'':>12}{sample}")
+        curve.append({
+            'concurrency': concurrency,
+            'total': summary,
+            'by_op': {name: summarize(recorder, args.seconds, [name]) for name, _ in mix},
+            'sweep': sweep,
+            'writes': write_stats,
+        })
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'mode': args.mode, 'mix': args.mix, 'seconds': args.seconds, 'rows': args.rows,
+                       'backend': backend_options, 'curve': curve}, f, ensure_ascii=False, indent=2)
+        print(f"扩展曲线已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
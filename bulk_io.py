@@ -0,0 +1,509 @@
+import csv
+import json
+import os
+import sqlite3
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from AnnouncementManager import ANNOUNCEMENT_COLUMNS, GLOBAL_CHANNEL, _normalize_channels
+from backends.sqlite import SQLiteBackend
+from data.datainit import bump_announcement_version, ensure_schema
+
+# 导入时写入的列（id 仅在 keep_ids=True 时写入）
+_IMPORT_COLUMNS = ('title', 'content', 'created_at', 'updated_at', 'deleted_at', 'expires_at', 'publish_at')
+_DATETIME_COLUMNS = ('created_at', 'updated_at', 'deleted_at', 'expires_at', 'publish_at')
+# 以 UTC 保存的时间列，其余时间列为本地时间
+_UTC_COLUMNS = ('created_at', 'updated_at', 'deleted_at')
+# 导出的列：公告表的列加上投放频道（JSONL 中为列表，CSV 中为 JSON 数组文本）
+_EXPORT_COLUMNS = ANNOUNCEMENT_COLUMNS + ('channels',)
+
+# 报告中保留的错误样例数量
+_MAX_ERROR_SAMPLES = 20
+
+
+def _detect_format(path, fmt):
+    """根据参数或文件扩展名确定文件格式"""
+    if fmt:
+        fmt = fmt.lower()
+    else:
+        fmt = os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt not in ('jsonl', 'csv'):
+        raise ValueError(f"不支持的文件格式: {fmt!r}（仅支持 jsonl / csv）")
+    return fmt
+
+
+def _fetch_channels(conn, first_id, last_id):
+    """查询ID在 [first_id, last_id] 内的公告的频道，返回 {公告ID: 频道列表}"""
+    channels = {}
+    for announcement_id, channel in conn.execute(
+        "SELECT announcement_id, channel FROM announcement_channels "
+        "WHERE announcement_id BETWEEN ? AND ? ORDER BY announcement_id, channel",
+        (first_id, last_id)
+    ):
+        channels.setdefault(announcement_id, []).append(channel)
+    return channels
+
+
+def export_announcements(db_path, path, fmt=None, include_deleted=True, batch_size=1000):
+    """
+    以流式方式导出公告到 JSONL 或 CSV 文件，内存占用与总行数无关。
+    每条公告附带 channels 列（投放频道列表），导入时据此恢复频道。
+
+    Args:
+        db_path (str): 数据库文件路径
+        path (str): 输出文件路径
+        fmt (str): 文件格式 'jsonl' 或 'csv'，None 表示按扩展名判断
+        include_deleted (bool): 是否包含已软删除的公告
+        batch_size (int): 每次从数据库取回的行数
+
+    Returns:
+        dict: 导出报告（records, seconds, rows_per_second）
+    """
+    fmt = _detect_format(path, fmt)
+    started = time.perf_counter()
+    count = 0
+
+    sql = f"SELECT {', '.join(ANNOUNCEMENT_COLUMNS)} FROM announcements"
+    if not include_deleted:
+        sql += " WHERE deleted_at IS NULL"
+    sql += " ORDER BY id"
+
+    conn = sqlite3.connect(db_path)
+    try:
+        ensure_schema(conn)
+        cursor = conn.execute(sql)
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = None
+            if fmt == 'csv':
+                writer = csv.writer(f)
+                writer.writerow(_EXPORT_COLUMNS)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                # 按ID顺序导出，本批公告的频道用一次范围查询取回
+                channels = _fetch_channels(conn, rows[0][0], rows[-1][0])
+                if writer is not None:
+                    writer.writerows(
+                        row + (json.dumps(channels.get(row[0], []), ensure_ascii=False),) for row in rows
+                    )
+                else:
+                    f.writelines(
+                        json.dumps(dict(zip(_EXPORT_COLUMNS, row + (channels.get(row[0], []),))),
+                                   ensure_ascii=False) + '\n'
+                        for row in rows
+                    )
+                count += len(rows)
+    finally:
+        conn.close()
+
+    return _throughput_report(count, started)
+
+
+def _throughput_report(records, started, **extra):
+    """生成吞吐量报告"""
+    seconds = time.perf_counter() - started
+    report = {
+        'records': records,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(records / seconds, 1) if seconds > 0 else 0.0,
+    }
+    report.update(extra)
+    return report
+
+
+def _validate_record(record, keep_ids):
+    """
+    校验并规范化一条记录。
+
+    Returns:
+        tuple: (用于插入的参数元组, 频道列表)，没有 channels 列或为空时频道为 ['*']
+
+    Raises:
+        ValueError: 记录不合法
+    """
+    if not isinstance(record, dict):
+        raise ValueError("记录必须是对象")
+
+    title = record.get('title')
+    content = record.get('content')
+    if not isinstance(title, str) or not title.strip():
+        raise ValueError("title 不能为空")
+    if not isinstance(content, str) or not content:
+        raise ValueError("content 不能为空")
+
+    values = {'title': title, 'content': content}
+    for column in _DATETIME_COLUMNS:
+        value = record.get(column)
+        if value in (None, ''):
+            values[column] = None
+            continue
+        try:
+            parsed = datetime.fromisoformat(str(value))
+        except ValueError:
+            raise ValueError(f"{column} 不是合法的时间: {value!r}")
+        if parsed.tzinfo is not None:
+            # 带时区的时间转换为该列约定的无时区时间
+            if column in _UTC_COLUMNS:
+                parsed = parsed.astimezone(timezone.utc)
+            else:
+                parsed = parsed.astimezone()
+            parsed = parsed.replace(tzinfo=None)
+        # 按 str(datetime) 的格式保存，与可见性判断中的文本比较一致
+        values[column] = str(parsed)
+
+    params = tuple(values[column] for column in _IMPORT_COLUMNS)
+    if keep_ids:
+        try:
+            announcement_id = int(record.get('id'))
+        except (TypeError, ValueError):
+            raise ValueError(f"id 不合法: {record.get('id')!r}")
+        params = (announcement_id,) + params
+
+    channels = record.get('channels')
+    if isinstance(channels, str) and channels.strip():
+        # CSV 中的频道列为 JSON 数组文本
+        try:
+            channels = json.loads(channels)
+        except ValueError:
+            raise ValueError(f"channels 不是合法的 JSON 数组: {channels!r}")
+    if channels not in (None, '') and not isinstance(channels, list):
+        raise ValueError(f"channels 必须是频道名列表: {channels!r}")
+    return params, _normalize_channels(channels) or [GLOBAL_CHANNEL]
+
+
+def _parse_chunk(fmt, header, items, first_number, keep_ids):
+    """
+    在工作进程中解析并校验一批记录。
+
+    Args:
+        fmt (str): 'jsonl' 或 'csv'
+        header (list): CSV 表头，JSONL 时为 None
+        items (list): JSONL 原始行或 CSV 已切分的字段列表
+        first_number (int): 本批第一条记录的序号（从1开始）
+        keep_ids (bool): 是否保留源数据中的ID
+
+    Returns:
+        tuple: ([(插入参数, 频道列表), ...], [(序号, 错误信息), ...])
+    """
+    rows = []
+    errors = []
+    for offset, item in enumerate(items):
+        number = first_number + offset
+        try:
+            if fmt == 'jsonl':
+                record = json.loads(item)
+            else:
+                if len(item) != len(header):
+                    raise ValueError(f"字段数 {len(item)} 与表头 {len(header)} 不一致")
+                record = dict(zip(header, item))
+            rows.append(_validate_record(record, keep_ids))
+        except ValueError as e:
+            errors.append((number, str(e)))
+    return rows, errors
+
+
+def _iter_chunks(f, fmt, chunk_size, skip):
+    """
+    按块读取源文件，跳过已导入的前 skip 条记录。
+
+    Yields:
+        tuple: (本块第一条记录的序号, 记录列表)
+    """
+    if fmt == 'jsonl':
+        source = (line for line in f if line.strip())
+    else:
+        source = (row for row in csv.reader(f) if row)
+        next(source, None)  # 表头已单独读取
+
+    number = 0
+    chunk = []
+    for item in source:
+        number += 1
+        if number <= skip:
+            continue
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield number - len(chunk) + 1, chunk
+            chunk = []
+    if chunk:
+        yield number - len(chunk) + 1, chunk
+
+
+def _read_checkpoint(conn, checkpoint_path, path):
+    """
+    读取断点，返回已提交的记录数及累计统计。
+
+    断点以数据库 import_progress 表中的记录为准（与数据在同一事务中提交），
+    断点文件在每次提交后写入，作为数据库中没有记录时的后备。
+    """
+    empty = {'records_done': 0, 'inserted': 0, 'rejected': 0}
+    if not checkpoint_path:
+        return empty
+    row = conn.execute(
+        "SELECT source, records_done, inserted, rejected FROM import_progress WHERE checkpoint = ?",
+        (os.path.abspath(checkpoint_path),)
+    ).fetchone()
+    if row is not None:
+        checkpoint = {'source': row[0], 'records_done': row[1], 'inserted': row[2], 'rejected': row[3]}
+    elif os.path.exists(checkpoint_path):
+        with open(checkpoint_path, encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    else:
+        return empty
+    if checkpoint.get('source') != os.path.abspath(path):
+        raise ValueError(f"断点文件 {checkpoint_path} 不属于 {path}")
+    return checkpoint
+
+
+def _save_progress(conn, checkpoint_path, path, records_done, inserted, rejected):
+    """在当前写事务中记录断点"""
+    conn.execute(
+        "INSERT OR REPLACE INTO import_progress (checkpoint, source, records_done, inserted, rejected) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (os.path.abspath(checkpoint_path), os.path.abspath(path), records_done, inserted, rejected)
+    )
+
+
+def _write_checkpoint(checkpoint_path, path, records_done, inserted, rejected):
+    """原子地写入断点文件"""
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'source': os.path.abspath(path),
+            'records_done': records_done,
+            'inserted': inserted,
+            'rejected': rejected,
+        }, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def _drop_indexes(conn):
+    """删除 announcements 表上的二级索引，返回用于重建的 SQL 列表"""
+    indexes = conn.execute(
+        "SELECT name, sql FROM sqlite_master "
+        "WHERE type = 'index' AND tbl_name = 'announcements' AND sql IS NOT NULL"
+    ).fetchall()
+    for name, _ in indexes:
+        conn.execute(f'DROP INDEX IF EXISTS "{name}"')
+    return [sql for _, sql in indexes]
+
+
+def _write_imported_channels(conn, rows, last_id, keep_ids):
+    """为本批新插入的公告写入频道（源数据没有频道时为 '*'，即全员可见）"""
+    if keep_ids:
+        # 保留ID时重复ID的记录被忽略，只为还没有频道的公告写入
+        ids = [params[0] for params, _ in rows]
+        have = set()
+        for lower in range(0, len(ids), 500):
+            part = ids[lower:lower + 500]
+            have.update(row[0] for row in conn.execute(
+                "SELECT DISTINCT announcement_id FROM announcement_channels "
+                f"WHERE announcement_id IN ({', '.join('?' * len(part))})", part
+            ))
+        pairs = []
+        for params, channels in rows:
+            # 同一批中ID重复时只有第一条被插入
+            if params[0] not in have:
+                have.add(params[0])
+                pairs.append((params[0], channels))
+    else:
+        # 事务内持有写锁，ID 大于插入前最大值的行均为本批插入，ID 顺序即插入顺序
+        new_ids = [row[0] for row in conn.execute(
+            "SELECT id FROM announcements WHERE id > ? ORDER BY id", (last_id,)
+        )]
+        pairs = zip(new_ids, (channels for _, channels in rows))
+    conn.executemany(
+        "INSERT OR IGNORE INTO announcement_channels (channel, announcement_id) VALUES (?, ?)",
+        ((channel, announcement_id) for announcement_id, channels in pairs for channel in channels)
+    )
+
+
+def import_announcements(db_path, path, fmt=None, workers=None, chunk_size=2000,
+                         commit_every=50000, checkpoint_path=None, keep_ids=False,
+                         defer_indexes=True, progress=None):
+    """
+    从 JSONL 或 CSV 文件批量导入公告。
+
+    源文件按块流式读取，解析和校验在进程池中并行执行；插入按 commit_every
+    条记录合并为一个大事务，断点与数据在同一事务中写入数据库（提交后另写一份
+    到断点文件），中断后以同一断点文件路径重新调用即可从上次提交处继续。
+
+    时间列接受 ISO 8601 格式（如 2026-10-19T08:00:00），统一保存为 str(datetime)
+    的格式；带时区的 expires_at / publish_at 转换为本地时间，created_at 等转换为 UTC。
+
+    Args:
+        db_path (str): 数据库文件路径
+        path (str): 源文件路径
+        fmt (str): 文件格式 'jsonl' 或 'csv'，None 表示按扩展名判断
+        workers (int): 解析进程数，None 表示 CPU 核数，0 表示在当前进程解析
+        chunk_size (int): 每个解析任务包含的记录数
+        commit_every (int): 每个事务包含的记录数
+        checkpoint_path (str): 断点文件路径，None 表示不记录断点
+        keep_ids (bool): 是否保留源数据中的ID（重复ID会被忽略）
+        defer_indexes (bool): 导入期间是否删除二级索引，导入完成后重建
+        progress (callable): 每次提交后回调 progress(report)
+
+    Returns:
+        dict: 导入报告（records, inserted, rejected, skipped, seconds, rows_per_second, errors）
+    """
+    fmt = _detect_format(path, fmt)
+    error_samples = []
+    started = time.perf_counter()
+
+    columns = (('id',) if keep_ids else ()) + _IMPORT_COLUMNS
+    placeholders = []
+    for column in columns:
+        if column in ('created_at', 'updated_at'):
+            placeholders.append('COALESCE(?, CURRENT_TIMESTAMP)')
+        elif column == 'publish_at':
+            # 未指定发布时间的记录导入后立即可见
+            placeholders.append("COALESCE(?, datetime('now', 'localtime'))")
+        else:
+            placeholders.append('?')
+    verb = "INSERT OR IGNORE" if keep_ids else "INSERT"
+    insert_sql = (f"{verb} INTO announcements ({', '.join(columns)}) "
+                  f"VALUES ({', '.join(placeholders)})")
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    index_sqls = []
+    executor = None
+    if workers != 0:
+        # 进程池依赖 multiprocessing，只在需要时导入，导出与单进程导入不必加载
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        ensure_schema(conn)
+        checkpoint = _read_checkpoint(conn, checkpoint_path, path)
+        skipped = checkpoint['records_done']
+        records_done = skipped
+        inserted = checkpoint['inserted']
+        rejected = checkpoint['rejected']
+        if defer_indexes:
+            index_sqls = _drop_indexes(conn)
+
+        with open(path, encoding='utf-8', newline='') as f:
+            header = None
+            if fmt == 'csv':
+                header = next(csv.reader([f.readline()]), [])
+                f.seek(0)
+
+            def flush():
+                bump_announcement_version(conn)
+                if checkpoint_path:
+                    _save_progress(conn, checkpoint_path, path, records_done, inserted, rejected)
+                conn.execute("COMMIT")
+                if checkpoint_path:
+                    _write_checkpoint(checkpoint_path, path, records_done, inserted, rejected)
+                if progress:
+                    progress(_throughput_report(records_done - skipped, started,
+                                                inserted=inserted, rejected=rejected))
+
+            pending = deque()
+            max_pending = (executor._max_workers if executor else 1) * 2
+            in_transaction = False
+            uncommitted = 0
+
+            def consume(result, count):
+                nonlocal records_done, inserted, rejected, in_transaction, uncommitted
+                rows, errors = result
+                if not in_transaction:
+                    conn.execute("BEGIN")
+                    in_transaction = True
+                last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM announcements").fetchone()[0]
+                before = conn.total_changes
+                conn.executemany(insert_sql, [params for params, _ in rows])
+                inserted += conn.total_changes - before
+                _write_imported_channels(conn, rows, last_id, keep_ids)
+                rejected += len(errors)
+                for error in errors:
+                    if len(error_samples) < _MAX_ERROR_SAMPLES:
+                        error_samples.append(error)
+                records_done += count
+                uncommitted += count
+                if uncommitted >= commit_every:
+                    flush()
+                    in_transaction = False
+                    uncommitted = 0
+
+            for first_number, chunk in _iter_chunks(f, fmt, chunk_size, skipped):
+                if executor is None:
+                    consume(_parse_chunk(fmt, header, chunk, first_number, keep_ids), len(chunk))
+                    continue
+                # 按提交顺序消费结果，保证断点位置单调递增；在途任务数有上限以保持内存恒定
+                pending.append((executor.submit(_parse_chunk, fmt, header, chunk, first_number, keep_ids),
+                                len(chunk)))
+                if len(pending) >= max_pending:
+                    future, count = pending.popleft()
+                    consume(future.result(), count)
+            while pending:
+                future, count = pending.popleft()
+                consume(future.result(), count)
+            if in_transaction:
+                flush()
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        for sql in index_sqls:
+            conn.execute(sql)
+        conn.close()
+
+    # 导入的公告直接写入公告表，导入后补建模糊搜索索引（保留原ID时可能插在已有公告之间）
+    SQLiteBackend(db_path).sync_search_index()
+    return _throughput_report(records_done - skipped, started, inserted=inserted,
+                              rejected=rejected, skipped=skipped, errors=error_samples)
+
+
+def main(argv=None):
+    """命令行入口：python bulk_io.py import|export ..."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="公告批量导入/导出")
+    parser.add_argument('--db', default='announcements.db', help="数据库文件路径")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="导出公告")
+    export_parser.add_argument('path', help="输出文件（.jsonl 或 .csv）")
+    export_parser.add_argument('--format', choices=['jsonl', 'csv'])
+    export_parser.add_argument('--active-only', action='store_true', help="不导出已删除的公告")
+
+    import_parser = subparsers.add_parser('import', help="导入公告")
+    import_parser.add_argument('path', help="源文件（.jsonl 或 .csv）")
+    import_parser.add_argument('--format', choices=['jsonl', 'csv'])
+    import_parser.add_argument('--workers', type=int, default=None, help="解析进程数，0 表示不使用进程池")
+    import_parser.add_argument('--chunk-size', type=int, default=2000)
+    import_parser.add_argument('--commit-every', type=int, default=50000)
+    import_parser.add_argument('--checkpoint', help="断点文件路径，重复执行时从断点继续")
+    import_parser.add_argument('--keep-ids', action='store_true', help="保留源数据中的公告ID")
+    import_parser.add_argument('--no-defer-indexes', action='store_true', help="导入期间保留索引")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        report = export_announcements(args.db, args.path, args.format,
+                                      include_deleted=not args.active_only)
+        print(f"导出 {report['records']} 条公告，用时 {report['seconds']} 秒，"
+              f"{report['rows_per_second']} 条/秒")
+    else:
+        def show_progress(report):
+            print(f"已处理 {report['records']} 条（导入 {report['inserted']}，拒绝 {report['rejected']}），"
+                  f"{report['rows_per_second']} 条/秒")
+
+        report = import_announcements(
+            args.db, args.path, args.format, workers=args.workers, chunk_size=args.chunk_size,
+            commit_every=args.commit_every, checkpoint_path=args.checkpoint, keep_ids=args.keep_ids,
+            defer_indexes=not args.no_defer_indexes, progress=show_progress
+        )
+        print(f"处理 {report['records']} 条记录（跳过已导入 {report['skipped']} 条），"
+              f"导入 {report['inserted']} 条，拒绝 {report['rejected']} 条，"
+              f"用时 {report['seconds']} 秒，{report['rows_per_second']} 条/秒")
+        for number, message in report['errors']:
+            print(f"  第 {number} 条: {message}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+公告管理命令行工具。
+
+    python cli.py [--db 路径 | --tenant 租户 [--tenants-dir 目录]] 命令 ...
+
+命令:
+    create 标题 正文 [--expires-hours N] [--publish-at 时间] [--channel 频道 ...]
+    list [--all | --visible] [--limit N]
+    search 关键词 [--title-only | --content-only] [--visible] [--fuzzy [--threshold 0.5]] [--limit N]
+    sweep
+    stats
+
+只导入 AnnouncementManager 及标准库中的轻量模块，启动耗时见
+benchmarks/bench_import_time.py。
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from AnnouncementManager import AnnouncementManager
+
+# 列表中正文预览的字符数
+_PREVIEW_CHARS = 40
+
+
+def _status(record, now):
+    """公告状态：已删除 / 待发布 / 已过期 / 可见"""
+    if record[5]:
+        return "已删除"
+    if record[7] and record[7] > now:
+        return "待发布"
+    if record[6] and record[6] <= now:
+        return "已过期"
+    return "可见"
+
+
+def _local_datetime(value):
+    """解析 --publish-at：ISO 格式时间，带时区的时间转换为本地时间"""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"不是合法的时间: {value!r}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def _print_records(records, limit):
+    """每条公告输出一行：ID、状态、创建时间、标题和正文预览"""
+    now = str(datetime.now())
+    shown = records[:limit] if limit else records
+    for record in shown:
+        print(f"{record[0]:>6}  {_status(record, now)}  {record[3]}  {record[1]}  {record.preview}")
+    if len(shown) < len(records):
+        print(f"... 共 {len(records)} 条，只显示前 {len(shown)} 条")
+    elif not records:
+        print("没有公告")
+
+
+def _open_manager(args):
+    """按 --tenant 打开租户的管理器，否则打开 --db 指定的数据库"""
+    if args.tenant is None:
+        return AnnouncementManager(args.db), None
+    # 分片管理器会创建线程池，只在指定租户时导入
+    from sharding import ShardedAnnouncementManager
+
+    sharded = ShardedAnnouncementManager(args.tenants_dir, max_workers=1)
+    return sharded.manager(args.tenant), sharded
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="公告管理命令行工具")
+    parser.add_argument('--db', default='announcements.db', help="数据库文件路径")
+    parser.add_argument('--tenant', help="租户名，使用该租户的数据库（忽略 --db）")
+    parser.add_argument('--tenants-dir', default='tenants', help="租户数据库目录")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    create_parser = subparsers.add_parser('create', help="创建公告")
+    create_parser.add_argument('title')
+    create_parser.add_argument('content')
+    create_parser.add_argument('--expires-hours', type=float, help="发布后多少小时过期")
+    create_parser.add_argument('--publish-at', type=_local_datetime,
+                               help="定时发布时间，如 2025-01-01T09:00（本地时间）或 2025-01-01T09:00+08:00")
+    create_parser.add_argument('--channel', action='append', help="投放频道，可重复指定")
+
+    list_parser = subparsers.add_parser('list', help="列出公告")
+    scope = list_parser.add_mutually_exclusive_group()
+    scope.add_argument('--all', action='store_true', help="包含已删除的公告")
+    scope.add_argument('--visible', action='store_true', help="只列出当前可见的公告")
+    list_parser.add_argument('--limit', type=int, default=50, help="最多显示的条数，0 表示不限")
+
+    search_parser = subparsers.add_parser('search', help="搜索公告")
+    search_parser.add_argument('keyword')
+    fields = search_parser.add_mutually_exclusive_group()
+    fields.add_argument('--title-only', action='store_true', help="只搜索标题")
+    fields.add_argument('--content-only', action='store_true', help="只搜索正文")
+    search_parser.add_argument('--visible', action='store_true', help="只搜索当前可见的公告")
+    search_parser.add_argument('--fuzzy', action='store_true', help="模糊搜索，容忍错别字，按相似度排序")
+    search_parser.add_argument('--threshold', type=float, default=0.5, help="模糊搜索的最低相似度")
+    search_parser.add_argument('--limit', type=int, default=50, help="最多显示的条数，0 表示不限")
+
+    subparsers.add_parser('sweep', help="立即清理过期公告")
+    subparsers.add_parser('stats', help="显示统计信息")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        manager, sharded = _open_manager(args)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        if args.command == 'create':
+            announcement_id = manager.create_announcement(
+                args.title, args.content, expires_after_hours=args.expires_hours,
+                publish_at=args.publish_at, channels=args.channel
+            )
+            print(f"新公告已创建，ID: {announcement_id}")
+        elif args.command == 'list':
+            records = manager.get_all_announcements(include_deleted=args.all, visible_only=args.visible,
+                                                    lazy=True, preview_chars=_PREVIEW_CHARS)
+            _print_records(records, args.limit)
+        elif args.command == 'search' and args.fuzzy:
+            hits = manager.search_announcements(args.keyword, search_title=not args.content_only,
+                                                search_content=not args.title_only, visible_only=args.visible,
+                                                mode='fuzzy', threshold=args.threshold, limit=args.limit or None,
+                                                snippet_chars=_PREVIEW_CHARS, marks=("[", "]"))
+            for hit in hits:
+                print(f"{hit[0]:>6}  {hit.score:4.0%}  {hit.title_snippet}  {hit.snippet}")
+            if not hits:
+                print("没有公告")
+        elif args.command == 'search':
+            records = manager.search_announcements(args.keyword, search_title=not args.content_only,
+                                                   search_content=not args.title_only, visible_only=args.visible,
+                                                   lazy=True, preview_chars=_PREVIEW_CHARS)
+            _print_records(records, args.limit)
+        elif args.command == 'sweep':
+            print(f"删除了 {manager.check_and_delete_expired()} 个过期公告")
+        else:
+            labels = {'total': "总数", 'active': "可见", 'scheduled': "待发布", 'expired': "已过期未清理",
+                      'deleted': "已删除"}
+            for key, value in manager.get_statistics().items():
+                print(f"{labels.get(key, key)}: {value}")
+    finally:
+        if sharded is not None:
+            sharded.close()
+        else:
+            manager.backend.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
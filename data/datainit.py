@@ -1,6 +1,168 @@
 import sqlite3
 from datetime import datetime
 
+# 后续版本新增的列：列名 -> 列定义
+_ADDED_COLUMNS = {
+    'expires_at': "DATETIME DEFAULT NULL",
+    'publish_at': "DATETIME DEFAULT NULL",
+}
+
+
+def ensure_schema(conn):
+    """
+    确保公告表及索引为最新结构：补齐旧数据库缺少的列并创建索引。
+
+    Args:
+        conn (sqlite3.Connection): 数据库连接
+    """
+    cursor = conn.cursor()
+
+    # 使用更简洁、规范的SQL语句格式
+    create_table_sql = """
+    CREATE TABLE IF NOT EXISTS announcements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,     -- 主键，自增
+        title TEXT NOT NULL,                      -- 公告标题，非空
+        content TEXT NOT NULL,                    -- 公告内容，非空
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP, -- 创建时间
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP, -- 更新时间
+        deleted_at DATETIME DEFAULT NULL,         -- 软删除时间
+        expires_at DATETIME DEFAULT NULL,         -- 过期时间（本地时间）
+        publish_at DATETIME DEFAULT NULL          -- 发布时间（本地时间）
+    )
+    """
+    # 执行建表语句
+    cursor.execute(create_table_sql)
+
+    # 为旧数据库补齐新增的列
+    existing = {row[1] for row in cursor.execute("PRAGMA table_info(announcements)")}
+    for column, definition in _ADDED_COLUMNS.items():
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE announcements ADD COLUMN {column} {definition}")
+            if column == 'publish_at':
+                # 已有公告视为创建时即已发布（created_at 为UTC，转换为本地时间）
+                cursor.execute("UPDATE announcements SET publish_at = datetime(created_at, 'localtime')")
+
+    # （可选）创建索引
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_announcements_deleted_at ON announcements(deleted_at);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_announcements_created_at ON announcements(created_at);")
+    # 可见性窗口 publish_at <= now < expires_at 走索引范围扫描
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_announcements_visibility "
+        "ON announcements(deleted_at, publish_at, expires_at);"
+    )
+    # 过期检查器按 expires_at 范围查找
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_announcements_expiry ON announcements(deleted_at, expires_at);"
+    )
+
+    # 公告投放的频道/部门/标签，主键 (channel, announcement_id) 支持按频道倒序取最新公告
+    has_channels = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'announcement_channels'"
+    ).fetchone()
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS announcement_channels (
+        channel TEXT NOT NULL,                    -- 频道名，'*' 表示全员可见
+        announcement_id INTEGER NOT NULL,         -- 公告ID
+        PRIMARY KEY (channel, announcement_id)
+    ) WITHOUT ROWID
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_announcement_channels_announcement "
+        "ON announcement_channels(announcement_id, channel);"
+    )
+    if not has_channels:
+        # 已有公告均为全员可见
+        cursor.execute("INSERT INTO announcement_channels (channel, announcement_id) SELECT '*', id FROM announcements")
+
+    # 已读回执：每个用户一行，ID 不大于 watermark 的公告均视为已读，
+    # exceptions 位图的第 i 位表示ID为 watermark + 1 + i 的公告已读
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS read_receipts (
+        user_id TEXT PRIMARY KEY,                 -- 用户标识
+        watermark INTEGER NOT NULL DEFAULT 0,     -- 已读高水位
+        exceptions BLOB DEFAULT NULL              -- 高水位之上的已读位图（小端序）
+    ) WITHOUT ROWID
+    """)
+
+    # 公告数据版本号：公告或频道被改写时递增，用作可见ID缓存、HTTP ETag 和页面缓存的标记；
+    # 已读回执等其他数据的写入不改变它
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS announcement_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),    -- 只有一行
+        version INTEGER NOT NULL                  -- 版本号
+    )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO announcement_version (id, version) VALUES (1, 0)")
+
+    # 批量导入的断点：与导入的数据在同一事务中更新，提交后崩溃也不会重复导入
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS import_progress (
+        checkpoint TEXT PRIMARY KEY,              -- 断点文件的绝对路径
+        source TEXT NOT NULL,                     -- 源文件的绝对路径
+        records_done INTEGER NOT NULL,            -- 已提交的记录数
+        inserted INTEGER NOT NULL,                -- 累计插入数
+        rejected INTEGER NOT NULL                 -- 累计拒绝数
+    )
+    """)
+
+    # 公告历史版本：当前版本保存在 announcements 表中，旧版本保存为相对于
+    # 下一版本的压缩差量（snapshot = 1 时为压缩后的全文）
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS announcement_revisions (
+        announcement_id INTEGER NOT NULL,         -- 公告ID
+        revision INTEGER NOT NULL,                -- 版本号，从1开始
+        title TEXT NOT NULL,                      -- 该版本的标题
+        snapshot INTEGER NOT NULL DEFAULT 0,      -- 1 表示 body 为全文
+        body BLOB NOT NULL,                       -- zlib 压缩的差量或全文
+        created_at DATETIME,                      -- 该版本的保存时间
+        PRIMARY KEY (announcement_id, revision)
+    ) WITHOUT ROWID
+    """)
+
+    # 模糊搜索的 n-gram 倒排索引（切分方式见 ngram.py），由存储后端在写入时维护；
+    # 直接用 SQL 写入的公告在 SQLiteBackend.sync_search_index() 时补建索引
+    has_grams = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'announcement_grams'"
+    ).fetchone()
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS announcement_grams (
+        gram TEXT NOT NULL,                       -- n-gram
+        field INTEGER NOT NULL,                   -- 0 标题，1 正文
+        announcement_id INTEGER NOT NULL,         -- 公告ID
+        PRIMARY KEY (gram, field, announcement_id)
+    ) WITHOUT ROWID
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_announcement_grams_announcement "
+        "ON announcement_grams(announcement_id, field, gram);"
+    )
+    # 升级旧数据库时待补建索引的标记：补建可能需要数分钟，不在本事务中进行，
+    # 由 SQLiteBackend 在首次模糊搜索时分批补建（见 sync_search_index），完成后删除标记
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS search_index_pending (
+        id INTEGER PRIMARY KEY CHECK (id = 1),    -- 只有一行
+        through_id INTEGER NOT NULL               -- 升级时已有公告的最大ID
+    )
+    """)
+    if not has_grams:
+        cursor.execute(
+            "INSERT OR IGNORE INTO search_index_pending (id, through_id) "
+            "SELECT 1, (SELECT MAX(id) FROM announcements) WHERE EXISTS (SELECT 1 FROM announcements)"
+        )
+
+    conn.commit()
+
+
+def bump_announcement_version(cursor):
+    """
+    在写事务中递增公告数据版本号。改写公告或频道的写入须在提交前调用。
+
+    Args:
+        cursor (sqlite3.Cursor): 写事务所在连接的游标（或连接）
+    """
+    cursor.execute("UPDATE announcement_version SET version = version + 1 WHERE id = 1")
+
+
 def init_database(db_path='announcements.db'):
     """
     初始化数据库和公告表。
@@ -10,27 +172,7 @@ def init_database(db_path='announcements.db'):
     """
     try:
         with sqlite3.connect(db_path) as conn:
-            cursor = conn.cursor()
-
-            # 使用更简洁、规范的SQL语句格式
-            create_table_sql = """
-            CREATE TABLE IF NOT EXISTS announcements (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,     -- 主键，自增
-                title TEXT NOT NULL,                      -- 公告标题，非空
-                content TEXT NOT NULL,                    -- 公告内容，非空
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP, -- 创建时间
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP, -- 更新时间
-                deleted_at DATETIME DEFAULT NULL          -- 软删除时间
-            )
-            """
-            # 执行建表语句
-            cursor.execute(create_table_sql)
-
-            # （可选）创建索引
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_announcements_deleted_at ON announcements(deleted_at);")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_announcements_created_at ON announcements(created_at);")
-
-            conn.commit()
+            ensure_schema(conn)
             print(f"数据库初始化成功！数据库文件位于: {db_path}")
             print("表 'announcements' 已就绪。")
 
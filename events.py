@@ -0,0 +1,216 @@
+import json
+import threading
+import time
+
+# 订阅者落后超过缓冲区容量时收到的事件类型，收到后应重新拉取完整列表
+RESYNC_EVENT = 'resync'
+
+
+class Event:
+    """
+    一条公告变更事件。
+
+    事件只构造和序列化一次，所有订阅者共享同一个对象。
+    """
+
+    __slots__ = ('seq', 'type', 'data', 'time', '_sse')
+
+    def __init__(self, seq, event_type, data):
+        self.seq = seq
+        self.type = event_type
+        self.data = data
+        self.time = time.time()
+        self._sse = None
+
+    @property
+    def sse(self):
+        """Server-Sent Events 格式的字节串（首次访问时序列化）"""
+        if self._sse is None:
+            payload = json.dumps(self.data, ensure_ascii=False, default=str)
+            self._sse = f"id: {self.seq}\nevent: {self.type}\ndata: {payload}\n\n".encode('utf-8')
+        return self._sse
+
+    def __repr__(self):
+        return f"Event(seq={self.seq}, type={self.type!r}, data={self.data!r})"
+
+
+class EventBus:
+    """
+    进程内的公告事件发布/订阅。
+
+    所有事件只写入一个定长环形缓冲区，发布的代价与订阅者数量无关；每个订阅者
+    只保存自己的读取位置，因此每个订阅者最多积压 capacity 条事件。读取过慢、
+    积压超出容量的订阅者不会阻塞发布方，而是收到一条 resync 事件并跳到最新位置。
+
+    订阅者读取缓冲区时不加锁，只在没有新事件时等待当前的唤醒事件；发布方每次
+    发布后换上新的唤醒事件并唤醒旧事件上的全部等待者，避免大量订阅者同时被唤醒
+    后争抢同一把锁拖慢发布。
+    """
+
+    def __init__(self, capacity=1024):
+        """
+        Args:
+            capacity (int): 环形缓冲区容量，即每个订阅者可积压的最大事件数
+        """
+        self._capacity = capacity
+        self._ring = [None] * capacity
+        self._next_seq = 1
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._subscriber_count = 0
+        self._listeners = []
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def latest_seq(self):
+        """最近一条事件的序号，尚无事件时为 0"""
+        return self._next_seq - 1
+
+    @property
+    def subscriber_count(self):
+        return self._subscriber_count
+
+    def publish(self, event_type, **data):
+        """
+        发布事件并唤醒所有等待中的订阅者。
+
+        Args:
+            event_type (str): 事件类型，如 created / updated / deleted / expired
+            **data: 事件内容
+
+        Returns:
+            Event: 发布的事件
+        """
+        with self._lock:
+            event = Event(self._next_seq, event_type, data)
+            self._ring[event.seq % self._capacity] = event
+            self._next_seq += 1
+            wakeup, self._wakeup = self._wakeup, threading.Event()
+            listeners = self._listeners
+        wakeup.set()
+        for listener in listeners:
+            listener()
+        return event
+
+    def add_listener(self, callback):
+        """
+        注册发布通知回调。回调在发布方线程中调用、不带参数，应立即返回；
+        用于让基于 select 的事件循环在有新事件时醒来再读取订阅。
+        """
+        with self._lock:
+            self._listeners = self._listeners + [callback]
+
+    def remove_listener(self, callback):
+        with self._lock:
+            self._listeners = [listener for listener in self._listeners if listener is not callback]
+
+    def history(self, after_seq):
+        """
+        返回缓冲区中序号大于 after_seq 的事件。
+
+        Returns:
+            list: 事件列表；after_seq 之后的事件已被覆盖时返回 None
+        """
+        with self._lock:
+            next_seq = self._next_seq
+            start = min(after_seq + 1, next_seq)
+            if start < max(1, next_seq - self._capacity):
+                return None
+            return [self._ring[seq % self._capacity] for seq in range(start, next_seq)]
+
+    def subscribe(self, event_types=None, after_seq=None):
+        """
+        订阅事件。
+
+        Args:
+            event_types (list): 只接收这些类型的事件，None 表示全部
+            after_seq (int): 从该序号之后开始接收（用于断线续传），None 表示只接收新事件
+
+        Returns:
+            Subscription: 订阅对象
+        """
+        with self._lock:
+            self._subscriber_count += 1
+            start = self._next_seq if after_seq is None else min(after_seq + 1, self._next_seq)
+            return Subscription(self, start, event_types)
+
+    def _read(self, subscription, timeout):
+        """读取订阅者的待处理事件，没有（符合类型的）事件时等待"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not subscription.closed:
+            # 先取唤醒事件再读序号，保证序号之后发布的事件一定会触发该唤醒事件
+            wakeup = self._wakeup
+            next_seq = self._next_seq
+            if subscription._cursor >= next_seq:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return []
+                wakeup.wait(remaining)
+                continue
+
+            events = [self._ring[seq % self._capacity] for seq in range(subscription._cursor, next_seq)]
+            # 读取期间发布方可能已经覆盖了最早的槽位，读完后再按最新序号检查
+            oldest = max(1, self._next_seq - self._capacity)
+            if subscription._cursor < oldest:
+                # 积压超出缓冲区容量：丢弃积压，通知订阅者重新同步
+                skipped = oldest - subscription._cursor
+                subscription._cursor = self._next_seq
+                subscription.lagged += 1
+                return [Event(subscription._cursor - 1, RESYNC_EVENT, {'skipped': skipped})]
+
+            subscription._cursor = next_seq
+            if subscription.event_types is not None:
+                events = [event for event in events if event.type in subscription.event_types]
+            if events:
+                return events
+        return []
+
+    def _close(self, subscription):
+        with self._lock:
+            if subscription.closed:
+                return
+            subscription.closed = True
+            self._subscriber_count -= 1
+            wakeup, self._wakeup = self._wakeup, threading.Event()
+        wakeup.set()
+
+
+class Subscription:
+    """EventBus 的一个订阅者，通过 get() 或迭代读取事件"""
+
+    def __init__(self, bus, cursor, event_types):
+        self._bus = bus
+        self._cursor = cursor
+        self.event_types = set(event_types) if event_types is not None else None
+        self.closed = False
+        # 因积压过多而被要求重新同步的次数
+        self.lagged = 0
+
+    def get(self, timeout=None):
+        """
+        读取待处理的事件，没有事件时最多等待 timeout 秒。
+
+        Args:
+            timeout (float): 等待时间（秒），None 表示一直等待
+
+        Returns:
+            list: 事件列表，超时或订阅已关闭时为空列表
+        """
+        return self._bus._read(self, timeout)
+
+    def close(self):
+        """取消订阅"""
+        self._bus._close(self)
+
+    def __iter__(self):
+        while not self.closed:
+            yield from self.get()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
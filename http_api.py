@@ -0,0 +1,552 @@
+import json
+import selectors
+import socket
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from AnnouncementManager import ANNOUNCEMENT_COLUMNS, AnnouncementManager
+from events import RESYNC_EVENT, Event
+
+# 预序列化响应缓存的最大条目数
+_RESPONSE_CACHE_SIZE = 256
+# 事件流空闲时发送心跳注释的间隔（秒），防止代理断开空闲连接
+_SSE_HEARTBEAT_SECONDS = 15
+
+
+def _row_to_dict(row):
+    """把公告元组转换为 JSON 对象"""
+    return dict(zip(ANNOUNCEMENT_COLUMNS, row))
+
+
+def _flag(query, name, default):
+    """读取布尔查询参数（1/true/yes 为真）"""
+    values = query.get(name)
+    if not values:
+        return default
+    return values[0].lower() in ('1', 'true', 'yes')
+
+
+def _int(query, name, default=None):
+    """读取整数查询参数"""
+    values = query.get(name)
+    if not values:
+        return default
+    return int(values[0])
+
+
+class VersionTracker:
+    """
+    在内存中维护数据版本标记，请求处理时无需访问数据库即可生成 ETag。
+
+    后台线程每隔 poll_interval 秒读取一次公告数据版本号；此外定时公告
+    到达发布时间或公告过期时数据虽未改写但可见列表已变化，因此记录下一次
+    到期时间，越过后递增"时间代"。版本标记为 "数据版本-时间代"。
+
+    版本标记变化时向 manager.events 发布 version 事件，使其他进程写入的数据
+    和到期引起的可见性变化也能推送给事件流订阅者。
+    """
+
+    def __init__(self, manager, poll_interval=0.2):
+        self._manager = manager
+        self._poll_interval = poll_interval
+        self._data_version = None
+        self._generation = 0
+        self._next_due = None
+        self._token = None
+        # 后台轮询线程和处理缓存未命中的请求线程都会调用 refresh()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.refresh()
+
+    @property
+    def token(self):
+        """当前版本标记（只读内存）"""
+        return self._token
+
+    def refresh(self):
+        """
+        读取数据版本并检查是否越过到期时间，必要时更新版本标记。
+
+        Returns:
+            str: 刷新后的版本标记
+        """
+        with self._refresh_lock:
+            data_version = self._manager.data_version()
+            now = datetime.now()
+            changed = data_version != self._data_version
+            if self._next_due is not None and now >= self._next_due:
+                self._generation += 1
+                changed = True
+            if changed or self._token is None:
+                initial = self._token is None
+                self._data_version = data_version
+                self._next_due = self._manager._next_due_time()
+                self._token = f"{self._data_version}-{self._generation}"
+                if not initial:
+                    self._manager.events.publish('version', token=self._token)
+            return self._token
+
+    def start(self):
+        """启动后台轮询线程"""
+        def poll_loop():
+            while not self._stop.wait(self._poll_interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"刷新数据版本时出错: {e}")
+
+        self._thread = threading.Thread(target=poll_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台轮询线程"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+
+class _EventStream:
+    """EventBroadcaster 中的一个事件流连接"""
+
+    __slots__ = ('sock', 'event_types', 'pending', 'done')
+
+    def __init__(self, sock, event_types):
+        self.sock = sock
+        self.event_types = set(event_types) if event_types is not None else None
+        self.pending = bytearray()
+        self.done = threading.Event()
+
+
+class EventBroadcaster:
+    """
+    在单个线程中把公告事件推送给所有事件流连接。
+
+    每批事件只从 EventBus 读取一次、序列化一次，再写入各连接的非阻塞套接字，
+    推送代价不随连接数增加线程唤醒次数。客户端读取过慢、未发送数据超过
+    max_pending 字节时断开该连接：浏览器的 EventSource 会带上 Last-Event-ID
+    自动重连，从缓冲区续传或收到 resync 事件。
+    """
+
+    def __init__(self, bus, max_pending=256 * 1024, heartbeat=_SSE_HEARTBEAT_SECONDS):
+        self._bus = bus
+        self._max_pending = max_pending
+        self._heartbeat = heartbeat
+        self._selector = selectors.DefaultSelector()
+        self._wake_reader, self._wake_writer = socket.socketpair()
+        self._wake_reader.setblocking(False)
+        self._wake_writer.setblocking(False)
+        self._selector.register(self._wake_reader, selectors.EVENT_READ)
+        self._attaching = []
+        self._attach_lock = threading.Lock()
+        self._streams = {}
+        self._subscription = None
+        self._stopping = False
+        self._thread = None
+
+    @property
+    def stream_count(self):
+        return len(self._streams)
+
+    def start(self):
+        """启动推送线程"""
+        if self._thread is not None:
+            return
+        self._subscription = self._bus.subscribe()
+        self._bus.add_listener(self._wake)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止推送线程并结束所有事件流"""
+        self._stopping = True
+        if self._thread is None:
+            return
+        self._bus.remove_listener(self._wake)
+        self._wake()
+        self._thread.join(timeout=5)
+        self._subscription.close()
+        self._thread = None
+
+    def attach(self, sock, event_types=None, after_seq=None):
+        """
+        把已写出响应头的连接加入推送。
+
+        Args:
+            sock (socket.socket): 客户端连接
+            event_types (list): 只推送这些类型的事件，None 表示全部
+            after_seq (int): 先补发该序号之后仍在缓冲区中的事件
+
+        Returns:
+            threading.Event: 连接结束（客户端断开、积压过多或服务关闭）时置位
+        """
+        stream = _EventStream(sock, event_types)
+        if self._stopping or self._thread is None:
+            stream.done.set()
+            return stream.done
+        with self._attach_lock:
+            self._attaching.append((stream, after_seq))
+        self._wake()
+        return stream.done
+
+    def _wake(self):
+        try:
+            self._wake_writer.send(b'\0')
+        except (BlockingIOError, OSError):
+            # 唤醒字节已经足够多，推送线程必然会醒来
+            pass
+
+    def _run(self):
+        last_heartbeat = time.monotonic()
+        try:
+            while not self._stopping:
+                timeout = max(0.0, last_heartbeat + self._heartbeat - time.monotonic())
+                for key, mask in self._selector.select(timeout):
+                    if key.fileobj is self._wake_reader:
+                        self._drain_wakeups()
+                        continue
+                    stream = key.data
+                    if mask & selectors.EVENT_READ and not self._client_alive(stream):
+                        self._detach(stream)
+                    elif mask & selectors.EVENT_WRITE:
+                        self._flush(stream)
+
+                self._attach_pending()
+                events = self._subscription.get(timeout=0)
+                if events:
+                    self._broadcast(events)
+                if time.monotonic() - last_heartbeat >= self._heartbeat:
+                    last_heartbeat = time.monotonic()
+                    for stream in list(self._streams.values()):
+                        self._send(stream, b": keep-alive\n\n")
+        finally:
+            for stream in list(self._streams.values()):
+                self._detach(stream)
+            with self._attach_lock:
+                attaching, self._attaching = self._attaching, []
+            for stream, _ in attaching:
+                stream.done.set()
+
+    def _drain_wakeups(self):
+        try:
+            while self._wake_reader.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _attach_pending(self):
+        with self._attach_lock:
+            attaching, self._attaching = self._attaching, []
+        cursor = self._subscription._cursor
+        for stream, after_seq in attaching:
+            stream.sock.setblocking(False)
+            self._streams[stream.sock.fileno()] = stream
+            self._selector.register(stream.sock, selectors.EVENT_READ, stream)
+            if after_seq is None:
+                continue
+            # 补发断线期间的事件；序号不小于 cursor 的事件随下一批广播发出
+            backlog = self._bus.history(after_seq)
+            if backlog is None:
+                self._send(stream, Event(cursor - 1, RESYNC_EVENT, {'skipped': None}).sse)
+            else:
+                self._send(stream, b"".join(
+                    event.sse for event in backlog
+                    if event.seq < cursor and self._wants(stream, event)
+                ))
+
+    @staticmethod
+    def _wants(stream, event):
+        return stream.event_types is None or event.type in stream.event_types or event.type == RESYNC_EVENT
+
+    def _broadcast(self, events):
+        payload = b"".join(event.sse for event in events)
+        for stream in list(self._streams.values()):
+            if stream.event_types is None:
+                self._send(stream, payload)
+            else:
+                self._send(stream, b"".join(event.sse for event in events if self._wants(stream, event)))
+
+    def _send(self, stream, data):
+        if not data:
+            return
+        if stream.pending:
+            stream.pending += data
+        else:
+            try:
+                sent = stream.sock.send(data)
+            except BlockingIOError:
+                sent = 0
+            except OSError:
+                self._detach(stream)
+                return
+            if sent < len(data):
+                stream.pending += data[sent:]
+                self._selector.modify(stream.sock, selectors.EVENT_READ | selectors.EVENT_WRITE, stream)
+        if len(stream.pending) > self._max_pending:
+            self._detach(stream)
+
+    def _flush(self, stream):
+        try:
+            sent = stream.sock.send(stream.pending)
+        except BlockingIOError:
+            return
+        except OSError:
+            self._detach(stream)
+            return
+        del stream.pending[:sent]
+        if not stream.pending:
+            self._selector.modify(stream.sock, selectors.EVENT_READ, stream)
+
+    @staticmethod
+    def _client_alive(stream):
+        """事件流客户端不会再发送数据，可读即表示连接已关闭"""
+        try:
+            return bool(stream.sock.recv(4096))
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+
+    def _detach(self, stream):
+        if self._streams.pop(stream.sock.fileno(), None) is None:
+            return
+        self._selector.unregister(stream.sock)
+        stream.sock.setblocking(True)
+        stream.done.set()
+
+
+class AnnouncementRequestHandler(BaseHTTPRequestHandler):
+    """
+    公告只读 HTTP 接口：
+
+        GET /announcements?visible=1&include_deleted=0&channels=a,b&limit=50&unread_by=u
+        GET /announcements/<id>
+        GET /search?q=关键词&title=1&content=1
+        GET /stats
+        GET /events?types=created,deleted      （Server-Sent Events 推送）
+    """
+
+    protocol_version = "HTTP/1.1"
+    server_version = "AnnouncementHTTP/1.0"
+    # 响应头与响应体分两次写出，关闭 Nagle 算法避免 keep-alive 连接上的延迟确认等待
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip('/') == '/events':
+            self._stream_events(parse_qs(url.query))
+            return
+
+        query = parse_qs(url.query)
+        cache_key = (url.path, url.query)
+        etag = self._etag(self.server.versions.token, query)
+        # 缓存中只有成功的响应：命中说明该版本下路径有效、资源存在，不访问数据库
+        body = self.server.cached_response(cache_key, etag)
+        if body is None:
+            # 追踪器可能尚未轮询到刚发生的写入：读取数据前后各刷新一次版本标记，
+            # 两次一致时响应体与该版本对应，才写入缓存
+            etag = self._etag(self.server.versions.refresh(), query)
+            try:
+                status, payload = self._dispatch(url.path, query)
+            except ValueError as e:
+                status, payload = 400, {'error': str(e)}
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            # 路径无效或资源不存在时直接返回错误，不做条件请求判断
+            if status != 200:
+                self._send(status, None, body)
+                return
+            if self._etag(self.server.versions.refresh(), query) == etag:
+                self.server.store_response(cache_key, etag, body)
+
+        # 客户端持有的版本仍是最新时返回 304
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            self._send(304, etag, None)
+            return
+        self._send(200, etag, body)
+
+    def _etag(self, token, query):
+        """由版本标记生成 ETag；未读列表还取决于用户的已读状态，标记已读不改变公告数据版本"""
+        if query.get('unread_by'):
+            token += '-' + self.server.manager.receipt_token(query['unread_by'][0])
+        return f'"{token}"'
+
+    def _dispatch(self, path, query):
+        """根据路径调用 AnnouncementManager，返回 (状态码, 响应对象)"""
+        manager = self.server.manager
+        parts = [part for part in path.split('/') if part]
+
+        if parts == ['announcements']:
+            channels = query.get('channels')
+            unread_by = query.get('unread_by')
+            if channels:
+                rows = manager.get_announcements_for_channels(
+                    channels[0].split(','), include_global=_flag(query, 'global', True),
+                    limit=_int(query, 'limit', 50), before_id=_int(query, 'before_id')
+                )
+            elif unread_by:
+                rows = manager.list_unread(unread_by[0], limit=_int(query, 'limit'))
+            else:
+                rows = manager.get_all_announcements(
+                    include_deleted=_flag(query, 'include_deleted', False),
+                    visible_only=_flag(query, 'visible', True)
+                )
+                limit = _int(query, 'limit')
+                if limit is not None:
+                    rows = rows[:limit]
+            return 200, [_row_to_dict(row) for row in rows]
+
+        if len(parts) == 2 and parts[0] == 'announcements':
+            row = manager.get_announcement_by_id(int(parts[1]))
+            if row is None:
+                return 404, {'error': "公告不存在"}
+            return 200, _row_to_dict(row)
+
+        if parts == ['search']:
+            keyword = query.get('q', [''])[0]
+            rows = manager.search_announcements(
+                keyword, _flag(query, 'title', True), _flag(query, 'content', True),
+                visible_only=_flag(query, 'visible', True)
+            )
+            return 200, [_row_to_dict(row) for row in rows]
+
+        if parts == ['stats']:
+            return 200, manager.get_statistics()
+
+        return 404, {'error': f"未知路径: {path}"}
+
+    def _stream_events(self, query):
+        """
+        以 text/event-stream 推送公告变更事件，直到客户端断开或服务关闭。
+
+        响应头写出后连接交给 EventBroadcaster 统一推送，本线程只等待连接结束。
+        断线重连的客户端通过 Last-Event-ID 请求头（或 last_event_id 参数）从断开处
+        续传；积压超出事件缓冲区时收到 resync 事件，应重新拉取列表。
+        """
+        last_event_id = self.headers.get('Last-Event-ID') or query.get('last_event_id', [None])[0]
+        types = query.get('types')
+        try:
+            after_seq = int(last_event_id) if last_event_id else None
+        except ValueError:
+            after_seq = None
+
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.send_header('X-Accel-Buffering', 'no')
+        self.end_headers()
+        self.wfile.write(b"retry: 3000\n\n")
+        self.wfile.flush()
+
+        done = self.server.broadcaster.attach(
+            self.connection, types[0].split(',') if types else None, after_seq
+        )
+        done.wait()
+
+    def _send(self, status, etag, body):
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        if body is not None:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body) if body is not None else 0))
+        self.end_headers()
+        if body is not None:
+            self.wfile.write(body)
+
+
+class AnnouncementHTTPServer(ThreadingHTTPServer):
+    """带版本跟踪和预序列化响应缓存的公告 HTTP 服务"""
+
+    daemon_threads = True
+
+    def __init__(self, manager, address=('127.0.0.1', 8080), poll_interval=0.2, verbose=False):
+        super().__init__(address, AnnouncementRequestHandler)
+        self.manager = manager
+        self.verbose = verbose
+        self.versions = VersionTracker(manager, poll_interval)
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.broadcaster = EventBroadcaster(manager.events)
+
+    def cached_response(self, key, etag):
+        """返回与当前版本一致的缓存响应体，没有则返回 None"""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None or entry[0] != etag:
+                return None
+            self._cache.move_to_end(key)
+            return entry[1]
+
+    def store_response(self, key, etag, body):
+        """缓存预序列化的响应体，超出容量时淘汰最久未用的条目"""
+        with self._cache_lock:
+            self._cache[key] = (etag, body)
+            self._cache.move_to_end(key)
+            while len(self._cache) > _RESPONSE_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def serve_forever(self, poll_interval=0.5):
+        self.versions.start()
+        self.broadcaster.start()
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            self.versions.stop()
+
+    def server_close(self):
+        # 结束所有事件流，让处理线程退出
+        self.broadcaster.stop()
+        super().server_close()
+
+
+def create_server(manager, host='127.0.0.1', port=8080, poll_interval=0.2, verbose=False):
+    """
+    创建公告只读 HTTP 服务。
+
+    Args:
+        manager (AnnouncementManager): 公告管理器
+        host (str): 监听地址
+        port (int): 监听端口，0 表示随机端口
+        poll_interval (float): 数据版本轮询间隔（秒）
+        verbose (bool): 是否输出访问日志
+
+    Returns:
+        AnnouncementHTTPServer: 调用 serve_forever() 开始服务
+    """
+    return AnnouncementHTTPServer(manager, (host, port), poll_interval, verbose)
+
+
+def main(argv=None):
+    """命令行入口：python http_api.py [--db 路径] [--port 端口]"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="公告只读 HTTP 服务")
+    parser.add_argument('--db', default='announcements.db', help="数据库文件路径")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--verbose', action='store_true', help="输出访问日志")
+    args = parser.parse_args(argv)
+
+    server = create_server(AnnouncementManager(args.db), args.host, args.port, verbose=args.verbose)
+    print(f"公告 HTTP 服务已启动: http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+模糊搜索使用的 n-gram 切分与摘要高亮。
+
+- 拉丁字母、数字等组成的单词转为小写，前补两个空格、后补一个空格后取
+  三元组（与 PostgreSQL pg_trgm 相同）。单词中的一处拼写错误只影响相邻的
+  至多三个三元组，其余三元组仍能命中。
+- 中日韩文字没有分词，连续的一段取相邻两字的二元组；只有一个字时取该字。
+
+查询与文档使用同一套切分，相似度为查询 n-gram 中被文档包含的比例。
+"""
+import math
+import re
+
+# 中日韩文字：假名、中日韩统一表意文字（含扩展A、兼容表意文字）与谚文
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_CJK_CHAR = re.compile(f"[{_CJK}]")
+_TOKEN = re.compile(f"[{_CJK}]+|[^\\W_{_CJK}]+")
+
+
+def _word_trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _cjk_grams(run):
+    if len(run) == 1:
+        return {run}
+    return {run[i:i + 2] for i in range(len(run) - 1)}
+
+
+def _token_grams(token):
+    if _CJK_CHAR.match(token):
+        return _cjk_grams(token)
+    return _word_trigrams(token.lower())
+
+
+def text_grams(text):
+    """
+    返回文本的 n-gram 集合。
+
+    Args:
+        text (str): 标题、正文或搜索关键词
+
+    Returns:
+        set: n-gram 字符串集合
+    """
+    grams = set()
+    for token in _TOKEN.findall(text or ""):
+        grams |= _token_grams(token)
+    return grams
+
+
+def required_matches(query_grams, threshold):
+    """相似度达到 threshold 时文档至少需要包含的查询 n-gram 数（至少为1）"""
+    return max(1, math.ceil(len(query_grams) * threshold - 1e-9))
+
+
+def highlight(text, query_grams, width=80, marks=("**", "**")):
+    """
+    截取文本中命中查询最多的一段，并标记命中的词。
+
+    拉丁文单词与查询共有至少一半的三元组时视为命中（容忍拼写错误）；
+    中日韩文字按命中的二元组（或单字）标记。
+
+    Args:
+        text (str): 原文
+        query_grams (set): 查询的 n-gram 集合
+        width (int): 摘要的最大字符数（不含标记和省略号）
+        marks (tuple): 命中部分前后插入的标记
+
+    Returns:
+        str: 摘要，截断处以 "..." 表示
+    """
+    spans = []
+    for match in _TOKEN.finditer(text):
+        token, start = match.group(), match.start()
+        if _CJK_CHAR.match(token):
+            size = 1 if len(token) == 1 else 2
+            for offset in range(len(token) - size + 1):
+                if token[offset:offset + size] in query_grams:
+                    spans.append([start + offset, start + offset + size])
+        else:
+            grams = _word_trigrams(token.lower())
+            if len(grams & query_grams) * 2 >= len(grams):
+                spans.append([start, match.end()])
+
+    # 合并重叠或相邻的命中区间
+    merged = []
+    for span in spans:
+        if merged and span[0] <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], span[1])
+        else:
+            merged.append(span)
+
+    # 选取包含命中区间最多的窗口，窗口从某个命中区间之前 width // 4 处开始（不越过文本末尾）
+    window_start, best = 0, 0
+    last = 0
+    for first in range(len(merged)):
+        start = max(0, min(merged[first][0] - width // 4, len(text) - width))
+        last = max(last, first)
+        while last + 1 < len(merged) and merged[last + 1][1] <= start + width:
+            last += 1
+        if last - first + 1 > best:
+            window_start, best = start, last - first + 1
+    window_end = min(len(text), window_start + width)
+
+    parts = ["..." if window_start > 0 else ""]
+    position = window_start
+    for start, end in merged:
+        if end <= window_start or start >= window_end:
+            continue
+        start, end = max(start, window_start), min(end, window_end)
+        parts.extend([text[position:start], marks[0], text[start:end], marks[1]])
+        position = end
+    parts.append(text[position:window_end])
+    parts.append("..." if window_end < len(text) else "")
+    return "".join(parts)
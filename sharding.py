@@ -0,0 +1,190 @@
+import heapq
+import itertools
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from AnnouncementManager import AnnouncementManager
+from backends import SQLiteBackend
+
+# 租户名直接用作数据库文件名，只允许这些字符
+_TENANT_NAME = re.compile(r'^[A-Za-z0-9_-][A-Za-z0-9_.-]*$')
+
+_DB_SUFFIX = '.db'
+
+# 各租户统计信息中累加的字段
+_STATISTIC_KEYS = ('total', 'active', 'scheduled', 'expired', 'deleted')
+
+
+def _newest_first(item):
+    """合并排序键：(created_at, id)，与各租户列表的倒序一致"""
+    row = item[1]
+    return row[3], row[0]
+
+
+class ShardedAnnouncementManager:
+    """
+    多租户公告管理器：每个租户使用 directory 下独立的数据库文件 <租户>.db。
+
+    各租户的写入互不争用 SQLite 的写锁。每个租户对应一个 AnnouncementManager，
+    持有自己的连接池和过期检查器，首次访问时打开。全局搜索、统计等管理查询在
+    线程池中并行发往各租户，结果按创建时间倒序归并，每项附带租户名。
+    """
+
+    def __init__(self, directory='tenants', pool_size=4, max_workers=8):
+        """
+        Args:
+            directory (str): 存放各租户数据库文件的目录，不存在时自动创建
+            pool_size (int): 每个租户保留的空闲连接数
+            max_workers (int): 跨租户查询的最大并行数
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._pool_size = pool_size
+        self._managers = {}
+        self._managers_lock = threading.Lock()
+        # None 表示未启动过期检查器，否则为检查间隔（秒），之后打开的租户也会启动
+        self._checker_interval = None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tenant-query')
+
+    def tenant_path(self, tenant):
+        """返回租户的数据库文件路径"""
+        if not isinstance(tenant, str) or not _TENANT_NAME.match(tenant):
+            raise ValueError(f"租户名不合法: {tenant!r}")
+        return os.path.join(self.directory, tenant + _DB_SUFFIX)
+
+    def manager(self, tenant):
+        """
+        获取租户的公告管理器，数据库不存在时创建。
+
+        Args:
+            tenant (str): 租户名（字母、数字、_ - .，不以 . 开头）
+
+        Returns:
+            AnnouncementManager: 该租户的管理器
+        """
+        manager = self._managers.get(tenant)
+        if manager is not None:
+            return manager
+
+        path = self.tenant_path(tenant)
+        with self._managers_lock:
+            manager = self._managers.get(tenant)
+            if manager is None:
+                manager = AnnouncementManager(backend=SQLiteBackend(path, pool_size=self._pool_size))
+                if self._checker_interval is not None:
+                    manager.start_expiry_checker(self._checker_interval)
+                self._managers[tenant] = manager
+            return manager
+
+    def tenants(self):
+        """返回所有租户名（目录中已有的数据库文件与已打开的租户），按名称排序"""
+        names = set(self._managers)
+        for filename in os.listdir(self.directory):
+            tenant = filename[:-len(_DB_SUFFIX)]
+            if filename.endswith(_DB_SUFFIX) and _TENANT_NAME.match(tenant):
+                names.add(tenant)
+        return sorted(names)
+
+    def start_expiry_checkers(self, interval_seconds=300):
+        """为所有已打开的租户启动过期检查器，之后打开的租户自动启动"""
+        with self._managers_lock:
+            self._checker_interval = interval_seconds
+            managers = list(self._managers.values())
+        for manager in managers:
+            manager.start_expiry_checker(interval_seconds)
+
+    def stop_expiry_checkers(self):
+        """停止所有租户的过期检查器"""
+        with self._managers_lock:
+            self._checker_interval = None
+            managers = list(self._managers.values())
+        for manager in managers:
+            manager.stop_expiry_checker()
+
+    def _fan_out(self, func, tenants=None):
+        """
+        在线程池中对每个租户并行执行 func(manager)。
+
+        SQLite 查询执行期间释放 GIL，各租户的查询可以真正并行。任一租户出错时
+        抛出该异常。
+
+        Returns:
+            list: [(租户, 结果), ...]，按租户名排序
+        """
+        tenants = self.tenants() if tenants is None else sorted(tenants)
+        futures = [(tenant, self._executor.submit(func, self.manager(tenant))) for tenant in tenants]
+        return [(tenant, future.result()) for tenant, future in futures]
+
+    def _merge(self, results, limit):
+        """把各租户按创建时间倒序排列的公告归并为 [(租户, 公告), ...]"""
+        streams = [[(tenant, row) for row in rows] for tenant, rows in results]
+        merged = heapq.merge(*streams, key=_newest_first, reverse=True)
+        return list(itertools.islice(merged, limit))
+
+    def search_all(self, keyword, search_title=True, search_content=True, visible_only=False,
+                   limit=None, tenants=None):
+        """
+        在所有租户中搜索公告。
+
+        Args:
+            keyword (str): 搜索关键词
+            limit (int): 最多返回的条数，None 表示不限
+            tenants (list): 只搜索这些租户，None 表示全部
+
+        Returns:
+            list: [(租户, 公告), ...]，按创建时间倒序
+        """
+        results = self._fan_out(
+            lambda manager: manager.search_announcements(keyword, search_title, search_content,
+                                                         visible_only=visible_only),
+            tenants
+        )
+        return self._merge(results, limit)
+
+    def get_all_announcements_all(self, include_deleted=False, visible_only=False, limit=None, tenants=None):
+        """
+        获取所有租户的公告。
+
+        Returns:
+            list: [(租户, 公告), ...]，按创建时间倒序
+        """
+        results = self._fan_out(
+            lambda manager: manager.get_all_announcements(include_deleted=include_deleted,
+                                                          visible_only=visible_only),
+            tenants
+        )
+        return self._merge(results, limit)
+
+    def get_global_statistics(self, tenants=None):
+        """
+        汇总所有租户的统计信息。
+
+        Returns:
+            dict: 与 get_statistics 相同的各项总计，另含 tenants 为 {租户: 该租户的统计}
+        """
+        results = self._fan_out(lambda manager: manager.get_statistics(), tenants)
+        totals = {key: sum(stats[key] for _, stats in results) for key in _STATISTIC_KEYS}
+        totals['tenants'] = dict(results)
+        return totals
+
+    def check_and_delete_expired_all(self, tenants=None):
+        """
+        立即清理所有租户的过期公告。
+
+        Returns:
+            dict: {租户: 删除的公告数量}，只包含有删除的租户
+        """
+        results = self._fan_out(lambda manager: manager.check_and_delete_expired(), tenants)
+        return {tenant: count for tenant, count in results if count}
+
+    def close(self):
+        """停止过期检查器并释放各租户的连接"""
+        if self._checker_interval is not None:
+            self.stop_expiry_checkers()
+        self._executor.shutdown(wait=True)
+        with self._managers_lock:
+            managers, self._managers = list(self._managers.values()), {}
+        for manager in managers:
+            manager.backend.close()
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AnnouncementManager import AnnouncementManager  # noqa: E402
+from backends import MemoryBackend, SQLiteBackend  # noqa: E402
+
+
+@pytest.fixture(params=['sqlite', 'memory'])
+def manager(request, tmp_path):
+    """分别使用 SQLiteBackend 和 MemoryBackend 的公告管理器，同一组测试对两个后端各运行一次"""
+    if request.param == 'sqlite':
+        backend = SQLiteBackend(str(tmp_path / 'announcements.db'))
+    else:
+        backend = MemoryBackend()
+    manager = AnnouncementManager(backend=backend)
+    yield manager
+    backend.close()
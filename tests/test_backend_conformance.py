@@ -0,0 +1,351 @@
+"""
+存储后端一致性测试：每个测试分别在 SQLiteBackend 和 MemoryBackend 上运行
+（见 conftest.py 的 manager 夹具），两个后端须表现一致。
+"""
+import pickle
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import AnnouncementManager as announcement_module
+from AnnouncementManager import GLOBAL_CHANNEL, LazyAnnouncement, SearchHit
+
+
+def ids_of(rows):
+    return [row[0] for row in rows]
+
+
+# ---- 基本读写 ----
+
+def test_create_list_and_statistics(manager):
+    first = manager.create_announcement("标题一", "内容一")
+    second = manager.create_announcement("标题二", "内容二")
+    scheduled = manager.create_announcement("定时", "稍后发布", publish_at=datetime.now() + timedelta(hours=1))
+
+    assert ids_of(manager.get_all_announcements()) == [scheduled, second, first]
+    assert ids_of(manager.get_all_announcements(visible_only=True)) == [second, first]
+    assert manager.get_announcement_by_id(first)[1:3] == ("标题一", "内容一")
+    assert manager.get_announcement_by_id(999) is None
+
+    assert manager.soft_delete_announcement(first)
+    assert ids_of(manager.get_all_announcements()) == [scheduled, second]
+    assert ids_of(manager.get_all_announcements(include_deleted=True)) == [scheduled, second, first]
+    assert manager.get_statistics() == {'total': 3, 'active': 1, 'scheduled': 1, 'expired': 0, 'deleted': 1}
+
+    assert manager.restore_announcement(first)
+    assert manager.hard_delete_announcement(second)
+    assert not manager.hard_delete_announcement(second)
+    assert ids_of(manager.get_all_announcements(include_deleted=True)) == [scheduled, first]
+
+
+def test_exact_search_uses_like_semantics(manager):
+    upper = manager.create_announcement("System Notice", "maintenance at 50% capacity")
+    other = manager.create_announcement("午餐", "食堂菜单")
+
+    assert ids_of(manager.search_announcements("system")) == [upper]
+    assert ids_of(manager.search_announcements("50%")) == [upper]
+    assert ids_of(manager.search_announcements("main%ance")) == [upper]
+    assert ids_of(manager.search_announcements("食堂", search_content=False)) == []
+    assert ids_of(manager.search_announcements("食堂", search_title=False)) == [other]
+    with pytest.raises(ValueError):
+        manager.search_announcements("x", mode='regex')
+
+
+# ---- 历史版本 ----
+
+def test_revisions_and_revert(manager, monkeypatch):
+    # 每隔3个版本保存一次全文，使还原路径同时经过全文版本和差量
+    monkeypatch.setattr(announcement_module, '_REVISION_SNAPSHOT_INTERVAL', 3)
+    announcement_id = manager.create_announcement("v1", "第一句。第二句。第三句。")
+    versions = [("v1", "第一句。第二句。第三句。")]
+    for n in range(2, 9):
+        title, content = f"v{n}", versions[-1][1].replace("第二句", f"第二句（改{n}）", 1) + f"追加{n}。"
+        assert manager.update_announcement(announcement_id, title, content)
+        versions.append((title, content))
+
+    # 内容未变化时不产生新版本
+    assert manager.update_announcement(announcement_id, *versions[-1])
+    assert not manager.update_announcement(999, "x", "y")
+
+    history = manager.list_revisions(announcement_id)
+    assert [row[0] for row in history] == list(range(len(versions), 0, -1))
+    assert [row[1] for row in history] == [title for title, _ in reversed(versions)]
+    for revision, (title, content) in enumerate(versions, start=1):
+        assert manager.get_revision(announcement_id, revision)[1:3] == (title, content)
+    assert manager.get_revision(announcement_id, 0) is None
+    assert manager.get_revision(announcement_id, len(versions) + 1) is None
+
+    assert manager.revert_announcement(announcement_id, 2)
+    assert manager.get_announcement_by_id(announcement_id)[1:3] == versions[1]
+    assert manager.list_revisions(announcement_id)[0][0] == len(versions) + 1
+    assert manager.get_revision(announcement_id, len(versions))[1:3] == versions[-1]
+
+    assert manager.hard_delete_announcement(announcement_id)
+    assert manager.list_revisions(announcement_id) == []
+
+
+def test_single_line_revision_delta_is_small(manager):
+    body = "".join(f"第{n}句，系统将于本周六进行维护，请各部门提前做好准备。" for n in range(600))
+    edited = body[:1000] + "修改" + body[1002:-1000] + "改动" + body[-998:]
+    announcement_id = manager.create_announcement("通知", body)
+    manager.update_announcement(announcement_id, "通知", edited)
+
+    _, _, rows = manager.backend.revision_chain(announcement_id, 1)
+    assert len(rows[0][3]) < 200
+    assert manager.get_revision(announcement_id, 1)[2] == body
+
+
+# ---- 频道 ----
+
+def test_channel_paging_with_before_id(manager):
+    expected = []
+    for n in range(300):
+        if n % 7 == 0:
+            channels = ["a"]
+        elif n % 11 == 0:
+            channels = ["b", "c"]
+        elif n % 50 == 0:
+            channels = None
+        else:
+            channels = ["noise"]
+        announcement_id = manager.create_announcement(f"公告{n}", "内容", channels=channels)
+        if channels is None or "a" in channels or "b" in channels:
+            expected.append(announcement_id)
+    hidden = manager.create_announcement("待发布", "内容", channels=["a"],
+                                         publish_at=datetime.now() + timedelta(hours=1))
+    deleted = manager.create_announcement("已删除", "内容", channels=["a"])
+    manager.soft_delete_announcement(deleted)
+    expected.reverse()
+
+    pages = []
+    before_id = None
+    while True:
+        page = ids_of(manager.get_announcements_for_channels(["a", "b"], limit=4, before_id=before_id))
+        if not page:
+            break
+        pages.append(page)
+        before_id = page[-1]
+    assert [announcement_id for page in pages for announcement_id in page] == expected
+    assert all(len(page) == 4 for page in pages[:-1])
+    assert hidden not in expected and deleted not in expected
+
+    no_global = ids_of(manager.get_announcements_for_channels(["b"], include_global=False, limit=1000))
+    assert no_global == [announcement_id for announcement_id in expected
+                         if manager.get_announcement_channels(announcement_id) == ["b", "c"]]
+
+
+def test_channel_editing(manager):
+    announcement_id = manager.create_announcement("公告", "内容")
+    assert manager.get_announcement_channels(announcement_id) == [GLOBAL_CHANNEL]
+    assert manager.add_announcement_channels(announcement_id, ["x", " y ", "x"])
+    assert manager.get_announcement_channels(announcement_id) == ["x", "y"]
+    assert manager.remove_announcement_channels(announcement_id, ["x", "y"])
+    assert manager.get_announcement_channels(announcement_id) == [GLOBAL_CHANNEL]
+    assert not manager.set_announcement_channels(999, ["x"])
+    assert manager.get_announcement_channels(999) == []
+
+
+# ---- 已读回执 ----
+
+def test_read_receipts(manager):
+    ids = [manager.create_announcement(f"公告{n}", "内容") for n in range(6)]
+    assert manager.unread_count("u") == 6
+
+    assert manager.mark_read("u", [ids[0], ids[2]]) == 4
+    assert ids_of(manager.list_unread("u")) == [ids[5], ids[4], ids[3], ids[1]]
+    assert ids_of(manager.list_unread("u", limit=2)) == [ids[5], ids[4]]
+    assert ids_of(manager.get_all_announcements(unread_by="u")) == [ids[5], ids[4], ids[3], ids[1]]
+
+    # 删除未读公告后高水位越过它
+    manager.soft_delete_announcement(ids[1])
+    assert manager.mark_read("u", ids[3]) == 2
+    assert manager.backend.get_receipt("u")[0] == ids[3]
+
+    manager.mark_all_read("u")
+    assert manager.unread_count("u") == 0
+    newer = manager.create_announcement("新公告", "内容")
+    assert ids_of(manager.list_unread("u")) == [newer]
+    assert manager.unread_count("other") == 6
+
+
+def test_receipts_ignore_unknown_ids_and_keep_cache_tokens(manager):
+    ids = [manager.create_announcement(f"公告{n}", "内容") for n in range(3)]
+    token = manager.cache_token()
+    version = manager.data_version()
+    receipt = manager.receipt_token("u")
+
+    manager.mark_read("u", [ids[1], 10 ** 7])
+    watermark, exceptions = manager.backend.get_receipt("u")
+    assert watermark == 0 and len(exceptions or b'') <= 1
+    assert manager.cache_token() == token
+    assert manager.data_version() == version
+    assert manager.receipt_token("u") != receipt
+
+    manager.create_announcement("新公告", "内容")
+    assert manager.data_version() != version
+
+
+def test_scheduled_announcement_stays_unread(manager):
+    visible = manager.create_announcement("已发布", "内容")
+    scheduled = manager.create_announcement("定时", "内容", publish_at=datetime.now() + timedelta(seconds=0.3))
+    later = manager.create_announcement("更新的公告", "内容")
+    manager.mark_read("u", [visible, later])
+    assert manager.unread_count("u") == 0
+    # 高水位不越过尚未发布的公告
+    assert manager.backend.get_receipt("u")[0] < scheduled
+
+    time.sleep(0.4)
+    assert ids_of(manager.list_unread("u")) == [scheduled]
+
+
+def test_concurrent_mark_read_and_unread_count(manager):
+    ids = [manager.create_announcement(f"公告{n}", "内容") for n in range(60)]
+    errors = []
+    deadline = time.monotonic() + 1.0
+
+    def writer(user_id):
+        try:
+            for announcement_id in ids:
+                manager.mark_read(user_id, announcement_id)
+        except Exception as e:
+            errors.append(e)
+
+    def reader(user_id):
+        try:
+            while time.monotonic() < deadline:
+                manager.unread_count(user_id)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(f"w{n}",), daemon=True) for n in range(2)]
+    threads += [threading.Thread(target=reader, args=(f"w{n}",), daemon=True) for n in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    assert not any(thread.is_alive() for thread in threads), "mark_read / unread_count 死锁"
+    assert errors == []
+    assert manager.unread_count("w0") == manager.unread_count("w1") == 0
+
+
+# ---- 定时发布与过期 ----
+
+def test_expiry_and_publish(manager):
+    now = datetime.now()
+    expiring = manager.create_announcement("即将过期", "内容", expires_after_hours=0.2 / 3600)
+    scheduled = manager.create_announcement("定时", "内容", publish_at=now + timedelta(seconds=0.2))
+    permanent = manager.create_announcement("永久", "内容")
+    manager.check_and_publish_due()
+
+    assert ids_of(manager.get_all_announcements(visible_only=True)) == [permanent, expiring]
+    assert manager.get_statistics()['scheduled'] == 1
+    due = manager._next_due_time()
+    assert due is not None and due <= now + timedelta(seconds=0.3)
+
+    time.sleep(0.3)
+    assert manager.get_statistics()['expired'] == 1
+    assert manager.check_and_delete_expired() == 1
+    assert manager.check_and_delete_expired() == 0
+    assert manager.check_and_publish_due() == 1
+    assert ids_of(manager.get_all_announcements(visible_only=True)) == [permanent, scheduled]
+    assert manager.get_announcement_by_id(expiring)[5] is not None
+    assert manager._next_due_time() is None
+
+
+def test_timezone_aware_publish_at(manager):
+    publish_at = datetime.now(timezone(timedelta(hours=8))) + timedelta(hours=1)
+    announcement_id = manager.create_announcement("定时", "内容", expires_after_hours=1, publish_at=publish_at)
+
+    stored = manager.get_announcement_by_id(announcement_id)[7]
+    assert str(stored) == str(publish_at.astimezone().replace(tzinfo=None))
+    assert manager.get_statistics()['scheduled'] == 1
+    assert manager._next_due_time() is not None
+    assert manager.check_and_delete_expired() == 0
+
+
+def test_expiry_events(manager):
+    with manager.events.subscribe() as subscription:
+        announcement_id = manager.create_announcement("即将过期", "内容", expires_after_hours=-1)
+        manager.check_and_delete_expired()
+        events = subscription.get(timeout=1)
+    assert [event.type for event in events] == ['created', 'expired']
+    assert events[1].data['ids'] == [announcement_id]
+
+
+# ---- 延迟加载 ----
+
+def test_lazy_loading(manager):
+    ids = [manager.create_announcement(f"公告{n}", f"正文{n}" * 3) for n in range(5)]
+    eager = manager.get_all_announcements()
+    records = manager.get_all_announcements(lazy=True, page_size=2, preview_chars=4)
+
+    assert all(isinstance(record, LazyAnnouncement) for record in records)
+    assert not any(record.content_loaded for record in records)
+    assert records[0].preview == "正文4正..."
+    assert records[2].content == eager[2][2]
+    # 只加载了第二页
+    assert [record.content_loaded for record in records] == [False, False, True, True, False]
+    assert [tuple(record) for record in records] == eager
+    assert records[1][1:3] == eager[1][1:3]
+
+    lazy = manager.get_all_announcements(lazy=True)
+    manager.hard_delete_announcement(ids[-1])
+    assert lazy[0].content is None
+
+
+# ---- 模糊搜索 ----
+
+def test_fuzzy_search(manager):
+    typo = manager.create_announcement("Server maintenance window", "The database maintenance starts Friday night.")
+    chinese = manager.create_announcement("系统维护通知", "本周五晚上进行系统维护，请提前保存工作。")
+    unrelated = manager.create_announcement("Lunch menu", "Noodles and rice")
+
+    hits = manager.search_announcements("maintenence", mode='fuzzy')
+    assert ids_of(hits) == [typo]
+    assert isinstance(hits[0], SearchHit) and hits[0].score >= 0.5
+    assert "**maintenance**" in hits[0].title_snippet
+    assert pickle.loads(pickle.dumps(hits[0])).score == hits[0].score
+
+    hits = manager.search_announcements("系统维户", mode='fuzzy')
+    assert ids_of(hits) == [chinese]
+    assert "**系统维**" in hits[0].title_snippet
+
+    assert manager.search_announcements("maintenence", mode='fuzzy', threshold=0.95) == []
+    assert manager.search_announcements("friday", mode='fuzzy', search_content=False) == []
+    assert ids_of(manager.search_announcements("friday", mode='fuzzy', search_title=False)) == [typo]
+    assert manager.search_announcements("!!!", mode='fuzzy') == []
+    assert unrelated not in ids_of(manager.search_announcements("maintenance", mode='fuzzy'))
+
+
+def test_fuzzy_search_ranking_and_limit(manager):
+    weak = manager.create_announcement("quarterly report", "finance")
+    strong = manager.create_announcement("quarterly meeting", "agenda")
+    newer_weak = manager.create_announcement("quarterly budget", "finance")
+
+    hits = manager.search_announcements("quartely meetng", mode='fuzzy', threshold=0.3)
+    assert ids_of(hits) == [strong, newer_weak, weak]
+    assert hits[0].score > hits[1].score
+    assert ids_of(manager.search_announcements("quartely meetng", mode='fuzzy', threshold=0.3, limit=1)) == [strong]
+
+
+def test_fuzzy_index_follows_writes(manager):
+    announcement_id = manager.create_announcement("Holiday schedule", "Office closed on Friday")
+    hidden = manager.create_announcement("Holiday party", "Friday evening",
+                                         publish_at=datetime.now() + timedelta(hours=1))
+
+    assert ids_of(manager.search_announcements("holliday", mode='fuzzy')) == [hidden, announcement_id]
+    assert ids_of(manager.search_announcements("holliday", mode='fuzzy', visible_only=True)) == [announcement_id]
+
+    manager.update_announcement(announcement_id, "Parking notice", "Garage closed on Monday")
+    assert ids_of(manager.search_announcements("holliday", mode='fuzzy')) == [hidden]
+    assert ids_of(manager.search_announcements("garadge", mode='fuzzy')) == [announcement_id]
+
+    manager.soft_delete_announcement(announcement_id)
+    assert manager.search_announcements("garadge", mode='fuzzy') == []
+    manager.restore_announcement(announcement_id)
+    assert ids_of(manager.search_announcements("garadge", mode='fuzzy')) == [announcement_id]
+
+    manager.hard_delete_announcement(announcement_id)
+    assert manager.search_announcements("garadge", mode='fuzzy') == []
@@ -0,0 +1,84 @@
+"""
+批量导入/导出测试。
+"""
+import json
+
+import pytest
+
+import bulk_io
+from AnnouncementManager import AnnouncementManager
+
+
+def write_jsonl(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def test_resume_after_crash_between_commit_and_checkpoint_file(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'a.db')
+    source = str(tmp_path / 'source.jsonl')
+    checkpoint = str(tmp_path / 'import.checkpoint')
+    write_jsonl(source, [{'title': f"公告{n}", 'content': "内容"} for n in range(10)])
+
+    def crash(*args):
+        raise KeyboardInterrupt
+
+    # 第一个事务已提交，写断点文件时进程中断
+    monkeypatch.setattr(bulk_io, '_write_checkpoint', crash)
+    with pytest.raises(KeyboardInterrupt):
+        bulk_io.import_announcements(db_path, source, workers=0, chunk_size=2, commit_every=4,
+                                     checkpoint_path=checkpoint)
+    monkeypatch.undo()
+
+    report = bulk_io.import_announcements(db_path, source, workers=0, chunk_size=2, commit_every=4,
+                                          checkpoint_path=checkpoint)
+    assert report['skipped'] == 4
+    titles = [row[1] for row in AnnouncementManager(db_path).get_all_announcements()]
+    assert sorted(titles) == sorted(f"公告{n}" for n in range(10))
+
+    # 全部导入后重复执行不再插入
+    assert bulk_io.import_announcements(db_path, source, workers=0, checkpoint_path=checkpoint)['records'] == 0
+
+
+def test_checkpoint_belongs_to_source(tmp_path):
+    db_path = str(tmp_path / 'a.db')
+    checkpoint = str(tmp_path / 'import.checkpoint')
+    for name in ('one.jsonl', 'two.jsonl'):
+        write_jsonl(str(tmp_path / name), [{'title': "t", 'content': "c"}])
+    bulk_io.import_announcements(db_path, str(tmp_path / 'one.jsonl'), workers=0, checkpoint_path=checkpoint)
+    with pytest.raises(ValueError):
+        bulk_io.import_announcements(db_path, str(tmp_path / 'two.jsonl'), workers=0, checkpoint_path=checkpoint)
+
+
+@pytest.mark.parametrize('fmt', ['jsonl', 'csv'])
+def test_export_import_round_trip_keeps_channels(tmp_path, fmt):
+    source_db = str(tmp_path / 'source.db')
+    manager = AnnouncementManager(source_db)
+    targeted = manager.create_announcement("部门公告", "内容", channels=["研发", "测试"])
+    global_id = manager.create_announcement("全员公告", "内容")
+    path = str(tmp_path / f'export.{fmt}')
+    assert bulk_io.export_announcements(source_db, path)['records'] == 2
+
+    for keep_ids in (False, True):
+        target_db = str(tmp_path / f'target-{keep_ids}.db')
+        report = bulk_io.import_announcements(target_db, path, workers=0, keep_ids=keep_ids)
+        assert report['inserted'] == 2 and report['rejected'] == 0
+        imported = AnnouncementManager(target_db)
+        channels = {row[1]: imported.get_announcement_channels(row[0]) for row in imported.get_all_announcements()}
+        assert channels == {"部门公告": ["测试", "研发"], "全员公告": ["*"]}
+        if keep_ids:
+            assert imported.get_announcement_channels(targeted) == ["测试", "研发"]
+            assert imported.get_announcement_channels(global_id) == ["*"]
+
+
+def test_import_without_channels_is_global(tmp_path):
+    db_path = str(tmp_path / 'a.db')
+    source = str(tmp_path / 'source.jsonl')
+    write_jsonl(source, [{'title': "无频道", 'content': "内容"},
+                         {'title': "空频道", 'content': "内容", 'channels': []},
+                         {'title': "坏频道", 'content': "内容", 'channels': {"a": 1}}])
+    report = bulk_io.import_announcements(db_path, source, workers=0)
+    assert report['inserted'] == 2 and report['rejected'] == 1
+    manager = AnnouncementManager(db_path)
+    assert [manager.get_announcement_channels(row[0]) for row in manager.get_all_announcements()] == [["*"], ["*"]]
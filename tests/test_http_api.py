@@ -0,0 +1,56 @@
+"""
+HTTP 接口的条件请求与响应缓存测试。
+"""
+import http.client
+import json
+import threading
+
+import pytest
+
+from AnnouncementManager import AnnouncementManager
+from http_api import create_server
+
+
+@pytest.fixture
+def server(tmp_path):
+    manager = AnnouncementManager(str(tmp_path / 'a.db'))
+    # 追踪器几乎不轮询，模拟写入后、轮询前的请求
+    server = create_server(manager, port=0, poll_interval=3600)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join(timeout=5)
+
+
+def get(server, path, etag=None):
+    conn = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+    try:
+        conn.request('GET', path, headers={'If-None-Match': etag} if etag else {})
+        response = conn.getresponse()
+        body = response.read()
+        return response.status, response.getheader('ETag'), json.loads(body) if body else None
+    finally:
+        conn.close()
+
+
+def test_errors_are_not_answered_with_304(server):
+    status, etag, _ = get(server, '/announcements')
+    assert status == 200
+    assert get(server, '/announcements', etag)[0] == 304
+    assert get(server, '/nope', etag)[0] == 404
+    assert get(server, '/announcements/999', etag)[0] == 404
+    assert get(server, '/announcements/abc', etag)[0] == 400
+
+
+def test_write_before_poll_is_not_cached_under_old_etag(server):
+    old_etag = f'"{server.versions.token}"'
+    announcement_id = server.manager.create_announcement("新公告", "内容")
+
+    # 追踪器尚未轮询到写入，响应体按读取数据后的版本标记缓存
+    status, etag, body = get(server, '/announcements')
+    assert status == 200 and etag != old_etag
+    assert [row['id'] for row in body] == [announcement_id]
+    assert get(server, '/announcements', old_etag)[0] == 200
+    assert get(server, '/announcements', etag)[0] == 304
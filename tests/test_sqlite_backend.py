@@ -0,0 +1,62 @@
+"""
+SQLiteBackend 特有行为的测试（数据库升级、索引补建）。
+"""
+import sqlite3
+
+from AnnouncementManager import AnnouncementManager
+
+
+def create_old_database(db_path, titles):
+    """建立没有 expires_at / publish_at 列和 n-gram 索引的旧版数据库"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+    CREATE TABLE announcements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        content TEXT NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        deleted_at DATETIME DEFAULT NULL
+    )
+    """)
+    conn.executemany("INSERT INTO announcements (title, content) VALUES (?, ?)",
+                     [(title, "内容") for title in titles])
+    conn.commit()
+    conn.close()
+
+
+def count_grams(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM announcement_grams").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_upgrade_defers_search_index_backfill(tmp_path):
+    db_path = str(tmp_path / 'old.db')
+    create_old_database(db_path, ["Server maintenance"] * 5)
+
+    manager = AnnouncementManager(db_path)
+    # 打开数据库时不在升级事务中补建索引
+    assert count_grams(db_path) == 0
+
+    newest = manager.create_announcement("Server maintenance tonight", "内容")
+    hits = manager.search_announcements("maintenence", mode='fuzzy')
+    assert sorted(hit[0] for hit in hits) == [1, 2, 3, 4, 5, newest]
+
+    # 补建完成后清除待补建标记，再次打开不会重复补建
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM search_index_pending").fetchone()[0] == 0
+    conn.close()
+    assert len(AnnouncementManager(db_path).search_announcements("maintenence", mode='fuzzy')) == 6
+
+
+def test_empty_database_needs_no_backfill(tmp_path):
+    db_path = str(tmp_path / 'new.db')
+    manager = AnnouncementManager(db_path)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM search_index_pending").fetchone()[0] == 0
+    conn.close()
+    announcement_id = manager.create_announcement("Holiday schedule", "内容")
+    assert [hit[0] for hit in manager.search_announcements("holliday", mode='fuzzy')] == [announcement_id]